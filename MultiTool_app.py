@@ -1,12 +1,12 @@
 from os import environ
-import io
-from html2docx import html2docx
-from pdfkit import from_string
-from markdown import markdown
 import streamlit as st
 
 from myfunc.mojafunkcija import st_style, positive_login, init_cond_llm
-from custom_llm_agent import our_custom_agent
+from custom_llm_agent import AGENT_MODEL, our_custom_agent
+from export import download_buttons
+from streaming import TimedStreamHandler, metrics_caption, record_metrics
+from tracing import request_trace
+from answer_cache import lookup_answer, store_answer
 
 version = "16.11.23. Dj OpenAI"
 
@@ -25,7 +25,11 @@ def main():
         "broj_k": 5,
         "stil": "",
         "score": 0.1,
-        "sql_base_name": "test1"
+        "sql_base_name": "test1",
+        "parallel_tools": True,
+        "answer_cache": True,
+        "search_all": False,
+        "namespaces": ["pravnik", "positive", "zapisnici"],
         }
     st.session_state = {**default_session_states, **st.session_state}
 
@@ -78,8 +82,29 @@ def main():
                 "zapisnici",
                 ),
             )
+        st.session_state["search_all"] = st.checkbox(
+            label="Pretraži sve oblasti",
+            value=False,
+            help="Pinecone alati pretražuju odabrane oblasti istovremeno i spajaju najbolje rezultate.",
+            )
+        if st.session_state["search_all"]:
+            st.session_state["namespaces"] = st.multiselect(
+                label="Oblasti za pretragu",
+                options=["pravnik", "positive", "zapisnici"],
+                default=["pravnik", "positive", "zapisnici"],
+                )
         st.session_state["sql_base_name"] = st.text_input(
             label="Unesite naziv SQL baze", value="test1", key="sql_baza")
+        st.session_state["parallel_tools"] = st.checkbox(
+            label="Paralelno pozivanje alata",
+            value=True,
+            help="Agent moze u jednom koraku da pozove vise alata, koji se onda izvrsavaju istovremeno.",
+            )
+        st.session_state["answer_cache"] = st.checkbox(
+            label="Koristi ranije odgovore",
+            value=True,
+            help="Na isto ili vrlo slično pitanje, za istu oblast, vraća se već generisan odgovor.",
+            )
 
     zahtev = ""
     prompt_file = st.file_uploader(
@@ -98,45 +123,51 @@ def main():
         st.form_submit_button(label="Submit")
 
 
-    if zahtev not in ["", " "]:
-        st.session_state["odgovor"] = our_custom_agent(zahtev, dict(st.session_state))
-        with st.spinner("Sačekajte trenutak..."):
+    # agent radi sa temperaturom 0, pa je odgovor na isto pitanje isti - uzima se iz keša
+    oblast = (
+        ",".join(sorted(st.session_state["namespaces"]))
+        if st.session_state["search_all"]
+        else st.session_state["namespace"]
+        )
+    cached = None
+    if zahtev not in ["", " "] and st.session_state["answer_cache"]:
+        cached = lookup_answer(
+            zahtev, AGENT_MODEL, st.session_state["stil"], oblast, 0
+            )
+        if cached is not None:
+            st.session_state["odgovor"] = cached.answer
+            st.info(f"Odgovor je ranije generisan za slično pitanje (sličnost {cached.similarity:.3f}).")
+
+    if zahtev not in ["", " "] and cached is None:
+        with st.spinner("Sačekajte trenutak..."), request_trace("MultiTool_app", model=AGENT_MODEL):
+            stream_box = st.empty()
+            # agent razmislja u vise koraka - prikazuje se samo finalni odgovor
+            stream_handler = TimedStreamHandler(
+                stream_box, title="FINALNI TEKST", answer_prefix="Final Answer:"
+                )
             try:
-                # st.session_state["odgovor"] = our_custom_agent(zahtev, dict(st.session_state))
-                st.write(st.session_state["odgovor"])
+                st.session_state["odgovor"] = our_custom_agent(
+                    zahtev, dict(st.session_state), callbacks=[stream_handler]
+                    )
+                record_metrics("MultiTool_app", AGENT_MODEL, stream_handler.metrics())
+                store_answer(
+                    zahtev,
+                    AGENT_MODEL,
+                    st.session_state["stil"],
+                    oblast,
+                    st.session_state["odgovor"],
+                    0,
+                    )
+                st.caption(metrics_caption(stream_handler.metrics()))
             except Exception as e:
                 st.warning(f"Nisam u mogućnosti da završim tekst. Ovo je opis greške:\n\n {e}")
+            stream_box.empty()
 
 
     if st.session_state["odgovor"] != "":
         with st.expander("FINALNI TEKST", expanded=True):
             st.markdown(body=st.session_state["odgovor"])
-        html = markdown(text=st.session_state["odgovor"])
-
-        try:
-            pdf_data = from_string(input=html, cover_first=False, 
-                                   options={"encoding": "UTF-8", "no-outline": None, "quiet": "",},
-                                   )
-            st.download_button(
-                label="Download TekstuStilu.pdf",
-                data=pdf_data,
-                file_name="TekstuStilu.pdf",
-                mime="application/octet-stream",
-                )
-        except:
-            st.write("Za pdf fajl restartujte app za 5 minuta. Osvezavanje aplikacije je u toku")
-
-        st.download_button(
-            label="Download Odgovor.txt",
-            data=st.session_state["odgovor"],
-            file_name="Odgovor.txt",
-            )
-        st.download_button(
-            label="Download Odgovor.docx",
-            data=html2docx(content=html, title="Zapisnik").getvalue(),
-            file_name="Odgovor.docx",
-            mime="docx",
-            )
+        download_buttons(st.session_state["odgovor"], "Odgovor")
 
 if environ.get("DEPLOYMENT_ENVIRONMENT") == "Streamlit":
     name, authentication_status, username = positive_login(main, " ")
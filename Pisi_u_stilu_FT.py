@@ -3,23 +3,17 @@
 # uvoze se biblioteke
 import os
 import streamlit as st
-import pinecone
-from langchain.vectorstores.pinecone import Pinecone
-from langchain.embeddings.openai import OpenAIEmbeddings
-from langchain.vectorstores import Pinecone
-from langchain.chat_models import ChatOpenAI
-from langchain.chains import LLMChain
-from langchain import LLMChain
-from langchain.prompts.chat import (
-    SystemMessagePromptTemplate,
-    HumanMessagePromptTemplate,
-    ChatPromptTemplate,
-)
-from html2docx import html2docx
+from embedding_cache import CachedOpenAIEmbeddings
 from myfunc.mojafunkcija import st_style, positive_login, open_file
-import markdown
-from langchain.utilities import GoogleSerperAPIWrapper
-import pdfkit
+from export import download_buttons
+from streaming import TimedStreamHandler, metrics_caption, record_metrics
+from clients import http_client
+from vector_store import from_existing_index
+from retrieval_cache import similarity_search_with_score
+from tracing import request_trace, span
+from web_search import search_results, start_search
+from context_builder import build_context, matches_from_documents
+from answer_cache import lookup_answer, store_answer
 
 
 # these are the environment variables that need to be set for LangSmith to work
@@ -36,14 +30,8 @@ def main():
 
     # Retrieving API keys from env
     openai_api_key = os.environ.get("OPENAI_API_KEY")
-    # Initialize Pinecone
-    pinecone.init(
-        api_key=os.environ["PINECONE_API_KEY"],
-        environment=os.environ["PINECONE_API_ENV"],
-    )
     # Initialize OpenAI embeddings
-    embeddings = OpenAIEmbeddings()
-    search = GoogleSerperAPIWrapper()
+    embeddings = CachedOpenAIEmbeddings()
     # Initialize OpenAI embeddings and LLM and all variables
 
     if "model" not in st.session_state:
@@ -144,19 +132,16 @@ def main():
         st.caption(
             "Relevantnost za temu određuje koji dokmenti će se korsititi iz indeksa. Ako je vrednost 0.0 onda se koriste svi dokumenti, a za 1.0 samo oni koji su najrelevantniji."
         )
-
-    # define model, vestorstore and retriever
-    llm = ChatOpenAI(
-        model_name=st.session_state.model,
-        temperature=st.session_state.temp,
-        openai_api_key=openai_api_key,
-    )
-    vectorstore = Pinecone.from_existing_index(
-        st.session_state.index_name,
-        embeddings,
-        st.session_state.text,
-        namespace=st.session_state.namespace,
-    )
+        st.session_state.speculative_search = st.checkbox(
+            "Paralelna pretraga interneta",
+            value=False,
+            help="Pretraga interneta kreće zajedno sa pretragom indeksa, pa je odgovor brži kada u indeksu nema teme. Troši Serper upit i kada nije potreban.",
+        )
+        st.session_state.answer_cache = st.checkbox(
+            "Koristi ranije odgovore",
+            value=True,
+            help="Na isto ili vrlo slično pitanje, za isti model i oblast, vraća se već generisan tekst.",
+        )
 
     # Prompt template - Loading text from the file
     prompt_file = st.file_uploader(
@@ -179,12 +164,61 @@ def main():
             height=150,
         )
         submit_button = st.form_submit_button(label="Submit")
-        st.session_state.tematika = vectorstore.similarity_search_with_score(
-            zahtev, k=3
+    # isto ili skoro isto pitanje za isti model, stil i oblast - odgovor iz keša, bez nove generacije
+    cached = None
+    if submit_button and st.session_state.answer_cache:
+        cached = lookup_answer(
+            zahtev,
+            st.session_state.model,
+            st.session_state.stil,
+            st.session_state.namespace,
+            st.session_state.temp,
         )
+        if cached is not None:
+            st.session_state.odgovor = cached.answer
+            st.info(
+                f"Odgovor je ranije generisan za slično pitanje (sličnost {cached.similarity:.3f})."
+            )
     # pocinje obrada, prvo se pronalazi tematika, zatim stil i na kraju se generise odgovor
-    if submit_button:
-        with st.spinner("Obrađujem temu..."):
+    if submit_button and cached is None:
+        with st.spinner("Obrađujem temu..."), request_trace(
+            "Pisi_u_stilu_FT", model=st.session_state.model
+        ):
+            # LangChain i Pinecone se ucitavaju tek uz prvi zahtev, da se stranica prikaze odmah
+            from langchain.chains import LLMChain
+            from langchain.chat_models import ChatOpenAI
+            from langchain_core.prompts import (
+                ChatPromptTemplate,
+                HumanMessagePromptTemplate,
+                SystemMessagePromptTemplate,
+            )
+
+            # define model, vestorstore and retriever
+            llm = ChatOpenAI(
+                model_name=st.session_state.model,
+                temperature=st.session_state.temp,
+                openai_api_key=openai_api_key,
+                streaming=True,
+                # zajednicki pool konekcija - bez novog TLS handshake-a po zahtevu
+                http_client=http_client(),
+            )
+            vectorstore = from_existing_index(
+                st.session_state.index_name,
+                embeddings,
+                st.session_state.text,
+                namespace=st.session_state.namespace,
+                project="embedings",
+            )
+
+            # internet se pretrazuje unapred, za slucaj da u indeksu nema dovoljno dobrih dokumenata
+            web_future = start_search(zahtev) if st.session_state.speculative_search else None
+            st.session_state.tematika = similarity_search_with_score(
+                vectorstore,
+                st.session_state.index_name,
+                st.session_state.namespace,
+                zahtev,
+                k=3,
+            )
             broj = 1
             doclist = []
             uk_teme = ""
@@ -199,13 +233,22 @@ def main():
                         f"Score sličnosti za dokument broj {broj} je: {round(score, 2)}"
                     )
                     # Now, selected_docs contains the page content of documents with a score greater than st.session_state.thold
-            uk_teme = doclist
+            # bez duplikata i u okviru budzeta tokena (context_builder.py)
+            uk_teme = build_context(
+                matches_from_documents(st.session_state.tematika),
+                zahtev,
+                score=st.session_state.thold,
+            )
             # ako ne pronadje temu u indexu, trazi na internetu
             if len(doclist) == 0:
                 st.info(
                     "Nisam u mogućnosti da pronađem odgovor u indeksu. Pretražujem internet..."
                 )
-                uk_teme = search.results(zahtev)
+                with span("serper.wait"):
+                    uk_teme = web_future.result() if web_future else search_results(zahtev)
+            elif web_future is not None:
+                # indeks je dovoljan - pretraga se otkazuje ako nije pocela, a rezultat se ne koristi
+                web_future.cancel()
             st.info(
                 f"Za relevantnost veću od {st.session_state.thold} broj pronađenih dokumenata je {len(doclist)} "
             )
@@ -234,50 +277,38 @@ def main():
                 )
             # Run chain to get chatbot's answer
             with st.spinner("Pišem tekst..."):
+                stream_box = st.empty()
+                stream_handler = TimedStreamHandler(
+                    stream_box, title="FINALNI TEKST"
+                )
                 try:
-                    st.session_state.odgovor = chain.run(prompt=prompt)
+                    with span("llm", model=st.session_state.model):
+                        st.session_state.odgovor = chain.run(
+                            prompt=prompt, callbacks=[stream_handler]
+                        )
+                    record_metrics(
+                        "Pisi_u_stilu_FT", st.session_state.model, stream_handler.metrics()
+                    )
+                    store_answer(
+                        zahtev,
+                        st.session_state.model,
+                        st.session_state.stil,
+                        st.session_state.namespace,
+                        st.session_state.odgovor,
+                        st.session_state.temp,
+                    )
+                    st.caption(metrics_caption(stream_handler.metrics()))
                 except Exception as e:
                     st.warning(
                         f"Nisam u mogućnosti da završim tekst. Ovo je opis greške:\n {e}"
                     )
+                stream_box.empty()
 
     # Izrada verzija tekstova za fajlove formnata po izboru
-    # html to docx
     if st.session_state.odgovor != "":
         with st.expander("FINALNI TEKST", expanded=True):
             st.markdown(st.session_state.odgovor)
-        html = markdown.markdown(st.session_state.odgovor)
-        buf = html2docx(html, title="Zapisnik")
-
-        options = {
-            "encoding": "UTF-8",  # Set the encoding to UTF-8
-            "no-outline": None,
-            "quiet": "",
-        }
-        try:
-            pdf_data = pdfkit.from_string(html, cover_first=False, options=options)
-            st.download_button(
-                label="Download TekstuStilu.pdf",
-                data=pdf_data,
-                file_name="TekstuStilu.pdf",
-                mime="application/octet-stream",
-            )
-        except:
-            st.write(
-                "Za pdf fajl restartujte app za 5 minuta. Osvezavanje aplikacije je u toku"
-            )
-        st.download_button(
-            "Download TekstuStilu.txt",
-            st.session_state.odgovor,
-            file_name="TekstuStilu.txt",
-        )
-
-        st.download_button(
-            label="Download TekstuStilu.docx",
-            data=buf.getvalue(),
-            file_name="TekstuStilu.docx",
-            mime="docx",
-        )
+        download_buttons(st.session_state.odgovor)
 
     # if prompt := st.chat_input(placeholder="Unesite komentare na rad programa."):
     #     st.session_state["user_feedback"] = prompt
@@ -3,22 +3,14 @@
 # uvoze se biblioteke
 import os
 import streamlit as st
-import pinecone
-from langchain.chat_models import ChatOpenAI
-from langchain.chains import LLMChain
-from langchain.prompts.chat import (
-    SystemMessagePromptTemplate,
-    HumanMessagePromptTemplate,
-    ChatPromptTemplate,
-)
-from html2docx import html2docx
 from myfunc.mojafunkcija import st_style, positive_login, open_file, init_cond_llm
-import markdown
-import pdfkit
-from pinecone_text.sparse import BM25Encoder
-from openai import OpenAI
-
-client = OpenAI()
+from export import download_buttons
+from streaming import TimedStreamHandler, metrics_caption, record_metrics
+from retrieval import HybridRetriever, MultiNamespaceRetriever
+from context_builder import build_context
+from clients import http_client
+from vector_store import get_index
+from tracing import request_trace, span
 
 version = "16.11.23. Hybrid - OpenAI"
 
@@ -26,11 +18,6 @@ version = "16.11.23. Hybrid - OpenAI"
 def main():
     # Retrieving API keys from env
     openai_api_key = os.environ.get("OPENAI_API_KEY")
-    # Initialize Pinecone
-    pinecone.init(
-        api_key=os.environ["PINECONE_API_KEY_POS"],
-        environment=os.environ["PINECONE_ENVIRONMENT_POS"],
-    )
     # Initialize OpenAI embeddings
     # embeddings = OpenAIEmbeddings()
 
@@ -105,11 +92,6 @@ def main():
             0.01,
             help="Koeficijent koji određuje kolji će biti prag relevantnosti dokumenata uzetih u obzir za odgovore. 0 je svi dokumenti, veci broj je stroziji kriterijum. Score u hybrid searchu moze biti proizvoljno veliki.",
         )
-    # define model, vestorstore and retriever
-    # vazno ako ne stavimo u session state, jako usporava jer inicijalizacija dugo traje!
-
-    index = pinecone.Index("positive")
-
     with st.sidebar:
         st.session_state.namespace = st.selectbox(
             "Odaberite AI asitenta za oblast",
@@ -120,12 +102,18 @@ def main():
                 "bis",
             ),
         )
+        st.session_state.search_all = st.checkbox(
+            "Pretraži sve oblasti",
+            value=False,
+            help="Pretražuje odabrane oblasti istovremeno i spaja najbolje rezultate, kada nije jasno u kojoj je oblasti odgovor.",
+        )
+        if st.session_state.search_all:
+            st.session_state.namespaces = st.multiselect(
+                "Oblasti za pretragu",
+                ["pravnik", "positive", "zapisnici", "bis"],
+                default=["pravnik", "positive", "zapisnici", "bis"],
+            )
     zahtev = ""
-    llm = ChatOpenAI(
-        model_name=st.session_state.model,
-        temperature=st.session_state.temp,
-        openai_api_key=openai_api_key,
-    )
 
     # Prompt template - Loading text from the file
     prompt_file = st.file_uploader(
@@ -151,126 +139,98 @@ def main():
 
     # pocinje obrada, prvo se pronalazi tematika, zatim stil i na kraju se generise odgovor
     if zahtev != " " and zahtev != "":
-        with st.spinner("Obrađujem temu..."):
-            uk_teme = ""
-
-            def get_embedding(text, model="text-embedding-ada-002"):
-                text = text.replace("\n", " ")
-                return client.embeddings.create(input=[text], model=model).data[0].embedding
-
-            def hybrid_score_norm(dense, sparse, alpha: float):
-                """Hybrid score using a convex combination
-
-                alpha * dense + (1 - alpha) * sparse
-
-                Args:
-                    dense: Array of floats representing
-                    sparse: a dict of `indices` and `values`
-                    alpha: scale between 0 and 1
-                """
-                if alpha < 0 or alpha > 1:
-                    raise ValueError("Alpha must be between 0 and 1")
-                hs = {
-                    "indices": sparse["indices"],
-                    "values": [v * (1 - alpha) for v in sparse["values"]],
-                }
-
-                return [v * alpha for v in dense], hs
-
-            def hybrid_query(question, top_k, alpha):
-                bm25 = BM25Encoder().fit([question])
-                sparse_vector = bm25.encode_queries(question)
-                dense_vector = get_embedding(question)
-                hdense, hsparse = hybrid_score_norm(
-                    dense_vector, sparse_vector, alpha=st.session_state.alpha
-                )
+        with request_trace("Pisi_u_stilu_Hybrid", model=st.session_state.model):
+            # LangChain i Pinecone se ucitavaju tek uz prvi zahtev, da se stranica prikaze odmah
+            from langchain.chains import LLMChain
+            from langchain.chat_models import ChatOpenAI
+            from langchain_core.prompts import (
+                ChatPromptTemplate,
+                HumanMessagePromptTemplate,
+                SystemMessagePromptTemplate,
+            )
 
-                result = index.query(
-                    top_k=top_k,
-                    vector=hdense,
-                    alpha=alpha,
-                    sparse_vector=hsparse,
-                    include_metadata=True,
-                    namespace=st.session_state.namespace,
+            # define model, vestorstore and retriever
+            llm = ChatOpenAI(
+                model_name=st.session_state.model,
+                temperature=st.session_state.temp,
+                openai_api_key=openai_api_key,
+                streaming=True,
+                # zajednicki pool konekcija - bez novog TLS handshake-a po zahtevu
+                http_client=http_client(),
+            )
+            index = get_index("positive", project="positive")
+            with st.spinner("Obrađujem temu..."):
+                if st.session_state.search_all:
+                    # svi odabrani namespace-ovi istovremeno, spojeni po score-u
+                    retriever = MultiNamespaceRetriever(
+                        index, st.session_state.namespaces, index_name="positive"
+                    )
+                    st.session_state.tematika = retriever.query(
+                        zahtev,
+                        top_k=st.session_state.broj_k,
+                        alpha=st.session_state.alpha,
+                        min_score=st.session_state.score,
+                    )
+                    for namespace, reason in retriever.skipped.items():
+                        st.warning(f"Oblast {namespace} je preskočena ({reason})")
+                else:
+                    retriever = HybridRetriever(
+                        index, st.session_state.namespace, index_name="positive"
+                    )
+                    st.session_state.tematika = retriever.query(
+                        zahtev, top_k=st.session_state.broj_k, alpha=st.session_state.alpha
+                    )
+                for ind, item in enumerate(st.session_state.tematika):
+                    if item.score > st.session_state.score:
+                        oblast = item.metadata.get("namespace", st.session_state.namespace)
+                        st.info(f"Za odgovor broj {ind + 1} ({oblast}) score je {item.score}")
+                uk_teme = build_context(
+                    st.session_state.tematika, zahtev, score=st.session_state.score
                 )
-                # return search results as dict
 
-                return result.to_dict()
-
-            # st.session_state.tematika = vectorstore.get_relevant_documents(zahtev)
-            st.session_state.tematika = hybrid_query(
-                zahtev, top_k=st.session_state.broj_k, alpha=st.session_state.alpha
+            # Read prompt template from the file
+            sve_zajedno = open_file("prompt_FT.txt")
+            system_message_prompt = SystemMessagePromptTemplate.from_template(
+                st.session_state.stil
             )
-            for ind, item in enumerate(st.session_state.tematika["matches"]):
-                if item["score"] > st.session_state.score:
-                    st.info(f'Za odgovor broj {ind + 1} score je {item["score"]}')
-                    uk_teme += item["metadata"]["context"] + "\n\n"
-
-        # Read prompt template from the file
-        sve_zajedno = open_file("prompt_FT.txt")
-        system_message_prompt = SystemMessagePromptTemplate.from_template(
-            st.session_state.stil
-        )
-        system_message = system_message_prompt.format()
-        human_message_prompt = HumanMessagePromptTemplate.from_template(sve_zajedno)
-        human_message = human_message_prompt.format(
-            zahtev=zahtev, uk_teme=uk_teme, ft_model=ft_model
-        )
-        prompt = ChatPromptTemplate(messages=[system_message, human_message])
+            system_message = system_message_prompt.format()
+            human_message_prompt = HumanMessagePromptTemplate.from_template(sve_zajedno)
+            human_message = human_message_prompt.format(
+                zahtev=zahtev, uk_teme=uk_teme, ft_model=ft_model
+            )
+            prompt = ChatPromptTemplate(messages=[system_message, human_message])
 
-        # Create LLM chain with chatbot prompt
-        chain = LLMChain(llm=llm, prompt=prompt)
+            # Create LLM chain with chatbot prompt
+            chain = LLMChain(llm=llm, prompt=prompt)
 
-        with st.expander("Model i Prompt", expanded=False):
-            st.write(
-                f"Korišćen je prompt: {prompt.messages[0].content} ->  {prompt.messages[1].content} - >"
-            )
-        # Run chain to get chatbot's answer
-        with st.spinner("Pišem tekst..."):
-            try:
-                st.session_state.odgovor = chain.run(prompt=prompt)
-            except Exception as e:
-                st.warning(
-                    f"Nisam u mogućnosti da završim tekst. Ovo je opis greške:\n {e}"
+            with st.expander("Model i Prompt", expanded=False):
+                st.write(
+                    f"Korišćen je prompt: {prompt.messages[0].content} ->  {prompt.messages[1].content} - >"
                 )
+            # Run chain to get chatbot's answer
+            with st.spinner("Pišem tekst..."):
+                stream_box = st.empty()
+                stream_handler = TimedStreamHandler(stream_box, title="FINALNI TEKST")
+                try:
+                    with span("llm", model=st.session_state.model):
+                        st.session_state.odgovor = chain.run(
+                            prompt=prompt, callbacks=[stream_handler]
+                        )
+                    record_metrics(
+                        "Pisi_u_stilu_Hybrid", st.session_state.model, stream_handler.metrics()
+                    )
+                    st.caption(metrics_caption(stream_handler.metrics()))
+                except Exception as e:
+                    st.warning(
+                        f"Nisam u mogućnosti da završim tekst. Ovo je opis greške:\n {e}"
+                    )
+                stream_box.empty()
 
     # Izrada verzija tekstova za fajlove formnata po izboru
-    # html to docx
     if st.session_state.odgovor != "":
         with st.expander("FINALNI TEKST", expanded=True):
             st.markdown(st.session_state.odgovor)
-        html = markdown.markdown(st.session_state.odgovor)
-        buf = html2docx(html, title="Zapisnik")
-
-        options = {
-            "encoding": "UTF-8",  # Set the encoding to UTF-8
-            "no-outline": None,
-            "quiet": "",
-        }
-        try:
-            pdf_data = pdfkit.from_string(html, cover_first=False, options=options)
-            st.download_button(
-                label="Download TekstuStilu.pdf",
-                data=pdf_data,
-                file_name="TekstuStilu.pdf",
-                mime="application/octet-stream",
-            )
-        except:
-            st.write(
-                "Za pdf fajl restartujte app za 5 minuta. Osvezavanje aplikacije je u toku"
-            )
-        st.download_button(
-            "Download TekstuStilu.txt",
-            st.session_state.odgovor,
-            file_name="TekstuStilu.txt",
-        )
-
-        st.download_button(
-            label="Download TekstuStilu.docx",
-            data=buf.getvalue(),
-            file_name="TekstuStilu.docx",
-            mime="docx",
-        )
+        download_buttons(st.session_state.odgovor)
 
 
 # Login
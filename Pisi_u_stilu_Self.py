@@ -3,15 +3,13 @@
 # uvoze se biblioteke
 import os
 import streamlit as st
-import pinecone
-from langchain.embeddings.openai import OpenAIEmbeddings
-from langchain.vectorstores.pinecone import Pinecone
-from langchain.chat_models import ChatOpenAI
-from langchain.retrievers.self_query.base import SelfQueryRetriever
-from langchain.chains.query_constructor.base import AttributeInfo
-from html2docx import html2docx
-import markdown
-import pdfkit
+from embedding_cache import CachedOpenAIEmbeddings
+from clients import http_client
+from vector_store import from_existing_index, self_query_translator
+from retrieval_cache import self_query
+from tracing import request_trace, span
+from llm_cache import install as install_llm_cache
+from export import download_buttons
 from myfunc.mojafunkcija import st_style, positive_login, init_cond_llm
 
 # glavna funkcija
@@ -31,33 +29,11 @@ def main():
     )
     openai_api_key = os.environ.get("OPENAI_API_KEY")
 
-    # Initialize Pinecone
-    pinecone.init(
-        api_key=os.environ["PINECONE_API_KEY"],
-        environment=os.environ["PINECONE_API_ENV"],
-    )
-
     # Initialize OpenAI embeddings
-    embeddings = OpenAIEmbeddings()
-
-    # Define metadata fields
-    metadata_field_info = [
-        AttributeInfo(name="title", description="Tema dokumenta", type="string"),
-        AttributeInfo(name="keyword", description="reci za pretragu", type="string"),
-        AttributeInfo(
-            name="text", description="The Content of the document", type="string"
-        ),
-        AttributeInfo(
-            name="source", description="The Source of the document", type="string"
-        ),
-    ]
-
-    # Define document content description
-    document_content_description = "Sistematizacija radnih mesta"
+    embeddings = CachedOpenAIEmbeddings()
 
     # Initialize OpenAI embeddings and LLM and all variables
     model, temp = init_cond_llm()
-    llm = ChatOpenAI(model_name=model, temperature=temp, openai_api_key=openai_api_key)
 
     if "namespace" not in st.session_state:
         st.session_state.namespace = "sistematizacija3"
@@ -67,21 +43,6 @@ def main():
     # Izbor stila i teme
     st.subheader("Using Self Query")
 
-    vectorstore = Pinecone.from_existing_index(
-        st.session_state.index_name,
-        embeddings,
-        st.session_state.text,
-        namespace=st.session_state.namespace,
-    )
-    retriever = SelfQueryRetriever.from_llm(
-        llm,
-        vectorstore,
-        document_content_description,
-        metadata_field_info,
-        enable_limit=True,
-        verbose=True,
-    )
-
     # Prompt template - Loading text from the file
 
     with st.form(key="stilovi", clear_on_submit=False):
@@ -97,15 +58,67 @@ def main():
         # pocinje obrada, prvo se pronalazi tematika, zatim stil i na kraju se generise odgovor
 
         if submit_button:
-            with st.spinner("Obradjujem temu..."):
-                docs = retriever.get_relevant_documents(zahtev)
+            with st.spinner("Obradjujem temu..."), request_trace("Pisi_u_stilu_Self"):
+                # LangChain i Pinecone se ucitavaju tek uz prvi zahtev, da se stranica prikaze odmah
+                from langchain.chains.query_constructor.base import AttributeInfo
+                from langchain.chat_models import ChatOpenAI
+                from langchain.retrievers.self_query.base import SelfQueryRetriever
+
+                # Define metadata fields
+                metadata_field_info = [
+                    AttributeInfo(name="title", description="Tema dokumenta", type="string"),
+                    AttributeInfo(name="keyword", description="reci za pretragu", type="string"),
+                    AttributeInfo(
+                        name="text", description="The Content of the document", type="string"
+                    ),
+                    AttributeInfo(
+                        name="source", description="The Source of the document", type="string"
+                    ),
+                ]
+
+                # Define document content description
+                document_content_description = "Sistematizacija radnih mesta"
+
+                llm = ChatOpenAI(
+                    model_name=model,
+                    temperature=temp,
+                    openai_api_key=openai_api_key,
+                    http_client=http_client(),
+                )
+                # sa temperaturom 0 konstrukcija upita i odgovor idu kroz cache odgovora
+                install_llm_cache()
+                vectorstore = from_existing_index(
+                    st.session_state.index_name,
+                    embeddings,
+                    st.session_state.text,
+                    namespace=st.session_state.namespace,
+                    project="embedings",
+                )
+                retriever = SelfQueryRetriever.from_llm(
+                    llm,
+                    vectorstore,
+                    document_content_description,
+                    metadata_field_info,
+                    enable_limit=True,
+                    verbose=True,
+                    structured_query_translator=self_query_translator(),
+                )
+                # SelfQueryRetriever vraca podrazumevani broj dokumenata (4)
+                docs = self_query(
+                    retriever,
+                    st.session_state.index_name,
+                    st.session_state.namespace,
+                    zahtev,
+                    4,
+                )
                 prompt = f"Relevant documents: {docs}\n\nBased on the documents, answer the question: {zahtev}"
                 # zameniti predict za llmchain
                 with st.expander("PROMPT", expanded=False):
                     st.write(prompt)
 
                 try:
-                    st.session_state.odgovor = llm.predict(prompt)
+                    with span("llm"):
+                        st.session_state.odgovor = llm.predict(prompt)
 
                     # Izrada verzija tekstova za fajlove formnata po izboru
                     with st.expander("FINALNI TEKST", expanded=True):
@@ -114,35 +127,10 @@ def main():
                     st.warning(
                         f"Nisam u mogucnosti za zavrsim tekst. Pokusajte sa modelom koji ima veci kontekst. {e}"
                     )
-    # html to docx
-    html = markdown.markdown(st.session_state.odgovor)
-    buf = html2docx(html, title="Zapisnik")
-    # create pdf
-    options = {
-        "encoding": "UTF-8",  # Set the encoding to UTF-8
-        "no-outline": None,
-        "quiet": "",
-    }
-    pdf_data = pdfkit.from_string(html, False, options=options)
-
-    with st.sidebar:
-        st.download_button(
-            "Download TekstuStilu.txt",
-            st.session_state.odgovor,
-            file_name="TekstuStilu.txt",
-        )
-        st.download_button(
-            label="Download TekstuStilu.pdf",
-            data=pdf_data,
-            file_name="TekstuStilu.pdf",
-            mime="application/octet-stream",
-        )
-        st.download_button(
-            label="Download TekstuStilu.docx",
-            data=buf.getvalue(),
-            file_name="TekstuStilu.docx",
-            mime="docx",
-        )
+    # fajlovi za download se prave tek kad postoji odgovor i kad ih korisnik zatrazi
+    if st.session_state.odgovor != "":
+        with st.sidebar:
+            download_buttons(st.session_state.odgovor)
 
 
 # Login
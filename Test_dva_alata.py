@@ -1,26 +1,19 @@
 import os
 import sys
-import io
-from openai import OpenAI
-
-client = OpenAI()
-import pinecone
 import streamlit as st
-from langchain.embeddings.openai import OpenAIEmbeddings
-from langchain.vectorstores.pinecone import Pinecone
-from langchain.retrievers.self_query.base import SelfQueryRetriever
-from langchain.chains.query_constructor.base import AttributeInfo
-from pinecone_text.sparse import BM25Encoder
-from langchain.agents import create_csv_agent
-from langchain.agents import Tool, AgentType, initialize_agent
-from langchain.chat_models import ChatOpenAI
-from langchain.utilities import GoogleSerperAPIWrapper
-from langchain.memory import ConversationBufferWindowMemory
-from langchain.prompts import (
+from langchain_core.prompts import (
     ChatPromptTemplate,
     SystemMessagePromptTemplate,
     HumanMessagePromptTemplate,
 )
+from retrieval import HybridRetriever
+from context_builder import build_context
+from agent_pool import PooledAgent, agent_key, get_executor
+from fast_path import answer_csv
+from tracing import AgentTraceHandler, request_trace, span
+from llm_cache import install as install_llm_cache
+from clients import http_client
+from vector_store import get_index
 from myfunc.mojafunkcija import (
     st_style,
     positive_login,
@@ -34,6 +27,8 @@ from myfunc.mojafunkcija import (
 # setup stranica
 st.set_page_config(page_title="Multi Tool Chatbot", page_icon="👉", layout="wide")
 st_style()
+# pozivi sa temperaturom 0 (self-query, CSV agent, agent sa temp 0) idu kroz cache odgovora
+install_llm_cache()
 
 
 # prebaciti u mojafunkcija ?
@@ -171,13 +166,16 @@ def app_setup():
 
 # citanje csv fajla i pretraga po njemu
 def read_csv(upit):
-    agent = create_csv_agent(
-        ChatOpenAI(temperature=0),
-        st.session_state.uploaded_file.name,
-        verbose=True,
-        agent_type=AgentType.OPENAI_FUNCTIONS,
-        handle_parsing_errors=True,
+    # jednostavna pitanja (koliko, ukupno, prosek, top N) se racunaju direktno, bez agenta
+    odgovor = answer_csv(
+        st.session_state.fix_prompt if st.session_state.input_prompt == True else upit,
+        st.session_state.csv_digest,
     )
+    if odgovor is not None:
+        return odgovor
+    from csv_store import get_csv_agent
+
+    agent = get_csv_agent(st.session_state.csv_digest)
     # za prosledjivanje originalnog prompta alatu alternativa je upit
     if st.session_state.input_prompt == True:
         odgovor = agent.run(st.session_state.fix_prompt)
@@ -191,74 +189,61 @@ def read_csv(upit):
 
 # hybrid search - kombinacija semantic i selfquery metoda po kljucnoj reci
 def hybrid_query(upit):
-    # Initialize Pinecone
-    pinecone.init(
-        api_key=os.environ["PINECONE_API_KEY_POS"],
-        environment=os.environ["PINECONE_ENVIRONMENT_POS"],
-    )
     # # Initialize OpenAI embeddings
     # embeddings = OpenAIEmbeddings()
     index_name = "bis"
-    index = pinecone.Index(index_name)
+    index = get_index(index_name, project="positive")
     # za prosledjivanje originalnog prompta alatu alternativa je upit
     if st.session_state.input_prompt == True:
         ceo_odgovor = st.session_state.fix_prompt
     else:
         ceo_odgovor = upit
-    odgovor = ""
-
-    def get_embedding(text, model="text-embedding-ada-002"):
-        text = text.replace("\n", " ")
-        return client.embeddings.create(input=[text], model=model)["data"][0][
-            "embedding"
-        ]
-
-    def hybrid_score_norm(dense, sparse, alpha: float):
-        """Hybrid score using a convex combination
-
-        alpha * dense + (1 - alpha) * sparse
-
-        Args:
-            dense: Array of floats representing
-            sparse: a dict of `indices` and `values`
-            alpha: scale between 0 and 1
-        """
-        if alpha < 0 or alpha > 1:
-            raise ValueError("Alpha must be between 0 and 1")
-        hs = {
-            "indices": sparse["indices"],
-            "values": [v * (1 - alpha) for v in sparse["values"]],
-        }
-        return [v * alpha for v in dense], hs
-
-    def hybrid_query(question, top_k, alpha):
-        bm25 = BM25Encoder().default()
-        sparse_vector = bm25.encode_queries(question)
-        dense_vector = get_embedding(question)
-        hdense, hsparse = hybrid_score_norm(
-            dense_vector, sparse_vector, alpha=st.session_state.alpha
-        )
+    retriever = HybridRetriever(
+        index, st.session_state.name_hybrid, index_name=index_name
+    )
+    st.session_state.tematika = retriever.query(
+        ceo_odgovor, top_k=st.session_state.broj_k, alpha=st.session_state.alpha
+    )
+    for ind, item in enumerate(st.session_state.tematika):
+        if item.score > st.session_state.score:
+            st.info(f"Za odgovor broj {ind + 1} score je {item.score}")
+    return build_context(
+        st.session_state.tematika, ceo_odgovor, score=st.session_state.score
+    )
 
-        result = index.query(
-            top_k=top_k,
-            vector=hdense,
-            alpha=alpha,
-            sparse_vector=hsparse,
-            include_metadata=True,
-            namespace=st.session_state.name_hybrid,
-        )
-        # return search results as dict
-        return result.to_dict()
 
-    # st.session_state.tematika = vectorstore.get_relevant_documents(zahtev)
-    st.session_state.tematika = hybrid_query(
-        ceo_odgovor, top_k=st.session_state.broj_k, alpha=st.session_state.alpha
+# agent i alati za jednu konfiguraciju - prave se jednom i drze u agent_pool-u;
+# alati citaju st.session_state tek u trenutku poziva, pa ih dele sve sesije
+def build_agent(model, temp, direct_hybrid, direct_csv) -> PooledAgent:
+    from langchain.agents import Tool, ZeroShotAgent
+    from langchain.chat_models import ChatOpenAI
+
+    # definicija alata - vazno definisati kvalitetno description !!! - videti kako da ne koristi nista ako ne mora, mozda je u promptu agenta?
+    tools = [
+        Tool(
+            name="Hybrid search",
+            func=hybrid_query,
+            verbose=True,
+            description="Useful for when you are asked about topics about sistematizacija radnih mesta.",
+            return_direct=direct_hybrid,
+        ),
+        Tool(
+            name="CSV search",
+            func=read_csv,
+            verbose=True,
+            description="Useful for when you are asked about structured data like numbers, counts or sums",
+            return_direct=direct_csv,
+        ),
+    ]
+    chat = ChatOpenAI(
+        openai_api_key=os.environ.get("OPENAI_API_KEY"),
+        temperature=temp,
+        model=model,
+        streaming=True,
+        http_client=http_client(),
     )
-    for ind, item in enumerate(st.session_state.tematika["matches"]):
-        if item["score"] > st.session_state.score:
-            st.info(f'Za odgovor broj {ind + 1} score je {item["score"]}')
-            odgovor += item["metadata"]["context"] + "\n\n"
-    return odgovor
+    agent = ZeroShotAgent.from_llm_and_tools(llm=chat, tools=tools)
+    return PooledAgent(agent, tools)
 
 
 # pocinje novi chat, brise se memorija
@@ -266,7 +251,8 @@ def new_chat():
     st.session_state["generated"] = []
     st.session_state["past"] = []
     st.session_state["input"] = ""
-    st.session_state.memory.clear()
+    if "memory" in st.session_state:
+        st.session_state.memory.clear()
     st.session_state["messages"] = []
 
 
@@ -282,8 +268,10 @@ def main():
             "Choose a CSV file", accept_multiple_files=False, type="csv", key="csv_key"
         )
         if st.session_state.uploaded_file is not None:
-            with io.open(st.session_state.uploaded_file.name, "wb") as file:
-                file.write(st.session_state.uploaded_file.getbuffer())
+            # parsira se samo novi sadrzaj, isti fajl se uzima iz cache-a
+            from csv_store import store_upload
+
+            st.session_state.csv_digest = store_upload(st.session_state.uploaded_file)
 
     if "generated" not in st.session_state:
         st.session_state["generated"] = []
@@ -296,26 +284,6 @@ def main():
     if "messages" not in st.session_state:
         st.session_state["messages"] = []
 
-    search = GoogleSerperAPIWrapper()
-
-    # definicija alata - vazno definisati kvalitetno description !!! - videti kako da ne koristi nista ako ne mora, mozda je u promptu agenta?
-    st.session_state.tools = [
-        Tool(
-            name="Hybrid search",
-            func=hybrid_query,
-            verbose=True,
-            description="Useful for when you are asked about topics about sistematizacija radnih mesta.",
-            return_direct=st.session_state.direct_hybrid,
-        ),
-        Tool(
-            name="CSV search",
-            func=read_csv,
-            verbose=True,
-            description="Useful for when you are asked about structured data like numbers, counts or sums",
-            return_direct=st.session_state.direct_csv,
-        ),
-    ]
-
     download_str = []
     if "open_api_key" not in st.session_state:
         # Retrieving API keys from env
@@ -326,10 +294,6 @@ def main():
         # Retrieving API keys from env
         st.session_state.SERPER_API_KEY = os.environ.get("SERPER_API_KEY")
 
-    if "memory" not in st.session_state:
-        st.session_state.memory = ConversationBufferWindowMemory(
-            memory_key="chat_history", return_messages=True, k=4
-        )
     if "sistem" not in st.session_state:
         st.session_state.sistem = open_file("prompt_turbo.txt")
     if "odgovor" not in st.session_state:
@@ -364,13 +328,6 @@ def main():
             st.session_state.stream_handler = StreamHandler(pholder)
     st.session_state.stream_handler.reset_text()
 
-    chat = ChatOpenAI(
-        openai_api_key=st.session_state.open_api_key,
-        temperature=temp,
-        model=model,
-        streaming=True,
-        callbacks=[st.session_state.stream_handler],
-    )
     upit = []
 
     if upit := st.chat_input("Postavite pitanje"):
@@ -380,20 +337,26 @@ def main():
         # prompt[0] je system message, prompt[1] je tekuce pitanje
         pitanje = formatted_prompt[0].content + formatted_prompt[1].content
 
-        with placeholder.container():
+        with placeholder.container(), request_trace("Test_dva_alata", model=model):
             st_redirect = StreamlitRedirect()
             sys.stdout = st_redirect
             # za prosledjivanje originalnog prompta alatu
             st.session_state.fix_prompt = pitanje
+            # memorija (langchain.memory) se pravi uz prvo pitanje, ne pri prikazu stranice
+            if "memory" not in st.session_state:
+                from langchain.memory import ConversationBufferWindowMemory
+
+                st.session_state.memory = ConversationBufferWindowMemory(
+                    memory_key="chat_history", return_messages=True, k=4
+                )
 
             #
             # testirati sa razlicitim agentima i prompt template-ima !!!
             #
-            agent_chain = initialize_agent(
-                tools=st.session_state.tools,
-                llm=chat,
-                agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
-                messages=st.session_state.chat_prompt,
+            direct = (st.session_state.direct_hybrid, st.session_state.direct_csv)
+            agent_chain = get_executor(
+                agent_key("test_dva_alata", model, tools=direct, temperature=temp),
+                lambda: build_agent(model, temp, *direct),
                 verbose=True,
                 memory=st.session_state.memory,
                 handle_parsing_errors=True,
@@ -406,7 +369,14 @@ def main():
             st.caption(
                 f"Broj dokumenata: {st.session_state.broj_k}, Namsepace Hybrid: {st.session_state.name_hybrid}, Score: {st.session_state.score} "
             )
-            output = agent_chain.invoke(input=pitanje)
+            # span za svaki alat i poziv LLM-a, i broj iteracija agenta
+            with span("agent", model=model) as agent_attrs:
+                agent_trace = AgentTraceHandler()
+                output = agent_chain.invoke(
+                    input=pitanje,
+                    config={"callbacks": [st.session_state.stream_handler, agent_trace]},
+                )
+                agent_attrs.update(agent_trace.stats())
             output_text = output.get("output", "")
 
             #            output_text = chat.predict(pitanje)
@@ -0,0 +1,100 @@
+# pool gotovih agenata na nivou procesa - LLM, prompt, agent i alati se prave jednom po konfiguraciji,
+# a po pitanju se pravi samo AgentExecutor (memorija sesije, callback-ovi) i stanje zahteva
+
+import contextvars
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Hashable, List, NamedTuple
+
+from cachetools import LRUCache
+
+AGENT_POOL_SIZE = int(os.environ.get("AGENT_POOL_SIZE", "16"))
+
+
+class PooledAgent(NamedTuple):
+    agent: Any
+    tools: List[Any]
+
+
+_agents = LRUCache(maxsize=AGENT_POOL_SIZE)
+_building = {}
+_lock = threading.Lock()
+
+# stanje tekuceg pitanja (pitanje, session_state...) - alati ga citaju umesto closure-a,
+# pa isti alati mogu da sluze sve sesije; ParallelAgentExecutor ga kopira u svoje thread-ove
+_request_state = contextvars.ContextVar("agent_request_state")
+
+
+def agent_key(name: str, model: str, namespace: str = "", tools: tuple = (), **options) -> tuple:
+    """Kljuc za pool.
+
+    Args:
+        name: koji agent (aplikacija)
+        namespace: samo ako je ugradjen u alate; alati koji ga citaju iz
+            stanja zahteva ne treba da cepaju pool
+        tools: sve sto menja skup ili ponasanje alata (npr. return_direct)
+        options: ostala podesavanja ugradjena u agenta (npr. temperature)
+    """
+    return (name, model, namespace or "", tuple(tools), tuple(sorted(options.items())))
+
+
+def get_agent(key: Hashable, build: Callable[[], PooledAgent]) -> PooledAgent:
+    """Vraca agenta iz pool-a; svaka konfiguracija se gradi samo jednom."""
+    with _lock:
+        pooled = _agents.get(key)
+        if pooled is not None:
+            return pooled
+        key_lock = _building.setdefault(key, threading.Lock())
+    with key_lock:
+        with _lock:
+            pooled = _agents.get(key)
+        if pooled is None:
+            pooled = build()
+            with _lock:
+                _agents[key] = pooled
+                _building.pop(key, None)
+    return pooled
+
+
+def get_executor(
+    key: Hashable,
+    build: Callable[[], PooledAgent],
+    executor_cls=None,
+    **executor_kwargs,
+):
+    """Lagani AgentExecutor oko agenta iz pool-a.
+
+    Executor nosi samo stanje jednog pitanja (memory, max_iterations...), pa
+    se pravi po pozivu, a callback-ovi se prosledjuju pri pokretanju.
+    Podrazumevani `executor_cls` je langchain.agents.AgentExecutor.
+    """
+    if executor_cls is None:
+        from langchain.agents import AgentExecutor
+
+        executor_cls = AgentExecutor
+    pooled = get_agent(key, build)
+    return executor_cls.from_agent_and_tools(
+        agent=pooled.agent, tools=pooled.tools, **executor_kwargs
+    )
+
+
+@contextmanager
+def request_state(**state):
+    token = _request_state.set(state)
+    try:
+        yield state
+    finally:
+        _request_state.reset(token)
+
+
+def current_state() -> dict:
+    try:
+        return _request_state.get()
+    except LookupError:
+        raise RuntimeError("Agent tool called outside of request_state()") from None
+
+
+def clear():
+    with _lock:
+        _agents.clear()
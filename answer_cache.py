@@ -0,0 +1,148 @@
+# semanticki cache odgovora - isto ili skoro isto pitanje za isti model, stil i oblast (namespace)
+# dobija sacuvani odgovor umesto nove generacije
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from embedding_cache import EMBEDDING_MODEL, get_embedding
+from tracing import span
+
+ANSWER_CACHE_PATH = os.environ.get("ANSWER_CACHE_PATH", ".cache/answers.sqlite")
+# kosinusna slicnost pitanja od koje se vraca sacuvani odgovor
+ANSWER_CACHE_THRESHOLD = float(os.environ.get("ANSWER_CACHE_THRESHOLD", "0.97"))
+ANSWER_CACHE_TTL = float(os.environ.get("ANSWER_CACHE_TTL", str(7 * 24 * 3600)))
+ANSWER_CACHE_MAX_ENTRIES = int(os.environ.get("ANSWER_CACHE_MAX_ENTRIES", "5000"))
+# ako je zadato, kesiraju se samo zahtevi sa temperaturom <= ove vrednosti
+_max_temperature = os.environ.get("ANSWER_CACHE_MAX_TEMPERATURE", "")
+ANSWER_CACHE_MAX_TEMPERATURE = float(_max_temperature) if _max_temperature else None
+
+
+class CachedAnswer(NamedTuple):
+    answer: str
+    question: str
+    similarity: float
+
+
+def scope_key(model: str, style: str, namespace: str) -> str:
+    """Odgovor vazi samo za isti model, stil (system prompt) i oblast."""
+    return hashlib.sha256(f"{model}\0{style}\0{namespace or ''}".encode("utf-8")).hexdigest()
+
+
+class AnswerCache:
+    """Odgovori sa embeddingom pitanja u SQLite fajlu, deljeni izmedju procesa (WAL).
+
+    Pretraga je linearna po zapisima jednog scope-a (model, stil, namespace);
+    zapisi stariji od `ttl` se ne vracaju i brisu se pri upisu, a preko
+    `max_entries` se izbacuju najduze nekorisceni.
+    """
+
+    def __init__(self, path: str = ANSWER_CACHE_PATH, ttl: float = ANSWER_CACHE_TTL, max_entries: int = ANSWER_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            "id INTEGER PRIMARY KEY, scope TEXT, question TEXT, vector BLOB, answer TEXT, "
+            "created REAL, last_used REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS answers_scope ON answers (scope, created)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS answers_last_used ON answers (last_used)")
+        self._conn.commit()
+
+    def lookup(self, vector: np.ndarray, scope: str, threshold: float = ANSWER_CACHE_THRESHOLD) -> Optional[CachedAnswer]:
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, question, vector, answer FROM answers WHERE scope = ? AND created > ?",
+                (scope, now - self.ttl),
+            ).fetchall()
+        if not rows:
+            return None
+        matrix = np.stack([np.frombuffer(row[2], dtype=np.float32) for row in rows])
+        query = np.asarray(vector, dtype=np.float32)
+        similarity = matrix @ query / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query) + 1e-12)
+        best = int(np.argmax(similarity))
+        if similarity[best] < threshold:
+            return None
+        with self._lock:
+            self._conn.execute("UPDATE answers SET last_used = ? WHERE id = ?", (now, rows[best][0]))
+            self._conn.commit()
+        return CachedAnswer(rows[best][3], rows[best][1], float(similarity[best]))
+
+    def store(self, vector: np.ndarray, scope: str, question: str, answer: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO answers (scope, question, vector, answer, created, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                (scope, question, np.asarray(vector, dtype=np.float32).tobytes(), answer, now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        self._conn.execute("DELETE FROM answers WHERE created <= ?", (now - self.ttl,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM answers WHERE id IN (SELECT id FROM answers ORDER BY last_used LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM answers")
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+
+
+_cache: Optional[AnswerCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache() -> AnswerCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AnswerCache()
+        return _cache
+
+
+def cacheable(temperature: Optional[float]) -> bool:
+    if ANSWER_CACHE_MAX_TEMPERATURE is None or temperature is None:
+        return True
+    return temperature <= ANSWER_CACHE_MAX_TEMPERATURE
+
+
+def lookup_answer(question: str, model: str, style: str, namespace: str, temperature: Optional[float] = None) -> Optional[CachedAnswer]:
+    """Sacuvani odgovor na (skoro) isto pitanje, ili None."""
+    if not cacheable(temperature) or not question.strip():
+        return None
+    with span("answer_cache") as attrs:
+        cached = get_answer_cache().lookup(
+            get_embedding(question, model=EMBEDDING_MODEL), scope_key(model, style, namespace)
+        )
+        attrs["hit"] = cached is not None
+    return cached
+
+
+def store_answer(question: str, model: str, style: str, namespace: str, answer: str, temperature: Optional[float] = None):
+    if not cacheable(temperature) or not question.strip() or not answer:
+        return
+    # embedding pitanja je vec u embedding cache-u od lookup-a
+    get_answer_cache().store(
+        get_embedding(question, model=EMBEDDING_MODEL), scope_key(model, style, namespace), question, answer
+    )
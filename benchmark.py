@@ -0,0 +1,283 @@
+# benchmark faza pipeline-a iz Pisi_u_stilu_FT / Pisi_u_stilu_Hybrid, bez mreze - OpenAI i Pinecone
+# odgovori se pustaju iz snimljenih fixture-a
+#
+#   python benchmark.py --record --questions pitanja.txt      # snima fixture (potrebni kljucevi)
+#   python benchmark.py --synthesize 20                       # fixture iz PRAVILNIK-a, bez mreze
+#   python benchmark.py --save-baseline                       # meri i cuva baseline
+#   python benchmark.py                                       # meri i poredi sa baseline-om
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+FIXTURES_PATH = "bench_fixtures.json"
+BASELINE_PATH = "bench_baseline.json"
+STAGES = ["embed", "bm25", "query", "filter", "prompt", "llm", "render_txt", "render_docx", "render_pdf"]
+
+
+class ReplayIndex:
+    """pinecone.Index koji za svako pitanje vraca snimljeni odgovor, bez mreze."""
+
+    def __init__(self, fixtures: List[dict]):
+        self._responses = {}
+        self._current = None
+        for item in fixtures:
+            self._responses[item["question"]] = item["matches"]
+
+    def use(self, question: str):
+        self._current = question
+
+    def query(self, top_k: int = 10, include_metadata: bool = False, namespace: str = "", **kwargs):
+        from local_index import QueryResponse, ScoredVector
+
+        matches = [
+            ScoredVector(match["id"], match["score"], None, match["metadata"] if include_metadata else None)
+            for match in self._responses[self._current][:top_k]
+        ]
+        return QueryResponse(matches, namespace)
+
+
+class _NullContainer:
+    def markdown(self, text):
+        pass
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    p50, p95, p99 = np.percentile(np.asarray(samples), [50, 95, 99])
+    return {"p50": round(float(p50), 3), "p95": round(float(p95), 3), "p99": round(float(p99), 3), "n": len(samples)}
+
+
+def time_stage(run: Callable[[dict], object], fixtures: List[dict], repeat: int) -> List[float]:
+    """Vreme (ms) jednog poziva faze, za svako pitanje `repeat` puta; prvi krug je zagrevanje."""
+    for item in fixtures:
+        run(item)
+    samples = []
+    for _ in range(repeat):
+        for item in fixtures:
+            started = time.perf_counter()
+            run(item)
+            samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def build_stages(fixtures: List[dict], top_k: int, alpha: float, score: float) -> Dict[str, Callable[[dict], object]]:
+    """Funkcije faza; svaka dobija jedan fixture (pitanje sa snimljenim odgovorima)."""
+    from bm25_model import encode_queries
+    from embedding_cache import EMBEDDING_MODEL, cache_key, get_cache, get_embedding
+    from retrieval import HybridRetriever, hybrid_score_norm, join_context
+
+    # snimljeni embeddinzi idu u (privremeni) cache, pa get_embedding ne ide na mrezu
+    get_cache().put_many(
+        {cache_key(item["question"], EMBEDDING_MODEL): np.asarray(item["embedding"], np.float32) for item in fixtures},
+        EMBEDDING_MODEL,
+    )
+    index = ReplayIndex(fixtures)
+    retriever = HybridRetriever(index, "benchmark", index_name="benchmark")
+    vectors = {
+        item["question"]: hybrid_score_norm(get_embedding(item["question"]), encode_queries(item["question"]), alpha)
+        for item in fixtures
+    }
+    matches = {}
+
+    def query(item):
+        index.use(item["question"])
+        matches[item["question"]] = retriever._query_index(*vectors[item["question"]], top_k)
+
+    stages = {
+        "embed": lambda item: get_embedding(item["question"]),
+        "bm25": lambda item: encode_queries(item["question"]),
+        "query": query,
+        "filter": lambda item: join_context(matches[item["question"]], score),
+    }
+
+    from langchain.chains import LLMChain
+    from langchain.prompts.chat import (
+        ChatPromptTemplate,
+        HumanMessagePromptTemplate,
+        SystemMessagePromptTemplate,
+    )
+    from langchain_community.chat_models.fake import FakeListChatModel
+    from myfunc.mojafunkcija import open_file
+
+    from streaming import TimedStreamHandler
+
+    template = open_file("prompt_FT.txt")
+    prompts = {}
+
+    def prompt(item):
+        system_message = SystemMessagePromptTemplate.from_template(item.get("style", "")).format()
+        human_message = HumanMessagePromptTemplate.from_template(template).format(
+            zahtev=item["question"],
+            uk_teme=join_context(matches[item["question"]], score),
+            ft_model=item.get("model", ""),
+        )
+        prompts[item["question"]] = ChatPromptTemplate(messages=[system_message, human_message])
+
+    def llm(item):
+        chain = LLMChain(llm=FakeListChatModel(responses=[item["answer"]]), prompt=prompts[item["question"]])
+        return chain.run(prompt=prompts[item["question"]], callbacks=[TimedStreamHandler(_NullContainer())])
+
+    stages["prompt"] = prompt
+    stages["llm"] = llm
+
+    from export import render
+
+    for fmt in ("txt", "docx", "pdf"):
+        stages[f"render_{fmt}"] = lambda item, fmt=fmt: render(item["answer"], fmt)
+    return stages
+
+
+def run_benchmark(fixtures: List[dict], repeat: int, top_k: int, alpha: float, score: float) -> Dict[str, dict]:
+    stages = build_stages(fixtures, top_k, alpha, score)
+    results = {}
+    for name in STAGES:
+        try:
+            results[name] = percentiles(time_stage(stages[name], fixtures, repeat))
+        except Exception as error:
+            # npr. nema wkhtmltopdf za PDF - faza se preskace, ostale se mere
+            results[name] = {"skipped": f"{type(error).__name__}: {error}"}
+    return results
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    """Faze kod kojih je p50 ili p95 sporiji od baseline-a za vise od `tolerance`."""
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base or "p50" not in base or "p50" not in current:
+            continue
+        for key in ("p50", "p95"):
+            if current[key] > base[key] * (1 + tolerance) and current[key] - base[key] > 0.05:
+                regressions.append(f"{name} {key}: {base[key]} ms -> {current[key]} ms")
+    return regressions
+
+
+def print_table(results: Dict[str, dict], baseline: Optional[Dict[str, dict]] = None):
+    print(f"{'faza':<12} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'baseline p50':>14}")
+    for name, result in results.items():
+        if "skipped" in result:
+            print(f"{name:<12} preskoceno ({result['skipped']})")
+            continue
+        base = (baseline or {}).get(name, {}).get("p50", "-")
+        print(f"{name:<12} {result['p50']:>10} {result['p95']:>10} {result['p99']:>10} {base:>14}")
+
+
+def record(questions: List[str], index_name: str, project: str, namespace: str, top_k: int, alpha: float, model: str) -> List[dict]:
+    """Snima prave odgovore OpenAI-ja i Pinecone-a za listu pitanja."""
+    from langchain.chat_models import ChatOpenAI
+    from langchain.schema import HumanMessage
+
+    from clients import http_client
+    from embedding_cache import get_embedding
+    from retrieval import HybridRetriever, join_context
+    from vector_store import get_index
+
+    retriever = HybridRetriever(get_index(index_name, project=project), namespace, index_name=index_name)
+    llm = ChatOpenAI(model=model, temperature=0, http_client=http_client())
+    fixtures = []
+    for question in questions:
+        matches = retriever.query(question, top_k=top_k, alpha=alpha)
+        answer = llm.predict_messages(
+            [HumanMessage(content=f"Context:\n{join_context(matches, 0)}\nQuestion: {question}")]
+        ).content
+        fixtures.append(
+            {
+                "question": question,
+                "embedding": get_embedding(question).tolist(),
+                "matches": [{"id": m.id, "score": m.score, "metadata": m.metadata} for m in matches],
+                "answer": answer,
+            }
+        )
+    return fixtures
+
+
+def synthesize(count: int, top_k: int, dimension: int = 1536, seed: int = 0) -> List[dict]:
+    """Vestacki fixture-i iz PRAVILNIK-a - stvarni tekstovi, slucajni vektori i skorovi."""
+    from bm25_model import PRAVILNIK_PATH, read_corpus_file
+
+    articles = read_corpus_file(PRAVILNIK_PATH)
+    rng = np.random.default_rng(seed)
+    fixtures = []
+    for number in range(count):
+        # prvi deo je preambula, pitanja se prave od naslova clanova
+        question = f"Sta propisuje {articles[1 + number % (len(articles) - 1)].splitlines()[0].strip()}?"
+        embedding = rng.standard_normal(dimension).astype(np.float32)
+        picked = rng.choice(len(articles), size=min(top_k, len(articles)), replace=False)
+        scores = np.sort(rng.uniform(0.3, 0.9, len(picked)))[::-1]
+        fixtures.append(
+            {
+                "question": question,
+                "embedding": (embedding / np.linalg.norm(embedding)).tolist(),
+                "matches": [
+                    {"id": f"clan-{i}", "score": float(s), "metadata": {"context": articles[i]}}
+                    for i, s in zip(picked, scores)
+                ],
+                "answer": "\n\n".join(articles[i] for i in picked)[:3000],
+            }
+        )
+    return fixtures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stage-level latency benchmark on recorded responses")
+    parser.add_argument("--fixtures", default=FIXTURES_PATH)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown vs baseline (0.2 = 20%%)")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--alpha", type=float, default=0.5)
+    parser.add_argument("--score", type=float, default=0.05)
+    parser.add_argument("--record", action="store_true", help="record real responses (needs API keys)")
+    parser.add_argument("--questions", help="file with one question per line, for --record")
+    parser.add_argument("--index", default="positive")
+    parser.add_argument("--project", default="positive")
+    parser.add_argument("--namespace", default="")
+    parser.add_argument("--model", default="gpt-4")
+    parser.add_argument("--synthesize", type=int, metavar="N", help="write N synthetic fixtures from PRAVILNIK")
+    args = parser.parse_args()
+
+    if args.record or args.synthesize:
+        if args.record:
+            with open(args.questions, encoding="utf-8") as file:
+                questions = [line.strip() for line in file if line.strip()]
+            fixtures = record(questions, args.index, args.project, args.namespace, args.top_k, args.alpha, args.model)
+        else:
+            fixtures = synthesize(args.synthesize, args.top_k)
+        with open(args.fixtures, "w", encoding="utf-8") as file:
+            json.dump(fixtures, file, ensure_ascii=False)
+        print(f"{len(fixtures)} fixture-a -> {args.fixtures}")
+        return
+
+    with open(args.fixtures, encoding="utf-8") as file:
+        fixtures = json.load(file)
+    # embedding cache u privremenom fajlu, da merenje ne zavisi od (i ne menja) pravi cache
+    os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(), "embeddings.sqlite")
+    results = run_benchmark(fixtures, args.repeat, args.top_k, args.alpha, args.score)
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)["stages"]
+    print_table(results, baseline)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump({"created": time.time(), "fixtures": args.fixtures, "stages": results}, file, indent=1)
+        print(f"baseline -> {args.baseline}")
+    elif baseline:
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"SPORIJE: {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
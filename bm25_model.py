@@ -0,0 +1,138 @@
+# BM25 parametri fitovani na nasem (srpskom) korpusu - fituje se jednom offline, aplikacije ga samo ucitavaju
+#
+#   python bm25_model.py                              # PRAVILNIK -> bm25_params.json
+#   python bm25_model.py --namespace pravnik --namespace bis --index positive
+#   python bm25_model.py --file drugi_korpus.txt --output bm25_params.json
+
+import argparse
+import hashlib
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Iterable, List, Optional
+
+BM25_PARAMS_PATH = os.environ.get("BM25_PARAMS_PATH", "bm25_params.json")
+PRAVILNIK_PATH = "PRAVILNIK O ORGANIZACIJI I SISTEMATIZACIJI RADNIH MESTA.txt"
+
+# srpski nema stemmer ni stop reci u nltk-u, pa se tokeni koriste bez izmena
+ENCODER_PARAMS = {"remove_stopwords": False, "stem": False}
+
+
+def split_articles(text: str) -> List[str]:
+    """Deli pravilnik na clanove po oznaci `+++ Član N.`."""
+    return [part.strip() for part in re.split(r"^\+\+\+ ", text, flags=re.M) if part.strip()]
+
+
+def read_corpus_file(path: str) -> List[str]:
+    with open(path, encoding="utf-8") as file:
+        return split_articles(file.read())
+
+
+# Pinecone vraca najvise 1000 pogodaka po upitu kad se traze i metapodaci
+MAX_TOP_K = 1000
+FETCH_BATCH = 100
+
+
+def _text(record) -> Optional[str]:
+    metadata = (record.get("metadata") if isinstance(record, dict) else record.metadata) or {}
+    return metadata.get("context") or metadata.get("text")
+
+
+def read_namespace(index, namespace: str, dimension: int = 1536, max_queries: int = 50) -> List[str]:
+    """Tekstovi svih zapisa namespace-a.
+
+    Gde postoji `index.list` (serverless indeksi) id-evi se listaju po
+    stranama i citaju sa `fetch`; inace (pod indeksi, LocalIndex) best
+    effort - nasumicni upiti po MAX_TOP_K, dok god donose nove zapise.
+    """
+    texts = {}
+    try:
+        for ids in index.list(namespace=namespace):
+            ids = list(ids)
+            for start in range(0, len(ids), FETCH_BATCH):
+                fetched = index.fetch(ids=ids[start : start + FETCH_BATCH], namespace=namespace)
+                for record_id, record in fetched.vectors.items():
+                    texts[record_id] = _text(record)
+        return [text for text in texts.values() if text]
+    except Exception:
+        # listanje nije podrzano; greska usred listanja se ne sakriva
+        if texts:
+            raise
+
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    for _ in range(max_queries):
+        vector = rng.standard_normal(dimension).astype(np.float32)
+        result = index.query(
+            top_k=MAX_TOP_K,
+            vector=(vector / np.linalg.norm(vector)).tolist(),
+            include_metadata=True,
+            namespace=namespace,
+        )
+        new = {item.id: _text(item) for item in result.matches if item.id not in texts}
+        if not new:
+            break
+        texts.update(new)
+    return [text for text in texts.values() if text]
+
+
+def fit_bm25(corpus: Iterable[str]):
+    from pinecone_text.sparse import BM25Encoder
+
+    return BM25Encoder(**ENCODER_PARAMS).fit(list(corpus))
+
+
+@lru_cache(maxsize=None)
+def load_bm25(path: str = BM25_PARAMS_PATH):
+    """Returns the corpus-fitted BM25 encoder, loaded once per process."""
+    from pinecone_text.sparse import BM25Encoder
+
+    if os.path.exists(path):
+        return BM25Encoder().load(path)
+    # fajl jos nije napravljen - fituje se na pravilniku, ali samo jednom po procesu
+    return fit_bm25(read_corpus_file(PRAVILNIK_PATH))
+
+
+def encoder_fingerprint(path: str = BM25_PARAMS_PATH) -> str:
+    """Potpis encoder-a koji bi load_bm25 vratio - menja se kad se BM25 ponovo fituje.
+
+    Bez ucitavanja modela: hash fajla sa parametrima, ili (kad ga nema)
+    parametara encoder-a i pravilnika na kome se fituje.
+    """
+    digest = hashlib.sha256(json.dumps(ENCODER_PARAMS, sort_keys=True).encode("utf-8"))
+    source = path if os.path.exists(path) else PRAVILNIK_PATH
+    with open(source, "rb") as file:
+        digest.update(file.read())
+    return digest.hexdigest()
+
+
+def encode_queries(text: str) -> dict:
+    return load_bm25().encode_queries(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit BM25 parameters on our corpora")
+    parser.add_argument("--file", action="append", default=[], help="text file, split on +++ articles")
+    parser.add_argument("--index", default="positive", help="Pinecone index for --namespace")
+    parser.add_argument("--namespace", action="append", default=[], help="Pinecone namespace to include")
+    parser.add_argument("--output", default=BM25_PARAMS_PATH)
+    args = parser.parse_args()
+
+    corpus = []
+    for path in args.file or [PRAVILNIK_PATH]:
+        corpus += read_corpus_file(path)
+    if args.namespace:
+        from clients import pinecone_index
+
+        index = pinecone_index(args.index, project="positive")
+        for namespace in args.namespace:
+            corpus += read_namespace(index, namespace)
+
+    fit_bm25(corpus).dump(args.output)
+    print(f"BM25 fitovan na {len(corpus)} dokumenata -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
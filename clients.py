@@ -0,0 +1,114 @@
+# registar dugovecnih klijenata na nivou procesa - Pinecone indeks po (projekat, indeks) i jedan httpx pool
+# sa keep-alive konekcijama za sve OpenAI pozive (direktne i kroz LangChain), pa nijedan zahtev ne placa
+# ponovo inicijalizaciju, TLS i handshake
+#
+#   llm = ChatOpenAI(model_name=model, http_client=http_client())
+
+import atexit
+import os
+import threading
+from typing import Dict, Tuple
+
+# dva Pinecone projekta sa razlicitim kljucevima
+PINECONE_PROJECTS = {
+    "embedings": ("PINECONE_API_KEY", "PINECONE_API_ENV"),
+    "positive": ("PINECONE_API_KEY_POS", "PINECONE_ENVIRONMENT_POS"),
+}
+# thread-ovi za async upsert/query jednog indeksa
+PINECONE_POOL_THREADS = int(os.environ.get("PINECONE_POOL_THREADS", "4"))
+OPENAI_MAX_CONNECTIONS = int(os.environ.get("OPENAI_MAX_CONNECTIONS", "20"))
+OPENAI_KEEPALIVE_EXPIRY = float(os.environ.get("OPENAI_KEEPALIVE_EXPIRY", "60"))
+# kao podrazumevani timeout OpenAI klijenta
+OPENAI_TIMEOUT = float(os.environ.get("OPENAI_TIMEOUT", "600"))
+
+_lock = threading.Lock()
+_pinecone_clients: Dict[str, object] = {}
+_indexes: Dict[Tuple[str, str], object] = {}
+_http_client = None
+_openai_client = None
+
+
+def _pinecone_client(project: str):
+    """pinecone.Pinecone za projekat (pinecone-client 3); kod verzije 2 None - tamo je klijent globalan."""
+    import pinecone
+
+    if not hasattr(pinecone, "Pinecone"):
+        return None
+    if project not in _pinecone_clients:
+        api_key, _ = PINECONE_PROJECTS[project]
+        _pinecone_clients[project] = pinecone.Pinecone(
+            api_key=os.environ[api_key], pool_threads=PINECONE_POOL_THREADS
+        )
+    return _pinecone_clients[project]
+
+
+def pinecone_index(index_name: str, project: str):
+    """pinecone.Index za (projekat, indeks), napravljen jednom po procesu.
+
+    Index drzi svoj API kljuc i pool konekcija, pa se projekti mogu mesati
+    bez ponovnog pinecone.init; kod pinecone-client 2 init je globalan, pa
+    se pod lock-om poziva samo kad se pravi novi indeks.
+    """
+    key = (project, index_name)
+    index = _indexes.get(key)
+    if index is not None:
+        return index
+    with _lock:
+        if key not in _indexes:
+            client = _pinecone_client(project)
+            if client is not None:
+                _indexes[key] = client.Index(index_name)
+            else:
+                import pinecone
+
+                api_key, environment = PINECONE_PROJECTS[project]
+                pinecone.init(api_key=os.environ[api_key], environment=os.environ[environment])
+                _indexes[key] = pinecone.Index(index_name, pool_threads=PINECONE_POOL_THREADS)
+        return _indexes[key]
+
+
+def http_client():
+    """Jedan httpx.Client za sve OpenAI pozive u procesu - konekcije ostaju otvorene izmedju zahteva.
+
+    Prosledjuje se kao `http_client` u OpenAI(), ChatOpenAI() i OpenAI() iz LangChain-a.
+    """
+    global _http_client
+    if _http_client is None:
+        with _lock:
+            if _http_client is None:
+                import httpx
+
+                _http_client = httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=OPENAI_MAX_CONNECTIONS,
+                        max_keepalive_connections=OPENAI_MAX_CONNECTIONS,
+                        keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+                    ),
+                    timeout=OPENAI_TIMEOUT,
+                )
+    return _http_client
+
+
+def openai_client():
+    """openai.OpenAI nad zajednickim http_client-om."""
+    global _openai_client
+    if _openai_client is None:
+        client = http_client()
+        with _lock:
+            if _openai_client is None:
+                from openai import OpenAI
+
+                _openai_client = OpenAI(http_client=client)
+    return _openai_client
+
+
+@atexit.register
+def close():
+    global _http_client, _openai_client
+    with _lock:
+        if _http_client is not None:
+            _http_client.close()
+        _http_client = None
+        _openai_client = None
+        _indexes.clear()
+        _pinecone_clients.clear()
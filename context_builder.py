@@ -0,0 +1,176 @@
+# sklapanje konteksta za prompt u okviru budzeta tokena - bez (skoro) duplikata, redosled po MMR-u
+# (maximal marginal relevance), nad dense vektorima koji su vec stigli iz indeksa; tekst dokumenata
+# se na putu zahteva nikad ne embeduje
+
+import os
+from functools import lru_cache
+from typing import List, Optional, Sequence, Union
+
+import numpy as np
+
+from embedding_cache import EMBEDDING_MODEL, get_embedding, normalize_text
+from retrieval import Match
+from tracing import span
+
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", "3000"))
+# 1 = samo relevantnost, 0 = samo raznovrsnost
+CONTEXT_MMR_LAMBDA = float(os.environ.get("CONTEXT_MMR_LAMBDA", "0.7"))
+# kosinusna slicnost od koje se dva chunk-a smatraju istim
+CONTEXT_DUPLICATE_THRESHOLD = float(os.environ.get("CONTEXT_DUPLICATE_THRESHOLD", "0.95"))
+SEPARATOR = "\n\n"
+
+
+@lru_cache(maxsize=None)
+def _encoding():
+    import tiktoken
+
+    # tokenizer za gpt-3.5/gpt-4 i njihove fine-tune modele
+    return tiktoken.get_encoding("cl100k_base")
+
+
+@lru_cache(maxsize=4096)
+def count_tokens(text: str) -> int:
+    """Broj tokena; isti chunk-ovi se ponavljaju iz pitanja u pitanje, pa se pamte."""
+    return len(_encoding().encode(text))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    tokens = _encoding().encode(text)
+    return text if len(tokens) <= max_tokens else _encoding().decode(tokens[:max_tokens])
+
+
+def matches_from_documents(documents) -> List[Match]:
+    """Match-evi iz LangChain rezultata - parova (Document, score) ili samih Document-a."""
+    matches = []
+    for number, item in enumerate(documents):
+        doc, score = item if isinstance(item, tuple) else (item, None)
+        matches.append(
+            Match(
+                doc.metadata.get("id", str(number)),
+                float(score) if score is not None else None,
+                doc.page_content,
+                doc.metadata,
+            )
+        )
+    return matches
+
+
+def _unit_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def _relevance(matches: Sequence[Match], vectors: np.ndarray, query: Union[str, np.ndarray], model: str) -> np.ndarray:
+    """Relevantnost za MMR: score iz indeksa (hybrid/rerank) podeljen najvecim score-om;
+    kosinus sa pitanjem samo za pogotke bez score-a."""
+    scores = np.array([np.nan if match.score is None else match.score for match in matches], dtype=np.float32)
+    scored = ~np.isnan(scores)
+    relevance = np.zeros(len(matches), dtype=np.float32)
+    if scored.any():
+        top = scores[scored].max()
+        relevance[scored] = scores[scored] / top if top > 0 else scores[scored]
+    if not scored.all():
+        query_vector = get_embedding(query, model=model) if isinstance(query, str) else query
+        cosine = vectors @ _unit_rows(np.asarray(query_vector, dtype=np.float32))
+        relevance[~scored] = cosine[~scored]
+    return relevance
+
+
+def select_context(
+    matches: Sequence[Match],
+    query: Union[str, np.ndarray],
+    score: Optional[float] = None,
+    budget: int = CONTEXT_TOKEN_BUDGET,
+    mmr_lambda: float = CONTEXT_MMR_LAMBDA,
+    duplicate_threshold: float = CONTEXT_DUPLICATE_THRESHOLD,
+    embedding_model: str = EMBEDDING_MODEL,
+) -> List[Match]:
+    """Bira pogotke za prompt.
+
+    Args:
+        matches: pogoci sortirani po score-u (kao iz indeksa); duplikati po kosinusu i MMR
+            samo kad svi imaju dense vektor (Match.values)
+        query: pitanje ili njegov dense vektor
+        score: prag; pogoci sa score-om <= praga se ne koriste (kao join_context)
+        budget: najvise tokena konteksta; chunk koji ne staje se preskace, a ako
+            ne staje ni prvi, skracuje se na budzet
+        mmr_lambda: tezina relevantnosti naspram raznovrsnosti
+        duplicate_threshold: kosinusna slicnost iznad koje se chunk odbacuje kao duplikat
+    """
+    candidates, seen = [], set()
+    for match in matches:
+        if score is not None and match.score is not None and match.score <= score:
+            continue
+        text = normalize_text(match.context)
+        if not text or text in seen:
+            continue
+        seen.add(text)
+        candidates.append(match)
+    if not candidates:
+        return []
+
+    if any(match.values is None for match in candidates):
+        # LangChain rezultati (FT, Test, self-query) nemaju vektore - embedovanje teksta bi bio jos jedan
+        # OpenAI poziv pre generisanja, pa ostaju samo tacni duplikati, redosled iz indeksa i budzet
+        return _fill_budget(candidates, budget)
+
+    vectors = _unit_rows(np.stack([np.asarray(match.values, dtype=np.float32) for match in candidates]))
+    relevance = _relevance(candidates, vectors, query, embedding_model)
+    similarity = vectors @ vectors.T
+
+    # skoro isti chunk-ovi (isti clan iz dva namespace-a, preklapanje pri deljenju) - ostaje bolji
+    kept: List[int] = []
+    for position in range(len(candidates)):
+        if all(similarity[position, other] < duplicate_threshold for other in kept):
+            kept.append(position)
+
+    selected: List[Match] = []
+    chosen: List[int] = []
+    used = 0
+    remaining = list(kept)
+    while remaining and used < budget:
+        if chosen:
+            redundancy = similarity[np.ix_(remaining, chosen)].max(axis=1)
+        else:
+            redundancy = np.zeros(len(remaining), dtype=np.float32)
+        mmr = mmr_lambda * relevance[remaining] - (1 - mmr_lambda) * redundancy
+        position = remaining.pop(int(np.argmax(mmr)))
+        match = candidates[position]
+        tokens = count_tokens(match.context + SEPARATOR)
+        if used + tokens > budget:
+            if selected:
+                continue
+            match = match._replace(context=truncate_tokens(match.context, budget - count_tokens(SEPARATOR)))
+            tokens = budget
+        selected.append(match)
+        chosen.append(position)
+        used += tokens
+    return selected
+
+
+def _fill_budget(matches: Sequence[Match], budget: int) -> List[Match]:
+    """Pogoci redom dok staju u budzet; kao u MMR petlji, prvi se skracuje ako ne staje ceo."""
+    selected: List[Match] = []
+    used = 0
+    for match in matches:
+        if used >= budget:
+            break
+        tokens = count_tokens(match.context + SEPARATOR)
+        if used + tokens > budget:
+            if selected:
+                continue
+            match = match._replace(context=truncate_tokens(match.context, budget - count_tokens(SEPARATOR)))
+            tokens = budget
+        selected.append(match)
+        used += tokens
+    return selected
+
+
+def build_context(matches: Sequence[Match], query: Union[str, np.ndarray], score: Optional[float] = None, **options) -> str:
+    """Tekst konteksta za prompt - zamena za join_context sa budzetom tokena."""
+    with span("context", candidates=len(matches)) as attrs:
+        selected = select_context(matches, query, score=score, **options)
+        text = "".join(match.context + SEPARATOR for match in selected)
+        attrs["selected"] = len(selected)
+        attrs["tokens"] = sum(count_tokens(match.context + SEPARATOR) for match in selected)
+    return text
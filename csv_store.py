@@ -0,0 +1,66 @@
+# uploadovani CSV fajlovi se parsiraju jednom i cuvaju kao Parquet, po hash-u sadrzaja;
+# CSV agenti se prave nad vec ucitanim DataFrame-om
+
+import hashlib
+import io
+import os
+from functools import lru_cache
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+CSV_STORE_DIR = os.environ.get("CSV_STORE_DIR", ".cache/csv")
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def parquet_path(digest: str) -> str:
+    return os.path.join(CSV_STORE_DIR, f"{digest}.parquet")
+
+
+def store_csv(data: bytes) -> str:
+    """Parsira CSV (samo ako ga vec nemamo) i vraca hash pod kojim je sacuvan."""
+    digest = content_hash(data)
+    path = parquet_path(digest)
+    if not os.path.exists(path):
+        os.makedirs(CSV_STORE_DIR, exist_ok=True)
+        table = pa.Table.from_pandas(pd.read_csv(io.BytesIO(data)), preserve_index=False)
+        # upis u privremeni fajl pa rename, da drugi proces ne procita pola fajla
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+    return digest
+
+
+def store_upload(uploaded_file) -> str:
+    """store_csv za Streamlit UploadedFile."""
+    return store_csv(uploaded_file.getvalue())
+
+
+@lru_cache(maxsize=8)
+def load_frame(digest: str) -> pd.DataFrame:
+    """DataFrame iz memory-mapped Parquet fajla; ucitava se jednom po procesu."""
+    return pq.read_table(parquet_path(digest), memory_map=True).to_pandas()
+
+
+@lru_cache(maxsize=16)
+def get_csv_agent(digest: str, model: str = "gpt-3.5-turbo", temperature: float = 0):
+    """Zamena za create_csv_agent nad kesiranim DataFrame-om."""
+    from langchain.agents import AgentType
+    from langchain.chat_models import ChatOpenAI
+    from langchain_experimental.agents import create_pandas_dataframe_agent
+
+    from clients import http_client
+    from llm_cache import install
+
+    install()
+    return create_pandas_dataframe_agent(
+        ChatOpenAI(temperature=temperature, model=model, http_client=http_client()),
+        load_frame(digest),
+        verbose=True,
+        agent_type=AgentType.OPENAI_FUNCTIONS,
+        handle_parsing_errors=True,
+    )
@@ -1,9 +1,7 @@
 import streamlit as st
-from langchain.agents import AgentType
-from langchain.agents import create_csv_agent
-from langchain.chat_models import ChatOpenAI
 from myfunc.mojafunkcija import init_cond_llm
-import io
+from fast_path import answer_csv
+from tracing import AgentTraceHandler, request_trace, span
 
 st.subheader("Testiranje modela na osnovu csv fajla")
 st.caption("Ver. 21.10.23")
@@ -14,22 +12,26 @@ uploaded_file = st.file_uploader(
     "Choose a CSV file", accept_multiple_files=False, type="csv", key="csv_key"
 )
 if uploaded_file is not None:
-    with io.open(uploaded_file.name, "wb") as file:
-        file.write(uploaded_file.getbuffer())
+    # pandas/pyarrow se ucitavaju tek kad stigne fajl
+    from csv_store import get_csv_agent, store_upload
+
+    # fajl se parsira jednom i cuva kao Parquet (csv_store.py), ne upisuje se ponovo na disk
+    digest = store_upload(uploaded_file)
     with st.form("my_form"):
         upit = st.text_area("Sistem: ", value="Pisi iskljucivo na srpskom jeziku. ")
         posalji = st.form_submit_button("Posalji")
 
         if posalji:
-            try:
-                agent = create_csv_agent(
-                    ChatOpenAI(temperature=temp, model=model),
-                    "pravilnik.csv",
-                    verbose=True,
-                    agent_type=AgentType.OPENAI_FUNCTIONS,
-                    handle_parsing_errors=True,
-                )
-            except Exception as e:
-                st.write(f"Molim vas napisite pitanje drugacije, nisam razumeo... {e}")
-            odgovor = agent.run(upit)
+            with request_trace("csvtest", model=model):
+                # jednostavna pitanja (koliko, ukupno, prosek, top N) bez agenta
+                odgovor = answer_csv(upit, digest)
+                if odgovor is None:
+                    try:
+                        agent = get_csv_agent(digest, model=model, temperature=temp)
+                    except Exception as e:
+                        st.write(f"Molim vas napisite pitanje drugacije, nisam razumeo... {e}")
+                    with span("csv.agent") as attrs:
+                        agent_trace = AgentTraceHandler()
+                        odgovor = agent.run(upit, callbacks=[agent_trace])
+                        attrs.update(agent_trace.stats())
             st.write(odgovor)
@@ -0,0 +1,183 @@
+# disk cache za embeddinge - isti tekst se ne salje ponovo OpenAI-ju, ni izmedju procesa ni izmedju rerun-ova
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from clients import openai_client
+from embedding_dispatcher import BATCH_SIZE, EmbeddingDispatcher
+from tracing import span
+
+EMBEDDING_MODEL = "text-embedding-ada-002"
+CACHE_PATH = os.environ.get("EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite")
+CACHE_MAX_ENTRIES = int(os.environ.get("EMBEDDING_CACHE_MAX_ENTRIES", "50000"))
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.split())
+
+
+def cache_key(text: str, model: str) -> str:
+    return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Content-addressed embedding cache in a SQLite file.
+
+    Keys are sha256(model + normalized text). SQLite in WAL mode lets every
+    Streamlit process share the same file; once the cache grows past
+    `max_entries`, the least recently used rows are evicted.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, max_entries: int = CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, model TEXT, vector BLOB, last_used REAL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)"
+        )
+        self._conn.commit()
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, np.ndarray]:
+        if not keys:
+            return {}
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = list(keys[start : start + 500])
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+                self._conn.commit()
+        return found
+
+    def put_many(self, items: Dict[str, np.ndarray], model: str):
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, vector, last_used) VALUES (?, ?, ?, ?)",
+                [
+                    (key, model, np.asarray(vector, dtype=np.float32).tobytes(), now)
+                    for key, vector in items.items()
+                ],
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> EmbeddingCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = EmbeddingCache()
+        return _cache
+
+
+def _embed_remote(texts: List[str], model: str) -> np.ndarray:
+    response = openai_client().embeddings.create(input=texts, model=model)
+    return np.array([item.embedding for item in response.data], dtype=np.float32)
+
+
+_dispatcher: Optional[EmbeddingDispatcher] = None
+
+
+def get_dispatcher() -> EmbeddingDispatcher:
+    """Jedan dispatcher po procesu, pa se zahtevi svih sesija spajaju u iste batch-eve."""
+    global _dispatcher
+    with _cache_lock:
+        if _dispatcher is None:
+            _dispatcher = EmbeddingDispatcher(_embed_remote)
+        return _dispatcher
+
+
+def bulk_dispatcher(workers: int, batch_size: int = BATCH_SIZE) -> EmbeddingDispatcher:
+    """Poseban dispatcher za ingestion - `workers` istovremenih poziva ka OpenAI-ju; pozivalac ga zatvara."""
+    return EmbeddingDispatcher(_embed_remote, max_batch_size=batch_size, workers=workers)
+
+
+def embed_texts(
+    texts: Sequence[str],
+    model: str = EMBEDDING_MODEL,
+    dispatcher: Optional[EmbeddingDispatcher] = None,
+) -> np.ndarray:
+    """Embeds texts as a (n, dim) float32 matrix.
+
+    Only cache misses go to OpenAI, batched together with concurrent
+    requests from other sessions by the process-wide dispatcher
+    (or by `dispatcher`, if given).
+    """
+    with span("embed", texts=len(texts)) as attrs:
+        keys = [cache_key(text, model) for text in texts]
+        cache = get_cache()
+        found = cache.get_many(list(set(keys)))
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = normalize_text(text)
+        attrs["missing"] = len(missing)
+        if missing:
+            with span("embed.openai", texts=len(missing)):
+                vectors = (dispatcher or get_dispatcher()).embed(list(missing.values()), model)
+            fresh = dict(zip(missing.keys(), vectors))
+            cache.put_many(fresh, model)
+            found.update(fresh)
+    return np.stack([found[key] for key in keys]) if keys else np.empty((0, 0), np.float32)
+
+
+def get_embedding(text: str, model: str = EMBEDDING_MODEL) -> np.ndarray:
+    return embed_texts([text], model=model)[0]
+
+
+class CachedOpenAIEmbeddings(Embeddings):
+    """Zamena za OpenAIEmbeddings() koja prvo gleda u disk cache."""
+
+    def __init__(self, model: str = EMBEDDING_MODEL):
+        self.model = model
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return embed_texts(texts, model=self.model).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return get_embedding(text, model=self.model).tolist()
@@ -0,0 +1,144 @@
+# skuplja embedding zahteve iz svih sesija/thread-ova nekoliko ms i salje ih kao jedan embeddings.create poziv
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, NamedTuple, Sequence
+
+import numpy as np
+
+BATCH_WAIT_MS = float(os.environ.get("EMBEDDING_BATCH_WAIT_MS", "5"))
+BATCH_SIZE = int(os.environ.get("EMBEDDING_BATCH_SIZE", "256"))
+
+
+class _Request(NamedTuple):
+    texts: List[str]
+    model: str
+    future: Future
+
+
+# jedan po worker-u u redu zahteva - worker zavrsi tekuci batch i izadje
+_STOP = None
+
+
+class EmbeddingDispatcher:
+    """Micro-batching front for an embedding function.
+
+    Callers get a Future per request; a worker thread waits up to
+    `max_wait_ms` for more requests, groups them by model, removes duplicate
+    texts and sends at most `max_batch_size` texts per remote call. Each
+    caller receives exactly the rows for its own texts.
+
+    Args:
+        embed_fn: funkcija (texts, model) -> float32 matrica (n, dim)
+        max_batch_size: najvise tekstova u jednom pozivu
+        max_wait_ms: koliko dugo se ceka na druge zahteve
+        workers: broj worker thread-ova (vise za bulk ingestion)
+
+    A dispatcher that is not shared for the whole process should be closed
+    (or used as a context manager) so its worker threads exit.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[List[str], str], np.ndarray],
+        max_batch_size: int = BATCH_SIZE,
+        max_wait_ms: float = BATCH_WAIT_MS,
+        workers: int = 1,
+    ):
+        self.embed_fn = embed_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: "queue.Queue[_Request]" = queue.Queue()
+        self._closed = False
+        self._workers = [
+            threading.Thread(target=self._run, name=f"embedding-dispatcher-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, texts: Sequence[str], model: str) -> Future:
+        if self._closed:
+            raise RuntimeError("EmbeddingDispatcher is closed")
+        future = Future()
+        if not texts:
+            future.set_result(np.empty((0, 0), dtype=np.float32))
+        else:
+            self._queue.put(_Request(list(texts), model, future))
+        return future
+
+    def embed(self, texts: Sequence[str], model: str) -> np.ndarray:
+        return self.submit(texts, model).result()
+
+    def close(self, timeout: float = None):
+        """Zavrsava zahteve koji su vec u redu i zaustavlja worker thread-ove."""
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._workers:
+            self._queue.put(_STOP)
+        for worker in self._workers:
+            worker.join(timeout)
+
+    def __enter__(self) -> "EmbeddingDispatcher":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _collect(self) -> List[_Request]:
+        first = self._queue.get()
+        if first is _STOP:
+            return []
+        batch = [first]
+        size = len(batch[0].texts)
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is _STOP:
+                # stop ostaje u redu za sledeci _collect (ovog ili drugog worker-a)
+                self._queue.put(_STOP)
+                break
+            batch.append(request)
+            size += len(request.texts)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if not batch:
+                return
+            by_model: Dict[str, List[_Request]] = {}
+            for request in batch:
+                by_model.setdefault(request.model, []).append(request)
+            for model, requests in by_model.items():
+                self._dispatch(model, requests)
+
+    def _dispatch(self, model: str, requests: List[_Request]):
+        positions: Dict[str, int] = {}
+        for request in requests:
+            for text in request.texts:
+                positions.setdefault(text, len(positions))
+        unique = list(positions)
+        try:
+            vectors = np.vstack(
+                [
+                    self.embed_fn(unique[start : start + self.max_batch_size], model)
+                    for start in range(0, len(unique), self.max_batch_size)
+                ]
+            )
+        except Exception as error:
+            for request in requests:
+                request.future.set_exception(error)
+            return
+        for request in requests:
+            request.future.set_result(vectors[[positions[text] for text in request.texts]])
@@ -0,0 +1,124 @@
+# izvoz odgovora u TXT/DOCX/PDF - renderuje se tek kad korisnik zatrazi, jednom po tekstu i formatu,
+# u posebnom procesu (pdfkit pokrece wkhtmltopdf)
+
+import hashlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, Tuple
+
+import streamlit as st
+from cachetools import LRUCache
+
+from tracing import request_trace
+
+EXPORT_WORKERS = int(os.environ.get("EXPORT_WORKERS", "2"))
+EXPORT_CACHE_SIZE = int(os.environ.get("EXPORT_CACHE_SIZE", "64"))
+
+PDF_OPTIONS = {
+    "encoding": "UTF-8",  # Set the encoding to UTF-8
+    "no-outline": None,
+    "quiet": "",
+}
+MIME_TYPES = {"txt": "text/plain", "pdf": "application/octet-stream", "docx": "docx"}
+
+_pool = None
+_results: LRUCache = LRUCache(maxsize=EXPORT_CACHE_SIZE)
+_pending: Dict[Tuple[str, str], Future] = {}
+_lock = threading.RLock()
+
+
+def answer_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def render(text: str, fmt: str) -> bytes:
+    """Renderuje tekst u zadati format; izvrsava se u worker procesu."""
+    if fmt == "txt":
+        return text.encode("utf-8")
+    import markdown
+
+    html = markdown.markdown(text)
+    if fmt == "docx":
+        from html2docx import html2docx
+
+        return html2docx(html, title="Zapisnik").getvalue()
+    if fmt == "pdf":
+        import pdfkit
+
+        return pdfkit.from_string(html, False, cover_first=False, options=PDF_OPTIONS)
+    raise ValueError(f"Unknown export format: {fmt}")
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn, ne fork: Streamlit server ima vise thread-ova, a fork kopira i lock-ove koje oni drze
+        # (sqlite cache, logging, tracing) - worker bi mogao da ostane zauvek zakljucan
+        _pool = ProcessPoolExecutor(max_workers=EXPORT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def cached(text: str, fmt: str):
+    with _lock:
+        return _results.get((answer_hash(text), fmt))
+
+
+def render_async(text: str, fmt: str) -> Future:
+    """Vraca Future sa fajlom; isti tekst i format se renderuju samo jednom."""
+    key = (answer_hash(text), fmt)
+    with _lock:
+        if key in _results:
+            future = Future()
+            future.set_result(_results[key])
+            return future
+        future = _pending.get(key)
+        if future is None:
+            future = _get_pool().submit(render, text, fmt)
+            _pending[key] = future
+            # zavrsen future poziva callback odmah (RLock), pa _pending ovde vise ne mora da ima kljuc
+            future.add_done_callback(lambda done: _store(key, done))
+        return future
+
+
+def _store(key, future: Future):
+    with _lock:
+        _pending.pop(key, None)
+        if future.exception() is None:
+            _results[key] = future.result()
+
+
+def download_buttons(text: str, file_stem: str = "TekstuStilu"):
+    """Download dugmad za TXT, PDF i DOCX.
+
+    TXT je uvek spreman; PDF i DOCX se renderuju tek na klik "Pripremi",
+    a posle toga se na svakom rerun-u uzimaju iz memorije.
+    """
+    st.download_button(
+        f"Download {file_stem}.txt",
+        text,
+        file_name=f"{file_stem}.txt",
+        mime=MIME_TYPES["txt"],
+    )
+    digest = answer_hash(text)[:12]
+    for fmt in ("pdf", "docx"):
+        data = cached(text, fmt)
+        if data is None and st.button(f"Pripremi {fmt.upper()}", key=f"export_{fmt}_{digest}"):
+            with st.spinner(f"Pripremam {fmt.upper()}..."), request_trace("export", format=fmt):
+                try:
+                    data = render_async(text, fmt).result()
+                except Exception:
+                    if fmt == "pdf":
+                        st.write(
+                            "Za pdf fajl restartujte app za 5 minuta. Osvezavanje aplikacije je u toku"
+                        )
+                    else:
+                        raise
+        if data is not None:
+            st.download_button(
+                label=f"Download {file_stem}.{fmt}",
+                data=data,
+                file_name=f"{file_stem}.{fmt}",
+                mime=MIME_TYPES[fmt],
+            )
@@ -0,0 +1,298 @@
+# brzi put za jednostavna pitanja nad CSV/SQL podacima (koliko, ukupno, prosek, min/max, top N)
+# - izvrsava se direktno u pandas-u ili SQL-u, bez ReAct petlje agenta;
+# sve sto planer ne prepozna sa sigurnoscu vraca None i ide agentu
+
+import os
+import re
+import unicodedata
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# kolone sa vise razlicitih vrednosti (slobodan tekst) se ne koriste za filtere
+MAX_FILTER_VALUES = 500
+# reci pitanja koje planer ne pokriva (npr. "referenata", "zena"); svaka takva rec moze biti uslov
+# koji bi brzi put precutno izostavio, pa pitanje ide agentu
+MAX_UNKNOWN_WORDS = 0
+
+STOPWORDS = {
+    "koliko", "koja", "koje", "koji", "kojih", "kolika", "je", "su", "ima", "imaju", "ukupno",
+    "u", "na", "za", "od", "do", "sa", "iz", "i", "a", "li", "se", "da", "sve", "svih", "svi",
+    "broj", "prikazi", "navedi", "daj", "mi", "nam", "molim", "what", "is", "are", "the", "of",
+    "in", "how", "many", "much", "show", "list", "me", "with", "for", "total", "number", "there",
+    # redovi tabele, bez uslova
+    "redova", "reda", "red", "zapisa", "zapis", "rows", "row", "records", "record",
+    # uputstva modelu koja se salju uz pitanje (prompt_turbo.txt, csvtest.py)
+    "always", "answer", "serbian", "language", "pisi", "iskljucivo", "srpskom", "jeziku",
+}
+
+UNSUPPORTED = re.compile(
+    r"\bpo\s+\w+|\bza\s+svak|\bgrup|\bgroup\b|\bper\b|\bizmedju\b|\bbetween\b|\bili\b|\bor\b"
+    # poredjenja u svim padezima: "vecu od", "veci od", "visom od", "manju od", "stariji od"...
+    r"|\b(?:vec|vis|niz|manj|star|mladj)\w*\s+od\b|\biznad\b|\bispod\b|\bvise\b|\bmanje\b"
+    r"|\bmore\s+than\b|\bless\s+than\b|\bgreater\b|\babove\b|\bbelow\b|[<>=]"
+    r"|\bosim\b|\bexcept\b|\bnije\b|\bnisu\b|\bnot\b|\bbez\b"
+)
+AVG = re.compile(r"\bprosec\w*|\bprosek\w*|\baverage\b|\bmean\b")
+SUM = re.compile(r"\bzbir\w*|\bsum\w*|\bukupn\w*|\btotal\b")
+MAX = re.compile(r"\bnajvec\w*|\bnajvis\w*|\bmaksim\w*|\bmax\w*|\bhighest\b|\blargest\b")
+MIN = re.compile(r"\bnajmanj\w*|\bnajniz\w*|\bminim\w*|\bmin\b|\blowest\b|\bsmallest\b")
+COUNT = re.compile(r"\bkoliko\b|\bbroj\w*|\bhow\s+many\b|\bcount\b")
+TOP_N = re.compile(
+    r"\b(?:top|prvih|prva|prve|prvi)\s+(\d+)\b|\b(\d+)\s+(?:najvec|najvis|najmanj|najniz)\w*"
+    r"|\b(?:najvec|najvis|najmanj|najniz)\w*\s+(\d+)\b"
+)
+# rec iz TOP_N ("top 5") kad se reci proveravaju pojedinacno
+TOP_WORD = re.compile(r"(?:top|prvih|prva|prve|prvi)$")
+
+
+class TableProfile(NamedTuple):
+    name: str
+    numeric: Tuple[str, ...]
+    values: Dict[str, Tuple[str, ...]]  # kolona -> moguce vrednosti za filter
+
+
+class Plan(NamedTuple):
+    op: str  # count | sum | avg | min | max | top
+    column: Optional[str]
+    filters: Tuple[Tuple[str, str], ...]
+    n: int = 0
+    descending: bool = True
+
+
+def normalize(text: str) -> str:
+    text = str(text).lower().replace("đ", "dj")
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in text if not unicodedata.combining(char))
+
+
+def tokens(text: str) -> List[str]:
+    return re.findall(r"\w+", normalize(text).replace("_", " "))
+
+
+def _same_word(a: str, b: str) -> bool:
+    # razlika samo u padeznom nastavku: "sektoru" i "sektor", "mesta" i "mesto"; kratke reci ("IT") tacno
+    if a == b:
+        return True
+    common = len(os.path.commonprefix([a, b]))
+    return common >= 3 and common >= max(len(a), len(b)) - 2
+
+
+def _covered(phrase: List[str], question: List[str], taken: set = frozenset()) -> Optional[set]:
+    """Pozicije reci pitanja koje pokrivaju sve reci fraze, ili None."""
+    used = set()
+    for word in phrase:
+        hits = [
+            i for i, token in enumerate(question)
+            if i not in used and i not in taken and _same_word(word, token)
+        ]
+        if not hits:
+            return None
+        used.add(hits[0])
+    return used
+
+
+def plan_question(question: str, profile: TableProfile) -> Optional[Plan]:
+    """Plan za jednostavno pitanje, ili None ako pitanje nije sigurno prepoznato."""
+    text = normalize(question)
+    if UNSUPPORTED.search(text):
+        return None
+    words = tokens(question)
+    covered = set()
+
+    numeric = []
+    for column in profile.numeric:
+        used = _covered(tokens(column), words, covered)
+        if used:
+            numeric.append(column)
+            covered |= used
+    if len(numeric) > 1:
+        return None
+
+    filters = []
+    for column, values in profile.values.items():
+        best, best_used = [], None
+        for value in values:
+            value_words = [word for word in tokens(value) if len(word) > 1]
+            if not value_words or (len(value_words) == 1 and len(value_words[0]) < 3):
+                continue
+            used = _covered(value_words, words, covered)
+            if used is None:
+                continue
+            if not best or len(used) > len(best_used):
+                best, best_used = [value], used
+            elif len(used) == len(best_used):
+                best.append(value)
+        if len(best) > 1:
+            return None
+        if best:
+            filters.append((column, best[0]))
+            covered |= best_used
+        # i ime kolone ("sektor") moze stajati u pitanju uz vrednost
+        covered |= _covered(tokens(column), words) or set()
+
+    unknown = [
+        word
+        for i, word in enumerate(words)
+        if i not in covered and word not in STOPWORDS and not word.isdigit()
+        and not any(pattern.match(word) for pattern in (AVG, SUM, MAX, MIN, COUNT, TOP_WORD))
+    ]
+    if len(unknown) > MAX_UNKNOWN_WORDS:
+        return None
+
+    column = numeric[0] if numeric else None
+    top = TOP_N.search(text)
+    if top:
+        if column is None:
+            return None
+        return Plan("top", column, tuple(filters), int(next(group for group in top.groups() if group)),
+                    descending=not MIN.search(text))
+    for op, pattern in (("avg", AVG), ("max", MAX), ("min", MIN)):
+        if pattern.search(text):
+            return Plan(op, column, tuple(filters)) if column else None
+    if SUM.search(text) and column:
+        return Plan("sum", column, tuple(filters))
+    if COUNT.search(text) or SUM.search(text):
+        return Plan("count", None, tuple(filters))
+    return None
+
+
+def describe(plan: Plan, result) -> str:
+    where = ", ".join(f"{column} = {value}" for column, value in plan.filters)
+    where = f" ({where})" if where else ""
+    labels = {"count": "Broj redova", "sum": "Zbir", "avg": "Prosek", "min": "Minimum", "max": "Maksimum"}
+    if plan.op == "top":
+        return f"Prvih {plan.n} po koloni {plan.column}{where}:\n\n{result}"
+    column = f" kolone {plan.column}" if plan.column else ""
+    return f"{labels[plan.op]}{column}{where}: {result}"
+
+
+# --- CSV (pandas) ---
+
+
+def frame_profile(df: "pd.DataFrame", name: str = "csv") -> TableProfile:
+    import pandas as pd
+
+    numeric = tuple(column for column in df.columns if pd.api.types.is_numeric_dtype(df[column]))
+    values = {}
+    for column in df.columns:
+        if column in numeric:
+            continue
+        unique = df[column].dropna().astype(str).unique()
+        if len(unique) <= MAX_FILTER_VALUES:
+            values[column] = tuple(unique)
+    return TableProfile(name, numeric, values)
+
+
+def run_frame(plan: Plan, df: "pd.DataFrame") -> str:
+    import pandas as pd
+
+    mask = pd.Series(True, index=df.index)
+    for column, value in plan.filters:
+        mask &= df[column].astype(str) == value
+    rows = df[mask]
+    if plan.op == "count":
+        result = int(mask.sum())
+    elif plan.op == "top":
+        ordered = rows.nlargest(plan.n, plan.column) if plan.descending else rows.nsmallest(plan.n, plan.column)
+        result = ordered.to_string(index=False)
+    else:
+        result = getattr(rows[plan.column], {"avg": "mean"}.get(plan.op, plan.op))()
+        result = round(float(result), 2) if pd.notna(result) else "nema podataka"
+    return describe(plan, result)
+
+
+@lru_cache(maxsize=8)
+def _csv_profile(digest: str) -> TableProfile:
+    from csv_store import load_frame
+
+    return frame_profile(load_frame(digest))
+
+
+def answer_csv(question: str, digest: str) -> Optional[str]:
+    """Odgovor za fajl iz csv_store-a, ili None ako pitanje treba agentu."""
+    from csv_store import load_frame
+    from tracing import span
+
+    with span("fast_path.csv") as attrs:
+        plan = plan_question(question, _csv_profile(digest))
+        attrs["hit"] = plan is not None
+        return run_frame(plan, load_frame(digest)) if plan else None
+
+
+# --- SQL ---
+
+
+@lru_cache(maxsize=8)
+def _sql_profiles(uri: str, fingerprint: str) -> Tuple[TableProfile, ...]:
+    from sqlalchemy import column, inspect, select, table
+
+    from sql_engine import get_engine
+
+    engine = get_engine(uri)
+    profiles = []
+    with engine.connect() as conn:
+        inspector = inspect(conn)
+        for table_name in inspector.get_table_names():
+            numeric, values = [], {}
+            for info in inspector.get_columns(table_name):
+                try:
+                    python_type = info["type"].python_type
+                except NotImplementedError:
+                    continue
+                if python_type in (int, float) or python_type.__name__ == "Decimal":
+                    numeric.append(info["name"])
+                elif python_type is str:
+                    target = column(info["name"])
+                    query = select(target).select_from(table(table_name, target)).distinct()
+                    found = conn.execute(query.limit(MAX_FILTER_VALUES + 1)).scalars().all()
+                    if len(found) <= MAX_FILTER_VALUES:
+                        values[info["name"]] = tuple(str(value) for value in found if value is not None)
+            profiles.append(TableProfile(table_name, tuple(numeric), values))
+    return tuple(profiles)
+
+
+def run_sql(plan: Plan, uri: str, profile: TableProfile) -> str:
+    import pandas as pd
+    from sqlalchemy import column, func, select, table
+
+    from sql_engine import get_engine
+
+    columns = {name: column(name) for name in (*profile.numeric, *profile.values)}
+    source = table(profile.name, *columns.values())
+    conditions = [columns[name] == value for name, value in plan.filters]
+    with get_engine(uri).connect() as conn:
+        if plan.op == "top":
+            order = columns[plan.column].desc() if plan.descending else columns[plan.column].asc()
+            query = select(source).where(*conditions).order_by(order).limit(plan.n)
+            rows = conn.execute(query)
+            result = pd.DataFrame(rows.fetchall(), columns=list(rows.keys())).to_string(index=False)
+        else:
+            aggregate = {"count": func.count(), "sum": func.sum, "avg": func.avg, "min": func.min, "max": func.max}
+            expression = aggregate["count"] if plan.op == "count" else aggregate[plan.op](columns[plan.column])
+            result = conn.execute(select(expression).select_from(source).where(*conditions)).scalar()
+            if plan.op != "count":
+                result = round(float(result), 2) if result is not None else "nema podataka"
+    return describe(plan, result)
+
+
+def answer_sql(question: str, uri: Optional[str] = None) -> Optional[str]:
+    """Odgovor direktno iz baze, ili None ako pitanje treba SQL agentu."""
+    from sql_engine import SQL_DATABASE_URI, get_schema_digest
+    from tracing import span
+
+    uri = uri or SQL_DATABASE_URI
+    with span("fast_path.sql") as attrs:
+        attrs["hit"] = False
+        profiles = _sql_profiles(uri, get_schema_digest(uri).fingerprint)
+        if len(profiles) > 1:
+            # tabela mora biti pomenuta u pitanju
+            words = tokens(question)
+            profiles = [profile for profile in profiles if _covered(tokens(profile.name), words)]
+        if len(profiles) != 1:
+            return None
+        plan = plan_question(question, profiles[0])
+        attrs["hit"] = plan is not None
+        return run_sql(plan, uri, profiles[0]) if plan else None
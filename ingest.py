@@ -0,0 +1,289 @@
+# ucitavanje pravilnika u vektorsku bazu: podela po clanovima, embedding i BM25 u batch-evima,
+# paralelni upsert i izvestaj o protoku
+#
+#   python ingest.py --target sistematizacija3
+#   python ingest.py --target pravnik --namespace pravnikkraciprazan
+#   VECTOR_BACKEND=local python ingest.py --target pravnik --dry-run
+#
+# Za svaki index/namespace se cuva manifest (ID chunk-a -> hash sadrzaja), pa ponovno pokretanje
+# embeduje i upisuje samo nove i izmenjene chunk-ove i brise uklonjene; --full ignorise manifest.
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple
+
+from bm25_model import PRAVILNIK_PATH, encoder_fingerprint, split_articles
+
+MAX_CHUNK_CHARS = int(os.environ.get("INGEST_MAX_CHUNK_CHARS", "6000"))
+MANIFEST_DIR = os.environ.get("INGEST_MANIFEST_DIR", ".cache/manifests")
+
+# gde se koji korpus upisuje; --index/--project/--namespace menjaju podrazumevane vrednosti
+TARGETS = {
+    # SelfQuery nad meta poljima (title, text, source), dense embeddinzi
+    "sistematizacija3": {
+        "index": "embedings1",
+        "project": "embedings",
+        "namespace": "sistematizacija3",
+        "text_key": "text",
+        "hybrid": False,
+    },
+    # hybrid search (dense + BM25), tekst u polju "context"
+    "pravnik": {
+        "index": "bis",
+        "project": "positive",
+        "namespace": "pravnik",
+        "text_key": "context",
+        "hybrid": True,
+    },
+}
+
+
+class Chunk(NamedTuple):
+    id: str
+    title: str
+    text: str
+
+
+def slugify(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text.replace("đ", "dj").replace("Đ", "Dj"))
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-") or "chunk"
+
+
+def _split_long(text: str, max_chars: int) -> List[str]:
+    """Predugacak clan se deli po pasusima, da stane u jedan embedding zahtev."""
+    if len(text) <= max_chars:
+        return [text]
+    parts, current = [], ""
+    for paragraph in text.split("\n"):
+        if current and len(current) + len(paragraph) + 1 > max_chars:
+            parts.append(current)
+            current = ""
+        current = f"{current}\n{paragraph}" if current else paragraph
+    if current:
+        parts.append(current)
+    return parts
+
+
+def chunk_articles(text: str, max_chars: int = MAX_CHUNK_CHARS) -> List[Chunk]:
+    """Clanovi (`+++ Član N.`) i opisi radnih mesta kao chunk-ovi sa stabilnim ID-jevima.
+
+    ID je naslov (prvi red) + redni broj pojavljivanja istog naslova, pa se ne
+    menja kad se tekst clana izmeni - vazno za inkrementalni reindex.
+    """
+    chunks = []
+    seen: Dict[str, int] = {}
+    for number, article in enumerate(split_articles(text)):
+        first_line = article.split("\n", 1)[0].strip()
+        # tekst pre prvog +++ je uvod (preambula)
+        title = "Uvod" if number == 0 and not text.lstrip().startswith("+++") else first_line
+        slug = slugify(title)
+        seen[slug] = seen.get(slug, 0) + 1
+        base_id = slug if seen[slug] == 1 else f"{slug}-{seen[slug]}"
+        parts = _split_long(article, max_chars)
+        for part_number, part in enumerate(parts, start=1):
+            chunk_id = base_id if len(parts) == 1 else f"{base_id}-deo-{part_number}"
+            chunks.append(Chunk(chunk_id, title, part))
+    return chunks
+
+
+def chunk_hash(chunk: Chunk, text_key: str, hybrid: bool, encoder: str = "") -> str:
+    """Hash svega sto ulazi u vektor - promena bilo cega znaci ponovni embedding.
+
+    `encoder` je potpis BM25 encoder-a (bm25_model.encoder_fingerprint) za hybrid
+    indekse: ponovo fitovan BM25 menja sparse vektore i kad se tekst nije promenio.
+    """
+    from embedding_cache import EMBEDDING_MODEL
+
+    payload = "\0".join([EMBEDDING_MODEL, text_key, str(hybrid), encoder, chunk.title, chunk.text])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def manifest_path(index_name: str, namespace: str) -> str:
+    return os.path.join(MANIFEST_DIR, index_name, f"{namespace or '_default'}.json")
+
+
+def load_manifest(path: str) -> Dict[str, str]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)["chunks"]
+
+
+def save_manifest(path: str, hashes: Dict[str, str], source: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump({"source": source, "updated": time.time(), "chunks": hashes}, file, indent=1)
+    os.replace(tmp_path, path)
+
+
+class Diff(NamedTuple):
+    added: List[Chunk]
+    changed: List[Chunk]
+    removed: List[str]
+    unchanged: int
+
+
+def diff_manifest(chunks: List[Chunk], hashes: Dict[str, str], manifest: Dict[str, str]) -> Diff:
+    added = [chunk for chunk in chunks if chunk.id not in manifest]
+    changed = [
+        chunk for chunk in chunks if chunk.id in manifest and manifest[chunk.id] != hashes[chunk.id]
+    ]
+    removed = sorted(set(manifest) - set(hashes))
+    return Diff(added, changed, removed, len(chunks) - len(added) - len(changed))
+
+
+def delete_vectors(index, ids: List[str], namespace: str, batch_size: int = 1000):
+    for batch in _batches(ids, batch_size):
+        index.delete(ids=batch, namespace=namespace)
+    if ids and hasattr(index, "save"):
+        index.save()
+
+
+def _batches(items: list, size: int) -> List[list]:
+    return [items[start : start + size] for start in range(0, len(items), size)]
+
+
+def embed_chunks(chunks: List[Chunk], batch_size: int, workers: int):
+    """Dense vektori za sve chunk-ove, najvise `workers` zahteva ka OpenAI-ju istovremeno."""
+    import numpy as np
+
+    from embedding_cache import bulk_dispatcher, embed_texts
+
+    if not chunks:
+        return np.empty((0, 0), dtype=np.float32)
+    # dispatcher se zatvara posle embedovanja, da njegovi thread-ovi ne ostanu da vise
+    with bulk_dispatcher(workers, batch_size) as dispatcher, ThreadPoolExecutor(max_workers=workers) as pool:
+        parts = pool.map(
+            lambda batch: embed_texts([chunk.text for chunk in batch], dispatcher=dispatcher),
+            _batches(chunks, batch_size),
+        )
+        return np.vstack(list(parts))
+
+
+def sparse_chunks(chunks: List[Chunk]) -> List[dict]:
+    from bm25_model import load_bm25
+
+    return load_bm25().encode_documents([chunk.text for chunk in chunks])
+
+
+def build_vectors(chunks, dense, sparse, text_key: str, source: str) -> List[dict]:
+    vectors = []
+    for position, chunk in enumerate(chunks):
+        vector = {
+            "id": chunk.id,
+            "values": dense[position].tolist(),
+            "metadata": {text_key: chunk.text, "title": chunk.title, "source": source},
+        }
+        if sparse is not None:
+            vector["sparse_values"] = sparse[position]
+        vectors.append(vector)
+    return vectors
+
+
+def upsert_vectors(index, vectors: List[dict], namespace: str, batch_size: int, workers: int) -> int:
+    """Paralelni upsert u batch-evima; vraca broj upisanih vektora."""
+    if not vectors:
+        return 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(
+            lambda batch: index.upsert(vectors=batch, namespace=namespace),
+            _batches(vectors, batch_size),
+        )
+        count = 0
+        for result in results:
+            upserted = result.get("upserted_count") if isinstance(result, dict) else None
+            count += upserted if upserted is not None else getattr(result, "upserted_count", 0)
+    if hasattr(index, "save"):
+        index.save()
+    return count
+
+
+def report(stages: Dict[str, float], chunks: List[Chunk]):
+    total = sum(stages.values())
+    chars = sum(len(chunk.text) for chunk in chunks)
+    for stage, seconds in stages.items():
+        rate = f"{len(chunks) / seconds:.1f} chunk/s" if seconds > 0 else "-"
+        print(f"  {stage:<8} {seconds:8.2f} s  {rate}")
+    if total > 0:
+        print(
+            f"  ukupno   {total:8.2f} s  {len(chunks) / total:.1f} chunk/s, "
+            f"{chars / total / 1000:.1f} tis. znakova/s"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest a regulation into the vector store")
+    parser.add_argument("--file", default=PRAVILNIK_PATH, help="text file, split on +++ articles")
+    parser.add_argument("--target", choices=sorted(TARGETS), default="sistematizacija3")
+    parser.add_argument("--index", help="override the target's index")
+    parser.add_argument("--project", choices=["embedings", "positive"], help="override the Pinecone project")
+    parser.add_argument("--namespace", help="override the target's namespace")
+    parser.add_argument("--embed-batch", type=int, default=64)
+    parser.add_argument("--embed-workers", type=int, default=4)
+    parser.add_argument("--upsert-batch", type=int, default=100)
+    parser.add_argument("--upsert-workers", type=int, default=4)
+    parser.add_argument("--full", action="store_true", help="ignore the manifest and re-index every chunk")
+    parser.add_argument("--dry-run", action="store_true", help="only split and embed, do not upsert")
+    args = parser.parse_args()
+
+    target = dict(TARGETS[args.target])
+    for key in ("index", "project", "namespace"):
+        if getattr(args, key):
+            target[key] = getattr(args, key)
+
+    stages = {}
+    started = time.perf_counter()
+    with open(args.file, encoding="utf-8") as file:
+        chunks = chunk_articles(file.read())
+    encoder = encoder_fingerprint() if target["hybrid"] else ""
+    hashes = {
+        chunk.id: chunk_hash(chunk, target["text_key"], target["hybrid"], encoder) for chunk in chunks
+    }
+    path = manifest_path(target["index"], target["namespace"])
+    diff = diff_manifest(chunks, hashes, {} if args.full else load_manifest(path))
+    pending = diff.added + diff.changed
+    stages["podela"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    dense = embed_chunks(pending, args.embed_batch, args.embed_workers)
+    stages["embed"] = time.perf_counter() - started
+
+    sparse = None
+    if target["hybrid"] and pending:
+        started = time.perf_counter()
+        sparse = sparse_chunks(pending)
+        stages["bm25"] = time.perf_counter() - started
+
+    vectors = build_vectors(pending, dense, sparse, target["text_key"], os.path.basename(args.file))
+    upserted = 0
+    if not args.dry_run:
+        from vector_store import get_index
+
+        started = time.perf_counter()
+        index = get_index(target["index"], project=target["project"])
+        upserted = upsert_vectors(
+            index, vectors, target["namespace"], args.upsert_batch, args.upsert_workers
+        )
+        delete_vectors(index, diff.removed, target["namespace"])
+        stages["upsert"] = time.perf_counter() - started
+        # manifest se snima tek kad je baza azurirana
+        save_manifest(path, hashes, os.path.basename(args.file))
+
+    print(
+        f"{len(chunks)} chunk-ova iz {args.file} -> {target['index']}/{target['namespace']}: "
+        f"{len(diff.added)} novih, {len(diff.changed)} izmenjenih, {len(diff.removed)} obrisanih, "
+        f"{diff.unchanged} bez promene ({upserted} upisano{', dry run' if args.dry_run else ''})"
+    )
+    report(stages, pending)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+# trajni cache odgovora LLM-a za pozive sa temperaturom 0 - isti model, parametri i poruke daju isti
+# odgovor, pa se ne placa ponovo; vazi za sve LangChain LLM-ove (set_llm_cache) i direktne OpenAI pozive
+#
+#   python llm_cache.py            # broj zapisa i najcesce pogodjeni promptovi
+#   python llm_cache.py --clear
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Optional, Sequence
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import Generation
+
+LLM_CACHE_PATH = os.environ.get("LLM_CACHE_PATH", ".cache/llm.sqlite")
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "20000"))
+LLM_CACHE = os.environ.get("LLM_CACHE", "1") != "0"
+
+# temperatura u llm_string-u: "temperature": 0.0 (dumps modela) ili ('temperature', 0) (parametri)
+TEMPERATURE = re.compile(r"""["']temperature["']\s*[:,]\s*(-?[0-9.]+)""")
+MODEL = re.compile(r"""["'](?:model_name|model)["']\s*[:,]\s*["']([^"']+)["']""")
+
+
+def deterministic(llm_string: str) -> bool:
+    """Kesira se samo kad je temperatura eksplicitno 0 (podrazumevana kod ChatOpenAI je 0.7)."""
+    match = TEMPERATURE.search(llm_string)
+    return match is not None and float(match.group(1)) == 0
+
+
+def _serializable(value):
+    """Bez objekata koje dumps ne ume da serijalizuje (http_client...) - njihov repr nosi adresu u memoriji."""
+    if isinstance(value, dict):
+        return {key: _serializable(item) for key, item in value.items() if not _not_implemented(item)}
+    if isinstance(value, list):
+        return [_serializable(item) for item in value if not _not_implemented(item)]
+    return value
+
+
+def _not_implemented(value) -> bool:
+    return isinstance(value, dict) and value.get("lc") == 1 and value.get("type") == "not_implemented"
+
+
+def stable_llm_string(llm_string: str) -> str:
+    """llm_string bez delova koji se menjaju od procesa do procesa.
+
+    LangChain ga pravi kao `dumps(llm)---parametri`; klijent prosledjen kao
+    http_client= (clients.http_client) u dumps ide kao "not_implemented" sa
+    repr-om `<httpx.Client object at 0x...>`, pa bi se kljuc menjao pri
+    svakom pokretanju.
+    """
+    serialized, separator, params = llm_string.partition("---")
+    try:
+        model = json.loads(serialized)
+    except ValueError:
+        return llm_string
+    return json.dumps(_serializable(model), sort_keys=True) + separator + params
+
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    return hashlib.sha256(f"{stable_llm_string(llm_string)}\0{prompt}".encode("utf-8")).hexdigest()
+
+
+class SQLiteLLMCache(BaseCache):
+    """LangChain BaseCache u SQLite fajlu (WAL), deljen izmedju procesa.
+
+    Kljuc je sha256(llm_string + prompt) - llm_string sadrzi model, temperaturu
+    i ostale parametre (bez klijenata, stable_llm_string), a prompt celu listu poruka. Za svaki zapis se vodi broj
+    pogodaka; preko `max_entries` se izbacuju najduze nekorisceni.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.lookups = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, model TEXT, prompt TEXT, generations TEXT, "
+            "created REAL, last_used REAL, hits INTEGER DEFAULT 0)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self._conn.commit()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        if not deterministic(llm_string):
+            return None
+        key = cache_key(prompt, llm_string)
+        with self._lock:
+            self.lookups += 1
+            row = self._conn.execute("SELECT generations FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE responses SET hits = hits + 1, last_used = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+        return [loads(item) for item in json.loads(row[0])]
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE):
+        if not deterministic(llm_string):
+            return
+        model = MODEL.search(llm_string)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, prompt, generations, created, last_used, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, 0)",
+                (
+                    cache_key(prompt, llm_string),
+                    model.group(1) if model else "",
+                    prompt[:500],
+                    json.dumps([dumps(generation) for generation in return_val]),
+                    now,
+                    now,
+                ),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def clear(self, **kwargs):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self, top: int = 10) -> dict:
+        """Ukupno zapisa i pogodaka, i zapisi sa najvise pogodaka."""
+        with self._lock:
+            entries, hits = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(hits), 0) FROM responses").fetchone()
+            rows = self._conn.execute(
+                "SELECT model, hits, last_used, prompt FROM responses ORDER BY hits DESC LIMIT ?", (top,)
+            ).fetchall()
+        return {
+            "entries": entries,
+            "hits": hits,
+            # samo za ovaj proces
+            "lookups": self.lookups,
+            "misses": self.misses,
+            "top": [{"model": model, "hits": count, "last_used": used, "prompt": prompt} for model, count, used, prompt in rows],
+        }
+
+
+_cache: Optional[SQLiteLLMCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> SQLiteLLMCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SQLiteLLMCache()
+        return _cache
+
+
+def install():
+    """Postavlja cache za sve LangChain LLM-ove u procesu; moze se pozvati vise puta."""
+    if not LLM_CACHE:
+        return
+    from langchain.globals import get_llm_cache as current_cache, set_llm_cache
+
+    cache = get_llm_cache()
+    if current_cache() is not cache:
+        set_llm_cache(cache)
+
+
+def chat_completion(messages: Sequence[dict], model: str = "gpt-3.5-turbo", temperature: float = 0, **kwargs) -> str:
+    """Direktan OpenAI chat poziv kroz isti cache (kesira se samo temperatura 0)."""
+    from clients import openai_client
+
+    llm_string = "openai-chat---" + json.dumps({"model": model, "temperature": temperature, **kwargs}, sort_keys=True)
+    prompt = json.dumps(list(messages), ensure_ascii=False, sort_keys=True)
+    cache = get_llm_cache() if LLM_CACHE else None
+    if cache is not None:
+        cached = cache.lookup(prompt, llm_string)
+        if cached:
+            return cached[0].text
+    response = openai_client().chat.completions.create(
+        model=model, messages=list(messages), temperature=temperature, **kwargs
+    )
+    text = response.choices[0].message.content or ""
+    if cache is not None:
+        cache.update(prompt, llm_string, [Generation(text=text)])
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or clear the LLM response cache")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--clear", action="store_true")
+    args = parser.parse_args()
+
+    cache = get_llm_cache()
+    if args.clear:
+        cache.clear()
+        print(f"Cache {cache.path} je obrisan.")
+        return
+    stats = cache.stats(args.top)
+    print(f"{stats['entries']} zapisa, {stats['hits']} pogodaka ukupno ({cache.path})")
+    for row in stats["top"]:
+        prompt = " ".join(row["prompt"].split())[:80]
+        print(f"{row['hits']:>6}  {row['model']:<24} {prompt}")
+
+
+if __name__ == "__main__":
+    main()
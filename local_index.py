@@ -0,0 +1,332 @@
+# lokalni vektorski indeks u memoriji - zamena za Pinecone za offline rad, testove i benchmark
+#
+# Isti potpis kao pinecone.Index: upsert / query / delete / describe_index_stats, sa namespace-ovima.
+# Mali namespace-ovi se pretrazuju egzaktno (jedno mnozenje matrica), veliki preko NN-descent grafa
+# (pynndescent), pa se kandidati ponovo boduju egzaktno, zajedno sa sparse delom za hybrid search.
+
+import json
+import os
+import threading
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+LOCAL_INDEX_DIR = os.environ.get("LOCAL_INDEX_DIR", ".cache/local_index")
+EXACT_SEARCH_LIMIT = int(os.environ.get("LOCAL_INDEX_EXACT_LIMIT", "20000"))
+DEFAULT_NAMESPACE = "_default"
+
+
+class ScoredVector(NamedTuple):
+    id: str
+    score: float
+    values: Optional[List[float]]
+    metadata: Optional[dict]
+
+
+class QueryResponse:
+    def __init__(self, matches: List[ScoredVector], namespace: str):
+        self.matches = matches
+        self.namespace = namespace
+
+    def to_dict(self) -> dict:
+        return {
+            "matches": [match._asdict() for match in self.matches],
+            "namespace": self.namespace,
+        }
+
+    def __getitem__(self, key):
+        return self.to_dict()[key]
+
+
+_FILTER_OPS = {
+    "$eq": lambda value, arg: value == arg or (isinstance(value, list) and arg in value),
+    "$ne": lambda value, arg: value != arg and not (isinstance(value, list) and arg in value),
+    "$in": lambda value, arg: value in arg
+    or (isinstance(value, list) and any(v in arg for v in value)),
+    "$nin": lambda value, arg: value not in arg
+    and not (isinstance(value, list) and any(v in arg for v in value)),
+    "$gt": lambda value, arg: value is not None and value > arg,
+    "$gte": lambda value, arg: value is not None and value >= arg,
+    "$lt": lambda value, arg: value is not None and value < arg,
+    "$lte": lambda value, arg: value is not None and value <= arg,
+}
+
+
+def matches_filter(metadata: dict, flt: dict) -> bool:
+    """Evaluates a Pinecone-style metadata filter against one record."""
+    for key, condition in flt.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, part) for part in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_filter(metadata, part) for part in condition):
+                return False
+        else:
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            value = metadata.get(key)
+            for op, arg in condition.items():
+                if op not in _FILTER_OPS:
+                    raise ValueError(f"Unsupported filter operator: {op}")
+                if not _FILTER_OPS[op](value, arg):
+                    return False
+    return True
+
+
+def _parse_vector(vector):
+    """Accepts the same upsert formats as Pinecone: dicts or (id, values[, metadata]) tuples."""
+    if isinstance(vector, dict):
+        return (
+            str(vector["id"]),
+            vector["values"],
+            vector.get("sparse_values"),
+            vector.get("metadata") or {},
+        )
+    vector_id, values, *rest = vector
+    return str(vector_id), values, None, (rest[0] if rest else None) or {}
+
+
+class _Namespace:
+    def __init__(self):
+        self.ids: List[str] = []
+        self.positions: Dict[str, int] = {}
+        self.rows: List[np.ndarray] = []
+        self.sparse: List[Optional[dict]] = []
+        self.metadata: List[dict] = []
+        self._dense = None
+        self._unit = None
+        self._sparse_matrix = None
+        self._vocabulary: Dict[int, int] = {}
+        self._graph = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _invalidate(self):
+        self._dense = self._unit = self._sparse_matrix = self._graph = None
+
+    def upsert(self, vector_id, values, sparse, metadata):
+        row = np.asarray(values, dtype=np.float32)
+        if sparse is not None:
+            sparse = {
+                "indices": [int(token) for token in sparse["indices"]],
+                "values": [float(value) for value in sparse["values"]],
+            }
+        if vector_id in self.positions:
+            position = self.positions[vector_id]
+            self.rows[position], self.sparse[position] = row, sparse
+            self.metadata[position] = metadata
+        else:
+            self.positions[vector_id] = len(self.ids)
+            self.ids.append(vector_id)
+            self.rows.append(row)
+            self.sparse.append(sparse)
+            self.metadata.append(metadata)
+        self._invalidate()
+
+    def delete(self, ids):
+        drop = {vector_id for vector_id in ids if vector_id in self.positions}
+        if not drop:
+            return
+        keep = [i for i, vector_id in enumerate(self.ids) if vector_id not in drop]
+        self.ids = [self.ids[i] for i in keep]
+        self.rows = [self.rows[i] for i in keep]
+        self.sparse = [self.sparse[i] for i in keep]
+        self.metadata = [self.metadata[i] for i in keep]
+        self.positions = {vector_id: i for i, vector_id in enumerate(self.ids)}
+        self._invalidate()
+
+    def dense(self) -> np.ndarray:
+        if self._dense is None:
+            self._dense = np.vstack(self.rows).astype(np.float32, copy=False)
+        return self._dense
+
+    def unit(self) -> np.ndarray:
+        if self._unit is None:
+            dense = self.dense()
+            norms = np.linalg.norm(dense, axis=1, keepdims=True)
+            self._unit = dense / np.where(norms == 0, 1, norms)
+        return self._unit
+
+    def sparse_matrix(self):
+        """Sparse vectors as a CSC matrix over a compact vocabulary of token ids."""
+        if self._sparse_matrix is None:
+            from scipy.sparse import csc_matrix
+
+            vocabulary, rows, cols, data = {}, [], [], []
+            for row, sparse in enumerate(self.sparse):
+                if not sparse:
+                    continue
+                for token, value in zip(sparse["indices"], sparse["values"]):
+                    rows.append(row)
+                    cols.append(vocabulary.setdefault(int(token), len(vocabulary)))
+                    data.append(value)
+            self._vocabulary = vocabulary
+            self._sparse_matrix = csc_matrix(
+                (np.asarray(data, dtype=np.float32), (rows, cols)),
+                shape=(len(self.ids), max(len(vocabulary), 1)),
+            )
+        return self._sparse_matrix
+
+    def sparse_scores(self, sparse: dict) -> np.ndarray:
+        matrix = self.sparse_matrix()
+        cols, values = [], []
+        for token, value in zip(sparse["indices"], sparse["values"]):
+            col = self._vocabulary.get(int(token))
+            if col is not None:
+                cols.append(col)
+                values.append(value)
+        if not cols:
+            return np.zeros(len(self.ids), dtype=np.float32)
+        return np.asarray(matrix[:, cols] @ np.asarray(values, dtype=np.float32)).ravel()
+
+    def graph_candidates(self, query: np.ndarray, top_k: int) -> np.ndarray:
+        if self._graph is None:
+            from pynndescent import NNDescent
+
+            self._graph = NNDescent(self.unit(), metric="cosine")
+            self._graph.prepare()
+        k = min(len(self.ids), max(top_k * 10, 100))
+        neighbours, _ = self._graph.query(query[None, :], k=k)
+        return neighbours[0]
+
+
+class LocalIndex:
+    """In-process replacement for `pinecone.Index`.
+
+    Args:
+        name: ime indeksa (koristi se i kao folder za snimanje)
+        metric: "cosine" ili "dotproduct" (hybrid indeksi u Pinecone-u su dotproduct)
+        path: folder u kome se indeks cuva izmedju pokretanja
+    """
+
+    def __init__(self, name: str, metric: str = "cosine", path: str = LOCAL_INDEX_DIR):
+        if metric not in ("cosine", "dotproduct"):
+            raise ValueError("Metric must be cosine or dotproduct")
+        self.name = name
+        self.metric = metric
+        self.path = os.path.join(path, name)
+        self.namespaces: Dict[str, _Namespace] = {}
+        self._lock = threading.RLock()
+        self.load()
+
+    def _namespace(self, namespace: str) -> _Namespace:
+        return self.namespaces.setdefault(namespace or DEFAULT_NAMESPACE, _Namespace())
+
+    def upsert(self, vectors, namespace: str = "", **kwargs) -> dict:
+        with self._lock:
+            store = self._namespace(namespace)
+            count = 0
+            for vector in vectors:
+                store.upsert(*_parse_vector(vector))
+                count += 1
+        return {"upserted_count": count}
+
+    def delete(self, ids=None, delete_all: bool = False, namespace: str = "", **kwargs) -> dict:
+        with self._lock:
+            if delete_all:
+                self.namespaces.pop(namespace or DEFAULT_NAMESPACE, None)
+            elif ids:
+                self._namespace(namespace).delete(ids)
+        return {}
+
+    def describe_index_stats(self, **kwargs) -> dict:
+        with self._lock:
+            return {
+                "namespaces": {
+                    ("" if name == DEFAULT_NAMESPACE else name): {"vector_count": len(store)}
+                    for name, store in self.namespaces.items()
+                },
+                "total_vector_count": sum(len(store) for store in self.namespaces.values()),
+            }
+
+    def query(
+        self,
+        top_k: int = 10,
+        vector=None,
+        sparse_vector: Optional[dict] = None,
+        namespace: str = "",
+        filter: Optional[dict] = None,
+        include_values: bool = False,
+        include_metadata: bool = False,
+        **kwargs,
+    ) -> QueryResponse:
+        with self._lock:
+            store = self.namespaces.get(namespace or DEFAULT_NAMESPACE)
+            if store is None or len(store) == 0:
+                return QueryResponse([], namespace)
+            query = np.asarray(vector, dtype=np.float32)
+            query_norm = float(np.linalg.norm(query))
+
+            candidates = None
+            if filter:
+                candidates = np.array(
+                    [i for i, metadata in enumerate(store.metadata) if matches_filter(metadata, filter)],
+                    dtype=np.int64,
+                )
+                if len(candidates) == 0:
+                    return QueryResponse([], namespace)
+            elif len(store) > EXACT_SEARCH_LIMIT and query_norm > 0:
+                candidates = store.graph_candidates(query / query_norm, top_k)
+
+            if self.metric == "cosine":
+                dense = store.unit() if candidates is None else store.unit()[candidates]
+                scores = dense @ (query / query_norm if query_norm else query)
+            else:
+                dense = store.dense() if candidates is None else store.dense()[candidates]
+                scores = dense @ query
+            if sparse_vector and len(sparse_vector.get("indices", [])):
+                sparse_scores = store.sparse_scores(sparse_vector)
+                scores = scores + (sparse_scores if candidates is None else sparse_scores[candidates])
+
+            k = min(top_k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            matches = []
+            for position in top:
+                row = int(position if candidates is None else candidates[position])
+                matches.append(
+                    ScoredVector(
+                        store.ids[row],
+                        float(scores[position]),
+                        store.rows[row].tolist() if include_values else None,
+                        store.metadata[row] if include_metadata else None,
+                    )
+                )
+            return QueryResponse(matches, namespace)
+
+    def save(self):
+        """Snima sve namespace-ove u `self.path` (npy za vektore, json za ostalo)."""
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            for file_name in os.listdir(self.path):
+                name, extension = os.path.splitext(file_name)
+                if extension in (".npy", ".json") and not len(self.namespaces.get(name, ())):
+                    os.remove(os.path.join(self.path, file_name))
+            for name, store in self.namespaces.items():
+                if len(store) == 0:
+                    continue
+                np.save(os.path.join(self.path, f"{name}.npy"), store.dense())
+                with open(os.path.join(self.path, f"{name}.json"), "w", encoding="utf-8") as file:
+                    json.dump(
+                        {"ids": store.ids, "sparse": store.sparse, "metadata": store.metadata},
+                        file,
+                        ensure_ascii=False,
+                    )
+
+    def load(self):
+        if not os.path.isdir(self.path):
+            return
+        for file_name in os.listdir(self.path):
+            if not file_name.endswith(".json"):
+                continue
+            name = file_name[: -len(".json")]
+            with open(os.path.join(self.path, file_name), encoding="utf-8") as file:
+                data = json.load(file)
+            dense = np.load(os.path.join(self.path, f"{name}.npy"))
+            store = _Namespace()
+            for vector_id, row, sparse, metadata in zip(
+                data["ids"], dense, data["sparse"], data["metadata"]
+            ):
+                store.upsert(vector_id, row, sparse, metadata)
+            self.namespaces[name] = store
@@ -8,7 +8,7 @@ import pinecone
 import os
 import streamlit as st
 import pinecone
-from langchain.embeddings.openai import OpenAIEmbeddings
+from embedding_cache import CachedOpenAIEmbeddings
 from langchain.vectorstores.pinecone import Pinecone
 from langchain.chat_models import ChatOpenAI
 from langchain.retrievers.self_query.base import SelfQueryRetriever
@@ -41,7 +41,7 @@ upit = st.text_input("Pitanje: ")
 text = "text"
 rag_retriever = Pinecone(
     index=st.session_state.idx,
-    embedding=OpenAIEmbeddings(),
+    embedding=CachedOpenAIEmbeddings(),
     text_key=text,
     namespace="positive",
 ).as_retriever()
@@ -81,7 +81,7 @@ text = "text"
 ind3 = pinecone.Index("embedings1")
 vector = Pinecone.from_existing_index(
     index_name="embedings1",
-    embedding=OpenAIEmbeddings(),
+    embedding=CachedOpenAIEmbeddings(),
     text_key=text,
     namespace="sistematizacija3",
 )
@@ -0,0 +1,161 @@
+# agent koji u jednom koraku moze da pozove vise alata - alati se izvrsavaju paralelno u thread pool-u
+
+import contextvars
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from langchain.agents import AgentExecutor, AgentOutputParser, BaseMultiActionAgent
+from langchain.chains import LLMChain
+from langchain.schema import AgentAction, AgentFinish, OutputParserException
+from langchain_core.agents import AgentStep
+
+ACTION_PATTERN = re.compile(
+    r"Action\s*\d*\s*:(.*?)\nAction\s*\d*\s*Input\s*\d*\s*:[\s]*(.*?)(?=\n\s*Action\s*\d*\s*:|\Z)",
+    re.DOTALL,
+)
+
+PARALLEL_INSTRUCTIONS = """If several tools are independent of each other, you may call them in the same step:
+    Action 1: the first action to take
+    Action 1 Input: the input to the first action
+    Action 2: the second action to take
+    Action 2 Input: the input to the second action
+All observations are then returned together."""
+
+
+class MultiActionOutputParser(AgentOutputParser):
+    """Parsira jedan ili vise `Action N:` / `Action N Input:` parova iz odgovora LLM-a."""
+
+    def parse(self, llm_output: str) -> Union[List[AgentAction], AgentFinish]:
+        if "Final Answer:" in llm_output:
+            return AgentFinish(
+                return_values={"output": llm_output.split("Final Answer:")[-1].strip()},
+                log=llm_output,
+            )
+        matches = list(ACTION_PATTERN.finditer(llm_output))
+        if not matches:
+            raise OutputParserException(f"Could not parse LLM output: `{llm_output}`")
+
+        actions = []
+        for number, match in enumerate(matches):
+            # prva akcija nosi i "Thought" deo, ostale samo svoje Action linije
+            start = 0 if number == 0 else match.start()
+            actions.append(
+                AgentAction(
+                    tool=match.group(1).strip(),
+                    tool_input=match.group(2).strip().strip('"'),
+                    log=llm_output[start : match.end()].strip("\n"),
+                )
+            )
+        return actions
+
+    @property
+    def _type(self) -> str:
+        return "multi_action"
+
+
+def format_scratchpad(intermediate_steps: List[Tuple[AgentAction, str]]) -> str:
+    """Scratchpad u kome paralelne akcije jednog koraka stoje jedna ispod druge."""
+    if not intermediate_steps:
+        return ""
+    parts = []
+    for action, observation in intermediate_steps:
+        if parts and not action.log.startswith("Action"):
+            parts.append("Thought: ")
+        parts.append(f"{action.log}\nObservation: {observation}\n")
+    parts.append("Thought: ")
+    return "".join(parts)
+
+
+class LLMMultiActionAgent(BaseMultiActionAgent):
+    """Kao LLMSingleActionAgent, ali plan() moze da vrati vise akcija odjednom."""
+
+    llm_chain: LLMChain
+    output_parser: AgentOutputParser
+    stop: List[str]
+    allowed_tools: Optional[List[str]] = None
+
+    @property
+    def input_keys(self) -> List[str]:
+        return list(set(self.llm_chain.input_keys) - {"intermediate_steps"})
+
+    def get_allowed_tools(self) -> Optional[List[str]]:
+        return self.allowed_tools
+
+    def plan(self, intermediate_steps, callbacks=None, **kwargs: Any):
+        output = self.llm_chain.run(
+            intermediate_steps=intermediate_steps,
+            stop=self.stop,
+            callbacks=callbacks,
+            **kwargs,
+        )
+        return self.output_parser.parse(output)
+
+    async def aplan(self, intermediate_steps, callbacks=None, **kwargs: Any):
+        output = await self.llm_chain.arun(
+            intermediate_steps=intermediate_steps,
+            stop=self.stop,
+            callbacks=callbacks,
+            **kwargs,
+        )
+        return self.output_parser.parse(output)
+
+
+class ParallelAgentExecutor(AgentExecutor):
+    """AgentExecutor koji sve akcije jednog koraka izvrsava istovremeno.
+
+    Observations are returned in the order the actions were planned, so the
+    scratchpad looks the same as if the tools had run one after another.
+    """
+
+    max_workers: int = 4
+
+    def _parsing_error_observation(self, error: OutputParserException) -> str:
+        if isinstance(self.handle_parsing_errors, bool):
+            return "Invalid or incomplete response"
+        if isinstance(self.handle_parsing_errors, str):
+            return self.handle_parsing_errors
+        return self.handle_parsing_errors(error)
+
+    def _iter_next_step(
+        self,
+        name_to_tool_map: Dict[str, Any],
+        color_mapping: Dict[str, str],
+        inputs: Dict[str, str],
+        intermediate_steps: List[Tuple[AgentAction, str]],
+        run_manager=None,
+    ) -> Iterator[Union[AgentFinish, AgentAction, AgentStep]]:
+        try:
+            intermediate_steps = self._prepare_intermediate_steps(intermediate_steps)
+            output = self.agent.plan(
+                intermediate_steps,
+                callbacks=run_manager.get_child() if run_manager else None,
+                **inputs,
+            )
+        except OutputParserException as error:
+            if not self.handle_parsing_errors:
+                raise
+            action = AgentAction("_Exception", str(error.llm_output or error), str(error))
+            yield AgentStep(action=action, observation=self._parsing_error_observation(error))
+            return
+
+        if isinstance(output, AgentFinish):
+            yield output
+            return
+        actions = [output] if isinstance(output, AgentAction) else list(output)
+        yield from actions
+
+        def perform(action):
+            return self._perform_agent_action(name_to_tool_map, color_mapping, action, run_manager)
+
+        if len(actions) == 1:
+            yield perform(actions[0])
+            return
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(actions))) as pool:
+            # svaki thread dobija kopiju konteksta (callback-ovi, stanje tekuceg zahteva)
+            futures = [
+                pool.submit(contextvars.copy_context().run, perform, action)
+                for action in actions
+            ]
+            for future in futures:
+                yield future.result()
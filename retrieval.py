@@ -0,0 +1,257 @@
+# zajednicki hybrid search engine - koriste ga Pisi_u_stilu_Hybrid, Test_setup, Test_dva_alata i custom_llm_agent
+
+import concurrent.futures
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from bm25_model import encode_queries
+from embedding_cache import EMBEDDING_MODEL, embed_texts, get_embedding
+from retrieval_cache import get_or_compute, retrieval_key
+from tracing import span
+
+# koliko se najduze ceka jedan namespace u pretrazi vise namespace-ova (sekunde)
+NAMESPACE_TIMEOUT = float(os.environ.get("NAMESPACE_TIMEOUT", "5"))
+FANOUT_WORKERS = int(os.environ.get("FANOUT_WORKERS", "8"))
+
+
+class Match(NamedTuple):
+    """Jedan pogodak iz indeksa - umesto ugnjezdenog dict-a iz result.to_dict()."""
+
+    id: str
+    score: float
+    context: str
+    metadata: dict
+    # dense vektor dokumenta iz indeksa (za MMR i dedup u context_builder.py)
+    values: Optional[np.ndarray] = None
+
+
+def hybrid_score_norm(dense, sparse, alpha: float):
+    """Hybrid score using a convex combination
+
+    alpha * dense + (1 - alpha) * sparse
+
+    Args:
+        dense: float32 vector (or a matrix of vectors, one per row)
+        sparse: a dict of `indices` and `values`
+        alpha: scale between 0 and 1
+    """
+    if alpha < 0 or alpha > 1:
+        raise ValueError("Alpha must be between 0 and 1")
+    return np.asarray(dense, dtype=np.float32) * np.float32(alpha), _scale_sparse(
+        sparse, 1 - alpha
+    )
+
+
+def _scale_sparse(sparse, factor: float) -> dict:
+    return {
+        "indices": list(sparse["indices"]),
+        "values": np.asarray(sparse["values"], dtype=np.float32) * np.float32(factor),
+    }
+
+
+class HybridRetriever:
+    """Sparse-dense pretraga jednog namespace-a u Pinecone indeksu.
+
+    Args:
+        index: Pinecone index (ili bilo sta sa istim `query` potpisom)
+        namespace: namespace u indeksu
+        sparse_encoder: funkcija koja za tekst vraca sparse vektor;
+            podrazumevano BM25 fitovan na nasem korpusu (bm25_model.py)
+        embedding_model: OpenAI model za dense vektore
+        index_name: ime indeksa, deo kljuca za cache rezultata
+    """
+
+    def __init__(
+        self,
+        index,
+        namespace: str,
+        sparse_encoder: Optional[Callable[[str], dict]] = None,
+        embedding_model: str = EMBEDDING_MODEL,
+        index_name: str = "",
+    ):
+        self.index = index
+        self.namespace = namespace
+        self.sparse_encoder = sparse_encoder or encode_queries
+        self.embedding_model = embedding_model
+        self.index_name = index_name
+
+    def _key(self, question: str, top_k: int, alpha: float) -> tuple:
+        return retrieval_key("hybrid", self.index_name, self.namespace, question, top_k, alpha)
+
+    def _query_index(self, dense: np.ndarray, sparse: dict, top_k: int) -> List[Match]:
+        with span("pinecone.query", namespace=self.namespace, top_k=top_k):
+            result = self.index.query(
+                top_k=top_k,
+                vector=dense.tolist(),
+                sparse_vector={
+                    "indices": sparse["indices"],
+                    "values": sparse["values"].tolist(),
+                },
+                include_metadata=True,
+                include_values=True,
+                namespace=self.namespace,
+            )
+        matches = []
+        for item in result.matches:
+            metadata = item.metadata or {}
+            values = np.asarray(item.values, dtype=np.float32) if item.values else None
+            matches.append(
+                Match(item.id, float(item.score), metadata.get("context", ""), metadata, values)
+            )
+        return matches
+
+    def _query_uncached(self, question: str, top_k: int, alpha: float) -> List[Match]:
+        dense = get_embedding(question, model=self.embedding_model)
+        with span("bm25"):
+            sparse = self.sparse_encoder(question)
+        hdense, hsparse = hybrid_score_norm(dense, sparse, alpha)
+        return self._query_index(hdense, hsparse, top_k)
+
+    def query_vectors(self, question: str, dense: np.ndarray, sparse: dict, top_k: int, alpha: float) -> List[Match]:
+        """Kao query, sa vec izracunatim (i alpha-om skaliranim) vektorima pitanja."""
+        return get_or_compute(
+            self._key(question, top_k, alpha),
+            lambda: self._query_index(dense, sparse, top_k),
+        )
+
+    def query(self, question: str, top_k: int, alpha: float) -> List[Match]:
+        return get_or_compute(
+            self._key(question, top_k, alpha),
+            lambda: self._query_uncached(question, top_k, alpha),
+        )
+
+    def query_batch(
+        self, questions: Sequence[str], top_k: int, alpha: float, max_workers: int = 8
+    ) -> List[List[Match]]:
+        """Scores many questions in a single pass.
+
+        All questions are embedded with one request and weighted as one matrix;
+        the index queries then run concurrently.
+        """
+        if not questions:
+            return []
+        if alpha < 0 or alpha > 1:
+            raise ValueError("Alpha must be between 0 and 1")
+        hdense = embed_texts(questions, model=self.embedding_model) * np.float32(alpha)
+        hsparse = [
+            _scale_sparse(self.sparse_encoder(question), 1 - alpha)
+            for question in questions
+        ]
+
+        def run(args):
+            question, dense, sparse = args
+            return self.query_vectors(question, dense, sparse, top_k, alpha)
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(questions))) as pool:
+            # kopija konteksta, da upiti budu span-ovi tekuceg zahteva
+            futures = [
+                pool.submit(contextvars.copy_context().run, run, args)
+                for args in zip(questions, hdense, hsparse)
+            ]
+            return [future.result() for future in futures]
+
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=FANOUT_WORKERS, thread_name_prefix="fanout")
+        return _pool
+
+
+def merge_matches(results: Dict[str, List[Match]], top_k: int, min_score: Optional[float] = None) -> List[Match]:
+    """Spaja pogotke vise namespace-ova u jednu top-k listu.
+
+    Svi namespace-ovi su u istom indeksu, a upit je isti (isti dense i sparse
+    vektor, ista alpha), pa su score-ovi direktno uporedivi i rangira se po
+    njima. Normalizacija po namespace-u bi slab pogodak iz namespace-a bez
+    relevantnih dokumenata digla na 1.0, iznad stvarno dobrih. Pogoci sa
+    score-om <= `min_score` se odbacuju; namespace se upisuje u metadata.
+    """
+    ranked = [
+        match._replace(metadata={**match.metadata, "namespace": namespace})
+        for namespace, matches in results.items()
+        for match in matches
+        if min_score is None or match.score > min_score
+    ]
+    # sort je stabilan - kod istog score-a ostaje redosled namespace-ova
+    ranked.sort(key=lambda match: match.score, reverse=True)
+    return ranked[:top_k]
+
+
+class MultiNamespaceRetriever:
+    """Hybrid pretraga vise namespace-ova istog indeksa odjednom.
+
+    Pitanje se embeduje i enkoduje jednom, upiti u namespace-ove idu
+    istovremeno, a namespace koji ne odgovori za `timeout` sekundi (ili
+    vrati gresku) se preskace i upisuje u `skipped`. Ukupno trajanje je
+    zato blizu najsporijeg namespace-a, a ne zbiru.
+
+    Args:
+        index: Pinecone index
+        namespaces: namespace-ovi koji se pretrazuju
+        timeout: najduze cekanje po namespace-u (od pocetka upita)
+        options: ostali argumenti za HybridRetriever (index_name, sparse_encoder...)
+    """
+
+    def __init__(self, index, namespaces: Sequence[str], timeout: float = NAMESPACE_TIMEOUT, **options):
+        self.retrievers = [HybridRetriever(index, namespace, **options) for namespace in namespaces]
+        self.timeout = timeout
+        self.skipped: Dict[str, str] = {}
+
+    def query(self, question: str, top_k: int, alpha: float, min_score: Optional[float] = None) -> List[Match]:
+        self.skipped = {}
+        if not self.retrievers:
+            return []
+        first = self.retrievers[0]
+        with span("fanout", namespaces=len(self.retrievers), top_k=top_k) as attrs:
+            dense = get_embedding(question, model=first.embedding_model)
+            with span("bm25"):
+                sparse = first.sparse_encoder(question)
+            hdense, hsparse = hybrid_score_norm(dense, sparse, alpha)
+
+            pool = _get_pool()
+            futures = {
+                retriever.namespace: pool.submit(
+                    # kopija konteksta, da upiti budu span-ovi tekuceg zahteva
+                    contextvars.copy_context().run,
+                    retriever.query_vectors,
+                    question,
+                    hdense,
+                    hsparse,
+                    top_k,
+                    alpha,
+                )
+                for retriever in self.retrievers
+            }
+            deadline = time.monotonic() + self.timeout
+            results, error = {}, None
+            for namespace, future in futures.items():
+                try:
+                    results[namespace] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+                except concurrent.futures.TimeoutError:
+                    # upit se zavrsava u pozadini i ostaje u cache-u rezultata
+                    future.cancel()
+                    self.skipped[namespace] = "timeout"
+                except Exception as exc:
+                    self.skipped[namespace] = str(exc)
+                    error = exc
+            attrs["skipped"] = len(self.skipped)
+        if not results and error is not None:
+            raise error
+        return merge_matches(results, top_k, min_score)
+
+
+def join_context(matches: Sequence[Match], score: float) -> str:
+    """Spaja kontekst svih pogodaka ciji je score veci od praga."""
+    return "".join(match.context + "\n\n" for match in matches if match.score > score)
@@ -0,0 +1,72 @@
+# zajednicki TTL cache rezultata pretrage - isti upit sa istim parametrima ne ide ponovo u vektorsku bazu
+
+import os
+import threading
+from typing import Any, Callable, Hashable, Optional
+
+from cachetools import TTLCache
+
+from tracing import span
+
+RETRIEVAL_CACHE_TTL = float(os.environ.get("RETRIEVAL_CACHE_TTL", "600"))
+RETRIEVAL_CACHE_SIZE = int(os.environ.get("RETRIEVAL_CACHE_SIZE", "1024"))
+
+_cache = TTLCache(maxsize=RETRIEVAL_CACHE_SIZE, ttl=RETRIEVAL_CACHE_TTL)
+_lock = threading.Lock()
+
+
+def retrieval_key(
+    kind: str,
+    index_name: str,
+    namespace: str,
+    query: str,
+    k: int,
+    alpha: Optional[float] = None,
+    score: Optional[float] = None,
+) -> tuple:
+    """Kljuc za cache.
+
+    Args:
+        kind: "semantic", "hybrid" ili "self"
+        score: prag samo ako je sacuvani rezultat vec filtriran po njemu;
+            sirovi rezultati se kesiraju sa None i filtriraju posle
+    """
+    return (kind, index_name, namespace or "", query, int(k), alpha, score)
+
+
+def get_or_compute(key: Hashable, compute: Callable[[], Any]) -> Any:
+    with _lock:
+        try:
+            return _cache[key]
+        except KeyError:
+            pass
+    value = compute()
+    with _lock:
+        _cache[key] = value
+    return value
+
+
+def clear():
+    with _lock:
+        _cache.clear()
+
+
+def _traced(name: str, func, *args, **kwargs):
+    with span(name):
+        return func(*args, **kwargs)
+
+
+def similarity_search_with_score(vectorstore, index_name: str, namespace: str, query: str, k: int):
+    """Kesirana verzija vectorstore.similarity_search_with_score."""
+    return get_or_compute(
+        retrieval_key("semantic", index_name, namespace, query, k),
+        lambda: _traced("pinecone.search", vectorstore.similarity_search_with_score, query, k=k),
+    )
+
+
+def self_query(retriever, index_name: str, namespace: str, query: str, k: int):
+    """Kesirana verzija retriever.get_relevant_documents za SelfQueryRetriever."""
+    return get_or_compute(
+        retrieval_key("self", index_name, namespace, query, k),
+        lambda: _traced("self_query", retriever.get_relevant_documents, query),
+    )
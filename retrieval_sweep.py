@@ -0,0 +1,264 @@
+# sweep parametara pretrage (k, alpha, prag score-a) za semantic, hybrid i self-query nad oznacenim
+# pitanjima - recall@k, MRR, latencija i broj tokena konteksta za svaku kombinaciju
+#
+#   python retrieval_sweep.py pitanja.jsonl --k 1 3 5 --alpha 0.1 0.5 0.9 --score 0 0.5 --min-recall 0.8
+#
+# pitanja.jsonl, jedan red po pitanju ("relevant" su ID-jevi ili delovi teksta relevantnih dokumenata):
+#   {"question": "Ko odobrava godisnji odmor?", "relevant": ["clan-12"]}
+
+import argparse
+import csv
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+# podrazumevani indeksi i namespace-ovi, kao u Test_setup.py
+RETRIEVERS = {
+    "semantic": {"index": "embedings1", "project": "embedings", "namespace": "positive", "text_key": "text"},
+    "hybrid": {"index": "bis", "project": "positive", "namespace": "pravnikkraciprazan", "text_key": "context"},
+    "self": {"index": "embedings1", "project": "embedings", "namespace": "sistematizacija3", "text_key": "text"},
+}
+
+
+class Hit(NamedTuple):
+    id: Optional[str]
+    score: Optional[float]
+    text: str
+
+
+class Run(NamedTuple):
+    retriever: str
+    alpha: Optional[float]
+    k: int
+    question: dict
+    hits: List[Hit]
+    latency_ms: float
+
+
+FIELDS = [
+    "retriever", "alpha", "k", "score", "recall", "mrr", "latency_p50_ms", "latency_p95_ms", "prompt_tokens",
+]
+
+
+def count_tokens(text: str) -> int:
+    from context_builder import count_tokens
+
+    return count_tokens(text)
+
+
+def is_relevant(hit: Hit, relevant: List[str]) -> bool:
+    """Pogodak je relevantan ako mu je ID u listi ili sadrzi neki od navedenih delova teksta."""
+    return any(hit.id == label or (label and label in hit.text) for label in relevant)
+
+
+def semantic_search(config: dict, question: str, k: int) -> List[Hit]:
+    from embedding_cache import get_embedding
+    from vector_store import get_index
+
+    index = get_index(config["index"], project=config["project"])
+    result = index.query(
+        top_k=k,
+        vector=get_embedding(question).tolist(),
+        include_metadata=True,
+        namespace=config["namespace"],
+    )
+    return [
+        Hit(item.id, float(item.score), (item.metadata or {}).get(config["text_key"], ""))
+        for item in result.matches
+    ]
+
+
+def hybrid_search(config: dict, question: str, k: int, alpha: float) -> List[Hit]:
+    from retrieval import HybridRetriever
+    from vector_store import get_index
+
+    retriever = HybridRetriever(
+        get_index(config["index"], project=config["project"]),
+        config["namespace"],
+        index_name=config["index"],
+    )
+    # bez retrieval cache-a, da se meri stvarna latencija
+    return [Hit(m.id, m.score, m.context) for m in retriever._query_uncached(question, k, alpha)]
+
+
+@lru_cache(maxsize=None)
+def _self_query_retriever(index: str, project: str, namespace: str, text_key: str, k: int):
+    from langchain.chains.query_constructor.base import AttributeInfo
+    from langchain.chat_models import ChatOpenAI
+    from langchain.retrievers.self_query.base import SelfQueryRetriever
+
+    from clients import http_client
+    from embedding_cache import CachedOpenAIEmbeddings
+    from llm_cache import install
+    from vector_store import from_existing_index, self_query_translator
+
+    # sweep ponavlja ista pitanja - konstrukcija upita (temperatura 0) ide iz cache-a
+    install()
+    metadata_field_info = [
+        AttributeInfo(name="title", description="Tema dokumenta", type="string"),
+        AttributeInfo(name="keyword", description="reci za pretragu", type="string"),
+        AttributeInfo(name="text", description="The Content of the document", type="string"),
+        AttributeInfo(name="source", description="The Source of the document", type="string"),
+    ]
+    vectorstore = from_existing_index(index, CachedOpenAIEmbeddings(), text_key, namespace, project)
+    return SelfQueryRetriever.from_llm(
+        ChatOpenAI(temperature=0, http_client=http_client()),
+        vectorstore,
+        "Sistematizacija radnih mesta",
+        metadata_field_info,
+        enable_limit=True,
+        search_kwargs={"k": k},
+        structured_query_translator=self_query_translator(),
+    )
+
+
+def self_search(config: dict, question: str, k: int) -> List[Hit]:
+    retriever = _self_query_retriever(
+        config["index"], config["project"], config["namespace"], config["text_key"], k
+    )
+    # self-query ne vraca score ni ID - relevantnost se proverava po tekstu
+    return [Hit(doc.metadata.get("id"), None, doc.page_content) for doc in retriever.get_relevant_documents(question)]
+
+
+def search(name: str, config: dict, question: str, k: int, alpha: Optional[float]) -> List[Hit]:
+    if name == "hybrid":
+        return hybrid_search(config, question, k, alpha)
+    if name == "semantic":
+        return semantic_search(config, question, k)
+    return self_search(config, question, k)
+
+
+def run_queries(questions: List[dict], retrievers: List[str], configs: Dict[str, dict], ks: List[int], alphas: List[float], workers: int) -> List[Run]:
+    """Svako pitanje jednom po kombinaciji (retriever, alpha za hybrid, k), sa sopstvenom latencijom.
+
+    Pre merenja svako pitanje prodje jednom kroz svaki retriever bez merenja, pa
+    su embedding i LLM cache i konekcije jednako topli za sve kombinacije - inace
+    prva alpha (ili prvi k) placa embedding pitanja, a ostale ne.
+    """
+    warmup = [
+        (name, alphas[0] if name == "hybrid" else None, min(ks), question)
+        for name in retrievers
+        for question in questions
+    ]
+    tasks = [
+        (name, alpha, k, question)
+        for name in retrievers
+        for alpha in (alphas if name == "hybrid" else [None])
+        for k in ks
+        for question in questions
+    ]
+
+    def run(task):
+        name, alpha, k, question = task
+        started = time.perf_counter()
+        hits = search(name, configs[name], question["question"], k, alpha)
+        return Run(name, alpha, k, question, hits, (time.perf_counter() - started) * 1000)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(run, warmup))
+        return list(pool.map(run, tasks))
+
+
+def evaluate(runs: List[Run], scores: List[float]) -> List[dict]:
+    """recall@k, MRR, latencija i tokeni konteksta za svaku kombinaciju (retriever, alpha, k, prag).
+
+    Latencija kombinacije je upit sa tim k plus odsecanje po pragu i sklapanje konteksta.
+    """
+    groups: Dict[tuple, List[Run]] = {}
+    for run in runs:
+        groups.setdefault((run.retriever, run.alpha, run.k), []).append(run)
+
+    rows = []
+    for (name, alpha, k), group in groups.items():
+        # self-query nema score, pa prag ne vazi
+        for score in scores if name != "self" else [None]:
+            recalls, reciprocal_ranks, tokens, latencies = [], [], [], []
+            for run in group:
+                started = time.perf_counter()
+                kept = [
+                    hit for hit in run.hits[:k]
+                    if score is None or hit.score is None or hit.score > score
+                ]
+                context = "".join(hit.text + "\n\n" for hit in kept)
+                latencies.append(run.latency_ms + (time.perf_counter() - started) * 1000)
+                relevant = run.question["relevant"]
+                found = {
+                    label for label in relevant
+                    if any(is_relevant(hit, [label]) for hit in kept)
+                }
+                recalls.append(len(found) / len(relevant) if relevant else 0.0)
+                rank = next((i for i, hit in enumerate(kept, 1) if is_relevant(hit, relevant)), None)
+                reciprocal_ranks.append(1 / rank if rank else 0.0)
+                tokens.append(count_tokens(context + run.question["question"]))
+            rows.append(
+                {
+                    "retriever": name,
+                    "alpha": alpha,
+                    "k": k,
+                    "score": score,
+                    "recall": round(float(np.mean(recalls)), 3),
+                    "mrr": round(float(np.mean(reciprocal_ranks)), 3),
+                    "latency_p50_ms": round(float(np.percentile(latencies, 50)), 1),
+                    "latency_p95_ms": round(float(np.percentile(latencies, 95)), 1),
+                    "prompt_tokens": round(float(np.mean(tokens)), 1),
+                }
+            )
+    return rows
+
+
+def cheapest(rows: List[dict], min_recall: float) -> Optional[dict]:
+    """Najjeftinija kombinacija (tokeni, pa latencija) koja dostize trazeni recall."""
+    good = [row for row in rows if row["recall"] >= min_recall]
+    return min(good, key=lambda row: (row["prompt_tokens"], row["latency_p50_ms"])) if good else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep retrieval parameters on labelled questions")
+    parser.add_argument("questions", help="JSONL with question and relevant (ids or text snippets)")
+    parser.add_argument("--retriever", nargs="+", choices=sorted(RETRIEVERS), default=sorted(RETRIEVERS))
+    parser.add_argument("--k", nargs="+", type=int, default=[1, 3, 5])
+    parser.add_argument("--alpha", nargs="+", type=float, default=[0.1, 0.5, 0.9])
+    parser.add_argument("--score", nargs="+", type=float, default=[0.0, 0.5])
+    for name in RETRIEVERS:
+        parser.add_argument(f"--{name}-namespace", help=f"namespace for the {name} retriever")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--min-recall", type=float, help="print the cheapest setting with at least this recall")
+    parser.add_argument("--output", default="retrieval_sweep.csv")
+    args = parser.parse_args()
+
+    with open(args.questions, encoding="utf-8") as file:
+        questions = [json.loads(line) for line in file if line.strip()]
+    configs = {name: dict(config) for name, config in RETRIEVERS.items()}
+    for name in RETRIEVERS:
+        namespace = getattr(args, f"{name}_namespace")
+        if namespace:
+            configs[name]["namespace"] = namespace
+
+    runs = run_queries(questions, args.retriever, configs, sorted(set(args.k)), args.alpha, args.workers)
+    rows = evaluate(runs, args.score)
+
+    with open(args.output, "w", newline="", encoding="utf-8") as file:
+        # zaglavlje i kad nema nijednog reda (prazan fajl sa pitanjima)
+        writer = csv.DictWriter(file, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    print(f"{'retriever':<9} {'alpha':>5} {'k':>3} {'score':>5} {'recall':>7} {'mrr':>6} {'p50 ms':>8} {'tokeni':>8}")
+    for row in sorted(rows, key=lambda row: (-row["recall"], row["prompt_tokens"])):
+        print(
+            f"{row['retriever']:<9} {str(row['alpha'] if row['alpha'] is not None else '-'):>5} {row['k']:>3} "
+            f"{str(row['score'] if row['score'] is not None else '-'):>5} {row['recall']:>7} {row['mrr']:>6} "
+            f"{row['latency_p50_ms']:>8} {row['prompt_tokens']:>8}"
+        )
+    print(f"{len(rows)} kombinacija -> {args.output}")
+    if args.min_recall is not None:
+        best = cheapest(rows, args.min_recall)
+        print(f"Najjeftinije sa recall >= {args.min_recall}: {best}" if best else "Nijedna kombinacija ne dostize trazeni recall.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# vreme uvoza pri pokretanju aplikacija (python -X importtime) - koliko kosta svaki modul pre prvog prikaza
+# stranice; izlazi sa greskom ako neka aplikacija predje budzet, pa moze da stoji u CI-ju / pre deploy-a
+#
+#   python startup_profile.py                          # sve aplikacije, budzet IMPORT_BUDGET_MS
+#   python startup_profile.py Pisi_u_stilu_FT.py --top 30
+#   python startup_profile.py --budget 800 --module tracing
+
+import argparse
+import ast
+import os
+import subprocess
+import sys
+from typing import Dict, List, NamedTuple, Optional
+
+IMPORT_BUDGET_MS = float(os.environ.get("IMPORT_BUDGET_MS", "1500"))
+
+ENTRY_POINTS = [
+    "Pisi_u_stilu_FT.py",
+    "Pisi_u_stilu_Test.py",
+    "Pisi_u_stilu_Hybrid.py",
+    "Pisi_u_stilu_Self.py",
+    "MultiTool_app.py",
+    "Test_setup.py",
+    "Test_dva_alata.py",
+    "csvtest.py",
+    "sql.py",
+]
+
+
+class ImportCost(NamedTuple):
+    module: str
+    self_ms: float
+    cumulative_ms: float
+    depth: int
+
+
+def module_imports(path: str) -> str:
+    """Import naredbe sa nivoa modula - ono sto se izvrsi pre main(), bez Streamlit poziva."""
+    with open(path, encoding="utf-8") as file:
+        tree = ast.parse(file.read(), filename=path)
+    return "\n".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def parse_importtime(stderr: str) -> List[ImportCost]:
+    """Redovi `import time: self [us] | cumulative | imported package`."""
+    costs = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        costs.append(ImportCost(name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000, depth))
+    return costs
+
+
+def _importtime(code: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+
+
+_baseline: Optional[set] = None
+
+
+def _interpreter_modules() -> set:
+    """Moduli koje interpreter ucita i za prazan program (site, encodings...) - ne racunaju se."""
+    global _baseline
+    if _baseline is None:
+        _baseline = {cost.module for cost in parse_importtime(_importtime("pass").stderr)}
+    return _baseline
+
+
+def profile(code: str) -> Dict:
+    result = _importtime(code)
+    baseline = _interpreter_modules()
+    costs = [cost for cost in parse_importtime(result.stderr) if cost.module not in baseline]
+    error = None
+    if result.returncode != 0:
+        error = (result.stderr.strip().splitlines() or ["?"])[-1]
+    return {
+        "total_ms": sum(cost.self_ms for cost in costs),
+        "costs": costs,
+        "error": error,
+    }
+
+
+def report(name: str, result: Dict, budget: float, top: int) -> bool:
+    ok = result["error"] is None and result["total_ms"] <= budget
+    status = "OK" if ok else "PREKORACEN BUDZET" if result["error"] is None else "GRESKA"
+    print(f"{name}: {result['total_ms']:.0f} ms (budzet {budget:.0f} ms) {status}")
+    if result["error"]:
+        print(f"  {result['error']}")
+    # najskuplji paketi prvog nivoa (cumulative), pa najskuplji pojedinacni moduli (self)
+    top_level = sorted((cost for cost in result["costs"] if cost.depth == 0), key=lambda cost: -cost.cumulative_ms)
+    for cost in top_level[:top]:
+        print(f"  {cost.cumulative_ms:>9.1f} ms  {cost.module}")
+    heaviest = sorted(result["costs"], key=lambda cost: -cost.self_ms)[:top]
+    if heaviest:
+        print("  najsporiji moduli (self):")
+        for cost in heaviest:
+            print(f"  {cost.self_ms:>9.1f} ms  {cost.module}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile import time of the apps and enforce a startup budget")
+    parser.add_argument("files", nargs="*", help="app scripts (default: all Streamlit apps)")
+    parser.add_argument("--module", action="append", default=[], help="profile `import MODULE` instead of a script")
+    parser.add_argument("--budget", type=float, default=IMPORT_BUDGET_MS, help="max import time per app in ms")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    files = args.files or ([] if args.module else ENTRY_POINTS)
+    targets = [(module, f"import {module}") for module in args.module]
+    targets += [(path, module_imports(path)) for path in files]
+
+    failed = [name for name, code in targets if not report(name, profile(code), args.budget, args.top)]
+    if failed:
+        print(f"Preko budzeta ili sa greskom: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# streaming tokena u Streamlit kontejner, uz merenje vremena do prvog tokena i brzine generisanja
+
+import json
+import os
+import time
+from typing import Any, Optional
+
+import streamlit as st
+from langchain_core.callbacks import BaseCallbackHandler
+
+STREAM_METRICS_PATH = os.environ.get("STREAM_METRICS_PATH", ".cache/stream_metrics.jsonl")
+
+
+class TimedStreamHandler(BaseCallbackHandler):
+    """Ispisuje tokene u `container` kako stizu i meri TTFT i tokens/s.
+
+    Args:
+        container: Streamlit placeholder (st.empty())
+        title: ako je zadat, tekst se prikazuje u expander-u sa tim naslovom
+        answer_prefix: ako je zadat (npr. "Final Answer:" kod agenta), prikazuje se
+            samo tekst posle njega; meri se vreme do prvog prikazanog tokena
+    """
+
+    def __init__(self, container, title: Optional[str] = None, answer_prefix: Optional[str] = None):
+        self.container = container
+        self.title = title
+        self.answer_prefix = answer_prefix
+        self.started = time.perf_counter()
+        self.first_token = None
+        self.last_token = None
+        self.tokens = 0
+        self.text = ""
+        self._generation = ""
+
+    def on_llm_start(self, serialized, prompts, **kwargs: Any):
+        self._generation = ""
+
+    def on_chat_model_start(self, serialized, messages, **kwargs: Any):
+        self._generation = ""
+
+    def on_llm_new_token(self, token: str, **kwargs: Any):
+        self._generation += token
+        if self.answer_prefix:
+            if self.answer_prefix not in self._generation:
+                return
+            text = self._generation.split(self.answer_prefix, 1)[1].lstrip()
+            if not text:
+                return
+        else:
+            text = self._generation
+        now = time.perf_counter()
+        if self.first_token is None:
+            self.first_token = now
+        self.last_token = now
+        self.tokens += 1
+        self.text = text
+        self._render(self.text + "▌")
+
+    def _render(self, text: str):
+        if self.title is None:
+            self.container.markdown(text)
+            return
+        with self.container.container():
+            with st.expander(self.title, expanded=True):
+                st.markdown(text)
+
+    def metrics(self) -> dict:
+        if self.first_token is None:
+            return {"ttft_s": None, "tokens": 0, "tokens_per_s": None}
+        generating = self.last_token - self.first_token
+        return {
+            "ttft_s": round(self.first_token - self.started, 3),
+            "tokens": self.tokens,
+            "tokens_per_s": round(self.tokens / generating, 1) if generating > 0 else None,
+        }
+
+
+def record_metrics(app: str, model: str, metrics: dict):
+    """Dodaje metrike jednog zahteva u JSON-lines fajl."""
+    if os.path.dirname(STREAM_METRICS_PATH):
+        os.makedirs(os.path.dirname(STREAM_METRICS_PATH), exist_ok=True)
+    with open(STREAM_METRICS_PATH, "a", encoding="utf-8") as file:
+        file.write(json.dumps({"ts": time.time(), "app": app, "model": model, **metrics}) + "\n")
+
+
+def metrics_caption(metrics: dict) -> str:
+    if metrics["ttft_s"] is None:
+        return "Nije bilo streaming tokena."
+    return (
+        f"Prvi token posle {metrics['ttft_s']} s, "
+        f"{metrics['tokens']} tokena, {metrics['tokens_per_s']} tokena/s"
+    )
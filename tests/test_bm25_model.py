@@ -0,0 +1,93 @@
+from types import SimpleNamespace
+
+import pytest
+
+from bm25_model import MAX_TOP_K, read_namespace
+
+
+class ListingIndex:
+    def __init__(self, records):
+        self.records = records
+        self.fetched = []
+
+    def list(self, namespace):
+        ids = list(self.records)
+        for start in range(0, len(ids), 250):
+            yield ids[start : start + 250]
+
+    def fetch(self, ids, namespace):
+        self.fetched.append(len(ids))
+        return SimpleNamespace(vectors={i: SimpleNamespace(metadata={"context": self.records[i]}) for i in ids})
+
+    def query(self, **kwargs):
+        raise AssertionError("query se ne koristi kad postoji list")
+
+
+class PodIndex:
+    """Bez listanja; upit vraca najvise top_k zapisa, svaki put druge."""
+
+    def __init__(self, count):
+        self.count = count
+        self.offset = 0
+        self.top_ks = []
+
+    def list(self, namespace):
+        raise RuntimeError("list is not supported for pod indexes")
+
+    def query(self, top_k, vector, include_metadata, namespace):
+        self.top_ks.append(top_k)
+        ids = range(self.offset, min(self.offset + top_k, self.count))
+        self.offset += top_k
+        return SimpleNamespace(
+            matches=[SimpleNamespace(id=str(i), metadata={"text": f"clan {i}"}) for i in ids]
+        )
+
+
+def test_read_namespace_pages_list_and_fetch():
+    index = ListingIndex({str(i): f"clan {i}" for i in range(520)})
+    texts = read_namespace(index, "pravnik")
+    assert len(texts) == 520
+    assert max(index.fetched) <= 100
+
+
+def test_read_namespace_without_list_queries_within_pinecone_limit():
+    index = PodIndex(2500)
+    texts = read_namespace(index, "pravnik", dimension=8)
+    assert len(texts) == 2500
+    assert set(index.top_ks) == {MAX_TOP_K}
+
+
+def test_read_namespace_does_not_hide_errors_after_listing_started():
+    class Broken(ListingIndex):
+        def fetch(self, ids, namespace):
+            if self.fetched:
+                raise RuntimeError("timeout")
+            return super().fetch(ids, namespace)
+
+    with pytest.raises(RuntimeError):
+        read_namespace(Broken({str(i): "x" for i in range(300)}), "pravnik")
+
+
+def test_encoder_fingerprint_follows_params_file(tmp_path):
+    from bm25_model import encoder_fingerprint
+
+    path = tmp_path / "bm25_params.json"
+    path.write_text('{"avgdl": 10.0}', encoding="utf-8")
+    first = encoder_fingerprint(str(path))
+    assert encoder_fingerprint(str(path)) == first
+    path.write_text('{"avgdl": 12.5}', encoding="utf-8")
+    assert encoder_fingerprint(str(path)) != first
+
+
+def test_refitted_encoder_changes_hybrid_chunk_hash(tmp_path):
+    pytest.importorskip("langchain_core")
+    from bm25_model import encoder_fingerprint
+    from ingest import Chunk, chunk_hash
+
+    path = tmp_path / "bm25_params.json"
+    chunk = Chunk("clan-1", "Član 1.", "Tekst clana")
+    path.write_text('{"avgdl": 10.0}', encoding="utf-8")
+    before = chunk_hash(chunk, "context", True, encoder_fingerprint(str(path)))
+    path.write_text('{"avgdl": 12.5}', encoding="utf-8")
+    assert chunk_hash(chunk, "context", True, encoder_fingerprint(str(path))) != before
+    assert chunk_hash(chunk, "text", False) == chunk_hash(chunk, "text", False)
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("langchain_core")
+
+import context_builder
+from retrieval import Match
+
+
+def unit(*values):
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def no_query_embedding(*args, **kwargs):
+    raise AssertionError("pitanje se ne embeduje kad svi pogoci imaju score")
+
+
+def test_mmr_ranks_by_index_score(monkeypatch):
+    monkeypatch.setattr(context_builder, "get_embedding", no_query_embedding)
+    monkeypatch.setattr(context_builder, "count_tokens", lambda text: len(text.split()))
+    # redosled odredjuje score iz indeksa (hybrid), bez embedovanja pitanja
+    matches = [
+        Match("a", 0.9, "prvi clan", {}, unit(1, 0, 0)),
+        Match("b", 0.6, "drugi clan", {}, unit(0, 1, 0)),
+        Match("c", 0.3, "treci clan", {}, unit(0, 0, 1)),
+    ]
+    selected = context_builder.select_context(matches, "pitanje", mmr_lambda=1.0)
+    assert [match.id for match in selected] == ["a", "b", "c"]
+
+    relevance = context_builder._relevance(
+        matches, np.stack([match.values for match in matches]), "pitanje", "model"
+    )
+    assert relevance.tolist() == pytest.approx([1.0, 2 / 3, 1 / 3])
+
+
+def test_cosine_only_for_matches_without_score(monkeypatch):
+    monkeypatch.setattr(context_builder, "get_embedding", lambda query, model: unit(0, 1, 0))
+    matches = [
+        Match("a", 0.8, "sa score-om", {}, unit(1, 0, 0)),
+        Match("b", None, "bez score-a, blizu pitanja", {}, unit(0.1, 1, 0)),
+        Match("c", None, "bez score-a, daleko", {}, unit(0, 0, 1)),
+    ]
+    vectors = np.stack([match.values for match in matches])
+    relevance = context_builder._relevance(matches, vectors, "pitanje", "model")
+    assert relevance[0] == pytest.approx(1.0)
+    assert relevance[1] == pytest.approx(float(unit(0.1, 1, 0) @ unit(0, 1, 0)))
+    assert relevance[2] == pytest.approx(0.0)
+
+
+def test_matches_without_vectors_are_never_embedded(monkeypatch):
+    monkeypatch.setattr(context_builder, "get_embedding", no_query_embedding)
+    monkeypatch.setattr(context_builder, "count_tokens", lambda text: len(text.split()))
+    # kao matches_from_documents: LangChain rezultati bez Match.values
+    matches = [
+        Match("a", 0.9, "prvi clan pravilnika", {}),
+        Match("b", 0.8, "prvi  clan pravilnika", {}),
+        Match("c", 0.7, "drugi clan", {}),
+        Match("d", 0.6, "treci clan pravilnika o radu", {}),
+    ]
+    selected = context_builder.select_context(matches, "pitanje", budget=6)
+    # tacan duplikat (posle normalizacije razmaka) ispada, "d" ne staje u budzet
+    assert [match.id for match in selected] == ["a", "c"]
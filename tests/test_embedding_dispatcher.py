@@ -0,0 +1,50 @@
+import threading
+
+import numpy as np
+import pytest
+
+from embedding_dispatcher import EmbeddingDispatcher
+
+
+def fake_embed(texts, model):
+    return np.array([[len(text), 1.0] for text in texts], dtype=np.float32)
+
+
+def dispatcher_threads():
+    return [thread for thread in threading.enumerate() if thread.name.startswith("embedding-dispatcher")]
+
+
+def test_close_finishes_queued_requests_and_stops_workers():
+    before = len(dispatcher_threads())
+    dispatcher = EmbeddingDispatcher(fake_embed, max_wait_ms=50, workers=3)
+    futures = [dispatcher.submit(["a" * size], "model") for size in range(1, 6)]
+    dispatcher.close(timeout=5)
+
+    assert [future.result(timeout=1)[0, 0] for future in futures] == [1, 2, 3, 4, 5]
+    assert len(dispatcher_threads()) == before
+    with pytest.raises(RuntimeError):
+        dispatcher.submit(["a"], "model")
+
+
+def test_context_manager_closes():
+    before = len(dispatcher_threads())
+    with EmbeddingDispatcher(fake_embed, workers=2) as dispatcher:
+        assert dispatcher.embed(["ab", "c"], "model")[:, 0].tolist() == [2, 1]
+    assert len(dispatcher_threads()) == before
+
+
+def test_ingest_embed_chunks_does_not_leak_threads(monkeypatch):
+    pytest.importorskip("langchain_core")
+    import embedding_cache
+    from ingest import Chunk, embed_chunks
+
+    monkeypatch.setattr(embedding_cache, "_embed_remote", fake_embed)
+    monkeypatch.setattr(
+        embedding_cache, "embed_texts", lambda texts, dispatcher: dispatcher.embed(texts, "model")
+    )
+    chunks = [Chunk(f"clan-{i}", f"Član {i}.", "x" * i) for i in range(1, 11)]
+    before = len(dispatcher_threads())
+    for _ in range(3):
+        dense = embed_chunks(chunks, batch_size=3, workers=4)
+    assert dense[:, 0].tolist() == list(range(1, 11))
+    assert len(dispatcher_threads()) == before
@@ -0,0 +1,37 @@
+from concurrent.futures import Future
+
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("cachetools")
+
+import export
+
+
+class FinishedPool:
+    """Pool ciji je posao vec gotov kad submit vrati - callback se poziva odmah."""
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+def test_render_async_with_already_finished_future(monkeypatch):
+    monkeypatch.setattr(export, "_get_pool", FinishedPool)
+    monkeypatch.setattr(export, "_pending", {})
+    monkeypatch.setattr(export, "_results", {})
+
+    assert export.render_async("tekst", "txt").result() == b"tekst"
+    assert export._pending == {}
+    assert export.cached("tekst", "txt") == b"tekst"
+
+
+def test_pool_does_not_fork(monkeypatch):
+    monkeypatch.setattr(export, "_pool", None)
+    pool = export._get_pool()
+    try:
+        assert pool._mp_context.get_start_method() == "spawn"
+    finally:
+        pool.shutdown()
+        export._pool = None
@@ -0,0 +1,55 @@
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from fast_path import Plan, frame_profile, plan_question, run_frame
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame(
+        {
+            "Sektor": ["Sektor prodaje", "Sektor prodaje", "Sektor IT", "Sektor IT"],
+            "Radno mesto": ["Samostalni referent", "Direktor sektora", "Menadzer prodaje", "Samostalni referent"],
+            "Plata": [100, 150, 130, 90],
+            "Pol": ["M", "Z", "Z", "M"],
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    "question",
+    [
+        "koliko zaposlenih ima platu vecu od 120",
+        "Koliko ima zaposlenih žena u Sektoru prodaje",
+        "Koliko ima rukovodilaca u Sektoru prodaje",
+        "koliko referenata ima",
+        "koliko redova ima platu iznad 100",
+        "prosecna plata u sektoru prodaje bez direktora",
+        "koliko redova ima manje plate od proseka",
+        "prosecna plata u sektoru HR",
+    ],
+)
+def test_unrecognized_conditions_go_to_agent(frame, question):
+    # svaki uslov koji planer ne razume bi se precutno izgubio - takva pitanja idu agentu
+    assert plan_question(question, frame_profile(frame)) is None
+
+
+def test_simple_questions_stay_on_fast_path(frame):
+    profile = frame_profile(frame)
+    assert plan_question("Koliko ima redova u Sektoru prodaje", profile) == Plan(
+        "count", None, (("Sektor", "Sektor prodaje"),)
+    )
+    assert plan_question("Prosecna plata u Sektoru IT", profile) == Plan("avg", "Plata", (("Sektor", "Sektor IT"),))
+    assert plan_question("Najvisa plata", profile) == Plan("max", "Plata", ())
+    assert plan_question("top 3 plate u Sektoru prodaje", profile) == Plan(
+        "top", "Plata", (("Sektor", "Sektor prodaje"),), 3
+    )
+    assert plan_question("Prosecna plata za Samostalni referent", profile) == Plan(
+        "avg", "Plata", (("Radno mesto", "Samostalni referent"),)
+    )
+
+
+def test_run_frame(frame):
+    plan = Plan("count", None, (("Sektor", "Sektor prodaje"),))
+    assert run_frame(plan, frame) == "Broj redova (Sektor = Sektor prodaje): 2"
@@ -0,0 +1,51 @@
+from typing import Any
+
+import pytest
+
+pytest.importorskip("langchain_core")
+from langchain_core.outputs import Generation
+
+from llm_cache import SQLiteLLMCache, cache_key, stable_llm_string
+
+
+class Client:
+    """Kao httpx.Client - dumps ga ne ume da serijalizuje, repr nosi adresu."""
+
+
+def chat_llm_string(**kwargs) -> str:
+    fake = pytest.importorskip("langchain_community.chat_models.fake")
+
+    class Chat(fake.FakeListChatModel):
+        http_client: Any = None
+        temperature: float = 0.7
+
+        @classmethod
+        def is_lc_serializable(cls):
+            return True
+
+    return Chat(responses=["odgovor"], **kwargs)._get_llm_string(stop=None)
+
+
+def test_key_ignores_http_client_instance():
+    clients = [Client(), Client()]
+    first = chat_llm_string(temperature=0, http_client=clients[0])
+    second = chat_llm_string(temperature=0, http_client=clients[1])
+    assert "not_implemented" in first and first != second
+    assert cache_key("prompt", first) == cache_key("prompt", second)
+    assert "http_client" not in stable_llm_string(first)
+    # ostali parametri i dalje cepaju kljuc
+    assert cache_key("prompt", first) != cache_key("prompt", chat_llm_string(temperature=0.5, http_client=Client()))
+
+
+def test_hit_across_client_instances(tmp_path):
+    cache = SQLiteLLMCache(str(tmp_path / "llm.sqlite"))
+    address = '{{"lc": 1, "type": "constructor", "id": ["ChatOpenAI"], "kwargs": {{"temperature": 0.0, ' \
+        '"http_client": {{"lc": 1, "type": "not_implemented", "id": ["httpx", "Client"], ' \
+        '"repr": "<httpx.Client object at {}>"}}}}}}---[(\'stop\', None)]'
+    cache.update("prompt", address.format("0x7f01"), [Generation(text="odgovor")])
+    assert cache.lookup("prompt", address.format("0x7f02"))[0].text == "odgovor"
+
+
+def test_non_json_llm_string_is_unchanged():
+    llm_string = 'openai-chat---{"model": "gpt-4", "temperature": 0}'
+    assert stable_llm_string(llm_string) == llm_string
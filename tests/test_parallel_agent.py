@@ -0,0 +1,92 @@
+import inspect
+import threading
+import time
+
+import pytest
+
+langchain = pytest.importorskip("langchain")
+
+from langchain.agents import AgentExecutor, BaseMultiActionAgent
+from langchain.schema import AgentAction, AgentFinish
+from langchain_core.tools import Tool
+
+from agent_pool import request_state
+from parallel_agent import ParallelAgentExecutor
+
+
+def test_perform_agent_action_signature():
+    # ParallelAgentExecutor poziva privatni metod AgentExecutor-a; pri promeni verzije langchain-a
+    # (requirements.txt: 0.1.5) ovaj test mora da pukne pre nego agent
+    method = getattr(AgentExecutor, "_perform_agent_action", None)
+    assert method is not None
+    assert list(inspect.signature(method).parameters) == [
+        "self",
+        "name_to_tool_map",
+        "color_mapping",
+        "agent_action",
+        "run_manager",
+    ]
+
+
+class TwoActionAgent(BaseMultiActionAgent):
+    """Prvo oba Pinecone alata odjednom, zatim kraj sa svim observation-ima."""
+
+    @property
+    def input_keys(self):
+        return ["input"]
+
+    def plan(self, intermediate_steps, callbacks=None, **kwargs):
+        if intermediate_steps:
+            return AgentFinish({"output": [step[1] for step in intermediate_steps]}, log="")
+        return [
+            AgentAction("Pinecone Keyword search", "godisnji odmor", log="Action 1: Pinecone Keyword search"),
+            AgentAction("Pinecone Semantic search", "bolovanje", log="Action 2: Pinecone Semantic search"),
+        ]
+
+    async def aplan(self, intermediate_steps, callbacks=None, **kwargs):
+        return self.plan(intermediate_steps, callbacks, **kwargs)
+
+
+def test_parallel_hybrid_searches_build_context_from_their_own_matches(monkeypatch):
+    pytest.importorskip("myfunc")
+    import context_builder
+    import custom_llm_agent
+    from retrieval import Match
+
+    barrier = threading.Barrier(2, timeout=5)
+
+    class FakeRetriever:
+        def __init__(self, index, namespace, **options):
+            pass
+
+        def query(self, upit, top_k, alpha):
+            # oba poziva su istovremeno u upitu; drugi zavrsava pre prvog
+            barrier.wait()
+            time.sleep(0.05 if alpha < 0.5 else 0)
+            return [
+                Match(f"{upit}-{i}", 0.9 - i / 10, f"pogodak {i} za {upit} (alpha {alpha})", {}) for i in range(2)
+            ]
+
+    monkeypatch.setattr(custom_llm_agent, "get_index", lambda *args, **kwargs: None)
+    monkeypatch.setattr(custom_llm_agent, "HybridRetriever", FakeRetriever)
+    monkeypatch.setattr(custom_llm_agent, "open_file", lambda path: "{zahtev}|{uk_teme}|{ft_model}")
+    monkeypatch.setattr(context_builder, "count_tokens", lambda text: len(text.split()))
+
+    tools = [
+        Tool(name="Pinecone Keyword search", func=custom_llm_agent.hybrid_search_process_alpha1, description="kw"),
+        Tool(name="Pinecone Semantic search", func=custom_llm_agent.hybrid_search_process_alpha2, description="sem"),
+    ]
+    executor = ParallelAgentExecutor(agent=TwoActionAgent(), tools=tools, max_workers=2)
+    session_state = {"namespace": "pravnik", "broj_k": 2, "stil": "stil", "model": "model"}
+    with request_state(question="pitanje", session_state=session_state):
+        keyword, semantic = executor.run("pitanje")
+
+    keyword_context = keyword.messages[1].content
+    semantic_context = semantic.messages[1].content
+    assert "pogodak 0 za godisnji odmor (alpha 0.1)" in keyword_context
+    assert "pogodak 1 za godisnji odmor (alpha 0.1)" in keyword_context
+    assert "bolovanje" not in keyword_context
+    assert "pogodak 0 za bolovanje (alpha 0.9)" in semantic_context
+    assert "godisnji odmor" not in semantic_context
+    # zajednicki session_state se ne menja iz alata
+    assert "tematika" not in session_state
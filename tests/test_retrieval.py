@@ -0,0 +1,32 @@
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from retrieval import Match, merge_matches
+
+
+def matches(namespace, scores):
+    return [Match(f"{namespace}-{i}", score, f"tekst {namespace} {i}", {}) for i, score in enumerate(scores)]
+
+
+def test_weak_namespace_does_not_outrank_strong_one():
+    results = {
+        "pravnik": matches("pravnik", [0.92, 0.90, 0.88]),
+        "zapisnici": matches("zapisnici", [0.07]),
+        "bis": matches("bis", [0.06]),
+    }
+    merged = merge_matches(results, top_k=3, min_score=0.05)
+    assert [match.id for match in merged] == ["pravnik-0", "pravnik-1", "pravnik-2"]
+    assert [match.score for match in merged] == [0.92, 0.90, 0.88]
+    assert {match.metadata["namespace"] for match in merged} == {"pravnik"}
+
+
+def test_merge_interleaves_by_score_and_drops_below_min_score():
+    results = {
+        "pravnik": matches("pravnik", [0.8, 0.4]),
+        "bis": matches("bis", [0.6, 0.05]),
+    }
+    merged = merge_matches(results, top_k=5, min_score=0.05)
+    assert [(match.id, match.metadata["namespace"]) for match in merged] == [
+        ("pravnik-0", "pravnik"), ("bis-0", "bis"), ("pravnik-1", "pravnik"),
+    ]
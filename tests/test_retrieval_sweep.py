@@ -0,0 +1,56 @@
+import csv
+import sys
+
+import retrieval_sweep
+from retrieval_sweep import Hit
+
+
+def fake_hybrid(calls):
+    def search(config, question, k, alpha):
+        calls.append((question, k, alpha))
+        # prvi poziv za pitanje je hladan (embedding), ostali topli
+        cold = sum(1 for call in calls if call[0] == question) == 1
+        retrieval_sweep.time.sleep(0.05 if cold else 0.002 * k)
+        return [Hit(f"clan-{i}", 1.0 - i / 10, f"tekst {i}") for i in range(k)]
+
+    return search
+
+
+def test_latency_is_measured_per_configuration_with_warm_cache(monkeypatch):
+    calls = []
+    monkeypatch.setattr(retrieval_sweep, "hybrid_search", fake_hybrid(calls))
+    monkeypatch.setattr(retrieval_sweep, "count_tokens", len)
+    questions = [{"question": "pitanje", "relevant": ["clan-2"]}]
+
+    runs = retrieval_sweep.run_queries(
+        questions, ["hybrid"], retrieval_sweep.RETRIEVERS, [1, 5], [0.1, 0.9], workers=1
+    )
+    # jedan upit za zagrevanje, pa po jedan za svaku kombinaciju (alpha, k)
+    assert [call[1:] for call in calls] == [(1, 0.1), (1, 0.1), (5, 0.1), (1, 0.9), (5, 0.9)]
+    assert [(run.alpha, run.k, len(run.hits)) for run in runs] == [
+        (0.1, 1, 1), (0.1, 5, 5), (0.9, 1, 1), (0.9, 5, 5),
+    ]
+    # nijedna merena kombinacija ne placa hladan cache
+    assert all(run.latency_ms < 40 for run in runs)
+
+    rows = retrieval_sweep.evaluate(runs, [0.0, 0.85])
+    assert [(row["alpha"], row["k"], row["score"]) for row in rows] == [
+        (0.1, 1, 0.0), (0.1, 1, 0.85), (0.1, 5, 0.0), (0.1, 5, 0.85),
+        (0.9, 1, 0.0), (0.9, 1, 0.85), (0.9, 5, 0.0), (0.9, 5, 0.85),
+    ]
+    by_k = {row["k"]: row["latency_p50_ms"] for row in rows if row["alpha"] == 0.1 and row["score"] == 0.0}
+    assert by_k[1] < by_k[5]
+    assert [row["recall"] for row in rows if row["alpha"] == 0.1] == [0.0, 0.0, 1.0, 0.0]
+
+
+def test_empty_question_file_writes_header_only(tmp_path, monkeypatch, capsys):
+    questions = tmp_path / "pitanja.jsonl"
+    questions.write_text("\n", encoding="utf-8")
+    output = tmp_path / "sweep.csv"
+    monkeypatch.setattr(sys, "argv", ["retrieval_sweep.py", str(questions), "--output", str(output)])
+
+    retrieval_sweep.main()
+
+    with open(output, encoding="utf-8") as file:
+        assert list(csv.reader(file)) == [retrieval_sweep.FIELDS]
+    assert "0 kombinacija" in capsys.readouterr().out
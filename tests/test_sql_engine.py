@@ -0,0 +1,106 @@
+import threading
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+from sqlalchemy import text
+
+import sql_engine
+
+
+@pytest.fixture
+def uri(tmp_path, monkeypatch):
+    # SQLite umesto MySQL baze; svaki test sa praznim cache-om
+    monkeypatch.setattr(sql_engine, "_digests", {})
+    monkeypatch.setattr(sql_engine, "_uri_locks", {})
+    uri = f"sqlite:///{tmp_path / 'test.db'}"
+    with sql_engine.get_engine(uri).begin() as conn:
+        conn.execute(text("CREATE TABLE zaposleni (ime TEXT, sektor TEXT, plata INTEGER)"))
+        conn.execute(text("INSERT INTO zaposleni VALUES ('Ana', 'Prodaja', 100), ('Marko', 'IT', 150)"))
+    yield uri
+    sql_engine.get_engine(uri).dispose()
+
+
+def test_get_engine_is_shared_per_uri(uri, tmp_path):
+    assert sql_engine.get_engine(uri) is sql_engine.get_engine(uri)
+    assert sql_engine.get_engine(f"sqlite:///{tmp_path / 'druga.db'}") is not sql_engine.get_engine(uri)
+
+
+def test_schema_fingerprint_changes_with_schema(uri):
+    engine = sql_engine.get_engine(uri)
+    before = sql_engine.schema_fingerprint(engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO zaposleni VALUES ('Jelena', 'IT', 120)"))
+    assert sql_engine.schema_fingerprint(engine) == before
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE zaposleni ADD COLUMN pol TEXT"))
+    assert sql_engine.schema_fingerprint(engine) != before
+
+
+def test_get_schema_digest_rebuilds_only_on_schema_change(uri, monkeypatch):
+    pytest.importorskip("langchain")
+    monkeypatch.setattr(sql_engine, "SQL_SCHEMA_CHECK_INTERVAL", 0)
+    first = sql_engine.get_schema_digest(uri)
+    assert first.tables == ("zaposleni",)
+    assert "CREATE TABLE zaposleni" in first.table_info
+
+    second = sql_engine.get_schema_digest(uri)
+    assert second.database is first.database
+    assert second.checked >= first.checked
+
+    with sql_engine.get_engine(uri).begin() as conn:
+        conn.execute(text("CREATE TABLE sektori (naziv TEXT)"))
+    third = sql_engine.get_schema_digest(uri)
+    assert third.database is not first.database
+    assert third.tables == ("sektori", "zaposleni")
+
+
+def test_get_schema_digest_does_not_block_other_databases(uri, tmp_path, monkeypatch):
+    other = f"sqlite:///{tmp_path / 'druga.db'}"
+    started, release = threading.Event(), threading.Event()
+    built = []
+
+    def build_digest(build_uri, fingerprint):
+        if build_uri == uri:
+            # spora introspekcija prve baze
+            started.set()
+            assert release.wait(5)
+        built.append(build_uri)
+        return sql_engine.SchemaDigest(fingerprint, (), "", None, sql_engine.time.time())
+
+    monkeypatch.setattr(sql_engine, "_build_digest", build_digest)
+    slow = threading.Thread(target=sql_engine.get_schema_digest, args=(uri,))
+    slow.start()
+    assert started.wait(5)
+    try:
+        # druga baza se osvezi dok prva jos drzi svoj lock
+        sql_engine.get_schema_digest(other)
+        assert built == [other]
+    finally:
+        release.set()
+        slow.join(5)
+    assert built == [other, uri]
+    sql_engine.get_engine(other).dispose()
+
+
+def test_ask_sends_known_schema_to_agent(uri, monkeypatch):
+    pytest.importorskip("langchain_core")
+    monkeypatch.setattr(
+        sql_engine,
+        "_build_digest",
+        lambda build_uri, fingerprint: sql_engine.SchemaDigest(
+            fingerprint, ("zaposleni",), "CREATE TABLE zaposleni (...)", None, sql_engine.time.time()
+        ),
+    )
+    questions = []
+
+    class FakeAgent:
+        def run(self, question, callbacks):
+            questions.append(question)
+            return "2"
+
+    monkeypatch.setattr(sql_engine, "get_sql_agent", lambda agent_uri: FakeAgent())
+    assert sql_engine.ask("koliko ima zaposlenih", uri) == "2"
+    assert questions[0].startswith(sql_engine.SQL_INSTRUCTIONS + "koliko ima zaposlenih")
+    assert "Tables: zaposleni" in questions[0]
+    assert "CREATE TABLE zaposleni (...)" in questions[0]
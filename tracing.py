@@ -0,0 +1,381 @@
+# tracing po zahtevu - trajanje svake faze (embedding, Pinecone, agent i njegovi alati, Serper, LLM,
+# export) kao span-ovi; zahtev se upisuje kao jedan red u JSON-lines fajl, a zbir se daje kao
+# Prometheus tekst
+#
+#   python tracing.py                  # Prometheus tekst iz TRACE_PATH
+#   python tracing.py --serve 9108     # /metrics za Prometheus scrape
+#   python tracing.py --summary        # p50/p95 po aplikaciji i fazi
+
+import argparse
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+TRACE_PATH = os.environ.get("TRACE_PATH", ".cache/traces.jsonl")
+TRACING = os.environ.get("TRACING", "1") != "0"
+
+# granice histograma u sekundama
+BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+ITERATION_BUCKETS = (1, 2, 3, 4, 5, 6, 8, 10, 15)
+
+
+class Trace:
+    """Span-ovi jednog zahteva; span-ove mogu dodavati i thread-ovi agenta."""
+
+    def __init__(self, app: str, attrs: dict):
+        self.id = uuid.uuid4().hex[:16]
+        self.app = app
+        self.attrs = attrs
+        self.ts = time.time()
+        self.started = time.perf_counter()
+        self.spans: List[dict] = []
+        self._lock = threading.Lock()
+
+    def add(self, name: str, span_id: str, parent: Optional[str], started: float, ended: float, error: Optional[str], attrs: dict):
+        span = {
+            "name": name,
+            "id": span_id,
+            "parent": parent,
+            "start_ms": round((started - self.started) * 1000, 2),
+            "duration_ms": round((ended - started) * 1000, 2),
+        }
+        if error:
+            span["error"] = error
+        if attrs:
+            span["attrs"] = attrs
+        with self._lock:
+            self.spans.append(span)
+
+
+_trace = contextvars.ContextVar("trace", default=None)
+_parent = contextvars.ContextVar("trace_parent", default=None)
+_write_lock = threading.Lock()
+
+
+def _new_id() -> str:
+    return uuid.uuid4().hex[:8]
+
+
+def current_trace() -> Optional[Trace]:
+    return _trace.get()
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Meri blok kao span tekuceg zahteva; van request_trace ne radi nista.
+
+    Vraca dict atributa koji se moze dopuniti u bloku (npr. broj pogodaka).
+    """
+    trace = _trace.get()
+    if trace is None:
+        yield attrs
+        return
+    span_id = _new_id()
+    parent = _parent.get()
+    token = _parent.set(span_id)
+    started = time.perf_counter()
+    error = None
+    try:
+        yield attrs
+    except BaseException as exc:
+        error = type(exc).__name__
+        raise
+    finally:
+        _parent.reset(token)
+        trace.add(name, span_id, parent, started, time.perf_counter(), error, attrs)
+
+
+def traced(name: str):
+    """Dekorator - ceo poziv funkcije je jedan span."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+@contextmanager
+def request_trace(app: str, **attrs):
+    """Jedan zahtev korisnika; na kraju se svi span-ovi upisuju kao jedan red u TRACE_PATH.
+
+    Ako je zahtev vec u toku (npr. export iz aplikacije koja vec meri), ovo je samo span.
+    """
+    if not TRACING or _trace.get() is not None:
+        with span(app, **attrs) as span_attrs:
+            yield span_attrs
+        return
+    trace = Trace(app, attrs)
+    trace_token = _trace.set(trace)
+    parent_token = _parent.set(None)
+    error = None
+    try:
+        yield attrs
+    except BaseException as exc:
+        error = type(exc).__name__
+        raise
+    finally:
+        _parent.reset(parent_token)
+        _trace.reset(trace_token)
+        _write(trace, time.perf_counter() - trace.started, error)
+
+
+def _write(trace: Trace, duration: float, error: Optional[str]):
+    record = {
+        "trace_id": trace.id,
+        "ts": trace.ts,
+        "app": trace.app,
+        "duration_ms": round(duration * 1000, 2),
+        "attrs": trace.attrs,
+        "spans": sorted(trace.spans, key=lambda span: span["start_ms"]),
+    }
+    if error:
+        record["error"] = error
+    line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+    with _write_lock:
+        if os.path.dirname(TRACE_PATH):
+            os.makedirs(os.path.dirname(TRACE_PATH), exist_ok=True)
+        with open(TRACE_PATH, "a", encoding="utf-8") as file:
+            file.write(line)
+
+
+class AgentTraceHandler(BaseCallbackHandler):
+    """Callback za AgentExecutor - span za svaki poziv alata i LLM-a, i broj iteracija.
+
+    Pravi se unutar span-a agenta; ParallelAgentExecutor poziva callback-ove iz vise
+    thread-ova, pa se trace i roditelj pamte pri pravljenju.
+    """
+
+    def __init__(self):
+        self.trace = _trace.get()
+        self.parent = _parent.get()
+        self.iterations = 0
+        self.tool_calls = 0
+        self._started: Dict[Any, tuple] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id, name: str, attrs: dict):
+        with self._lock:
+            self._started[run_id] = (name, time.perf_counter(), attrs)
+
+    def _end(self, run_id, error: Optional[BaseException] = None):
+        with self._lock:
+            started = self._started.pop(run_id, None)
+        if started is None or self.trace is None:
+            return
+        name, began, attrs = started
+        self.trace.add(name, _new_id(), self.parent, began, time.perf_counter(), type(error).__name__ if error else None, attrs)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs: Any):
+        # agent planira sledeci korak jednim pozivom LLM-a - to je jedna iteracija
+        with self._lock:
+            self.iterations += 1
+            iteration = self.iterations
+        self._start(run_id, "agent.llm", {"iteration": iteration})
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs: Any):
+        self.on_llm_start(serialized, messages, run_id=run_id, **kwargs)
+
+    def on_llm_end(self, response, *, run_id, **kwargs: Any):
+        self._end(run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs: Any):
+        self._end(run_id, error)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs: Any):
+        with self._lock:
+            self.tool_calls += 1
+        self._start(run_id, "tool", {"tool": (serialized or {}).get("name", "")})
+
+    def on_tool_end(self, output, *, run_id, **kwargs: Any):
+        self._end(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs: Any):
+        self._end(run_id, error)
+
+    def stats(self) -> dict:
+        return {"iterations": self.iterations, "tool_calls": self.tool_calls}
+
+
+# --- Prometheus ---
+
+
+def _stage(span: dict) -> str:
+    # svaki alat agenta je posebna faza
+    tool = span.get("attrs", {}).get("tool")
+    return f"tool:{tool}" if span["name"] == "tool" and tool else span["name"]
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[position] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def _labels(**labels) -> str:
+    return ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+
+
+class Aggregator:
+    """Zbir svih zahteva iz JSON-lines fajla; na svakom update() cita samo nove redove."""
+
+    def __init__(self, path: str = TRACE_PATH):
+        self.path = path
+        self.offset = 0
+        self.requests: Dict[tuple, Histogram] = {}
+        self.stages: Dict[tuple, Histogram] = {}
+        self.iterations: Dict[tuple, Histogram] = {}
+        self.errors: Dict[tuple, int] = {}
+
+    def update(self):
+        if not os.path.exists(self.path):
+            return
+        if os.path.getsize(self.path) < self.offset:
+            # fajl je rotiran ili obrisan - brojanje krece iz pocetka
+            self.__init__(self.path)
+        with open(self.path, "rb") as file:
+            file.seek(self.offset)
+            for line in file:
+                if not line.endswith(b"\n"):
+                    # red se jos upisuje
+                    break
+                self.offset += len(line)
+                try:
+                    self.add(json.loads(line))
+                except ValueError:
+                    continue
+
+    def add(self, record: dict):
+        app = record["app"]
+        self.requests.setdefault((app,), Histogram(BUCKETS)).observe(record["duration_ms"] / 1000)
+        if record.get("error"):
+            self.errors[(app, "request")] = self.errors.get((app, "request"), 0) + 1
+        for span in record["spans"]:
+            stage = _stage(span)
+            self.stages.setdefault((app, stage), Histogram(BUCKETS)).observe(span["duration_ms"] / 1000)
+            if span.get("error"):
+                self.errors[(app, stage)] = self.errors.get((app, stage), 0) + 1
+            iterations = span.get("attrs", {}).get("iterations")
+            if iterations:
+                self.iterations.setdefault((app,), Histogram(ITERATION_BUCKETS)).observe(iterations)
+
+    def prometheus(self) -> str:
+        lines = []
+        families = [
+            ("rag_request_duration_seconds", "Duration of a whole user request.", ("app",), self.requests),
+            ("rag_stage_duration_seconds", "Duration of one pipeline stage.", ("app", "stage"), self.stages),
+            ("rag_agent_iterations", "Agent loop iterations per run.", ("app",), self.iterations),
+        ]
+        for metric, help_text, names, histograms in families:
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} histogram")
+            for values, histogram in sorted(histograms.items()):
+                labels = _labels(**dict(zip(names, values)))
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f"{metric}_sum{{{labels}}} {round(histogram.sum, 6)}")
+                lines.append(f"{metric}_count{{{labels}}} {histogram.count}")
+        lines.append("# HELP rag_stage_errors_total Stages that ended with an exception.")
+        lines.append("# TYPE rag_stage_errors_total counter")
+        for (app, stage), count in sorted(self.errors.items()):
+            lines.append(f"rag_stage_errors_total{{{_labels(app=app, stage=stage)}}} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def prometheus_text(path: str = TRACE_PATH) -> str:
+    aggregator = Aggregator(path)
+    aggregator.update()
+    return aggregator.prometheus()
+
+
+def summary(path: str = TRACE_PATH) -> List[dict]:
+    """p50/p95 po aplikaciji i fazi, iz svih zahteva u fajlu."""
+    import numpy as np
+
+    samples: Dict[tuple, List[float]] = {}
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            samples.setdefault((record["app"], "request"), []).append(record["duration_ms"])
+            for span in record["spans"]:
+                samples.setdefault((record["app"], _stage(span)), []).append(span["duration_ms"])
+    rows = []
+    for (app, stage), values in sorted(samples.items()):
+        p50, p95 = np.percentile(values, [50, 95])
+        rows.append({"app": app, "stage": stage, "n": len(values), "p50_ms": round(float(p50), 1), "p95_ms": round(float(p95), 1)})
+    return rows
+
+
+def serve(port: int, path: str = TRACE_PATH):
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+    aggregator = Aggregator(path)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            aggregator.update()
+            body = aggregator.prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    print(f"Prometheus metrike na http://0.0.0.0:{port}/metrics (iz {path})")
+    HTTPServer(("", port), Handler).serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency metrics from request traces")
+    parser.add_argument("--path", default=TRACE_PATH)
+    parser.add_argument("--serve", type=int, metavar="PORT", help="serve /metrics on this port")
+    parser.add_argument("--summary", action="store_true", help="print p50/p95 per app and stage")
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.path)
+    elif args.summary:
+        print(f"{'aplikacija':<22} {'faza':<28} {'n':>6} {'p50 ms':>10} {'p95 ms':>10}")
+        for row in summary(args.path):
+            print(f"{row['app']:<22} {row['stage']:<28} {row['n']:>6} {row['p50_ms']:>10} {row['p95_ms']:>10}")
+    else:
+        print(prometheus_text(args.path), end="")
+
+
+if __name__ == "__main__":
+    main()
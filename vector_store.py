@@ -0,0 +1,141 @@
+# izbor vektorske baze: Pinecone (podrazumevano) ili lokalni indeks u memoriji
+#
+#   VECTOR_BACKEND=local streamlit run Pisi_u_stilu_Hybrid.py
+
+import os
+from typing import Any, Iterable, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+from clients import pinecone_index
+
+VECTOR_BACKEND = os.environ.get("VECTOR_BACKEND", "pinecone")
+
+# hybrid indeksi u Pinecone-u moraju biti dotproduct
+INDEX_METRICS = {"positive": "dotproduct", "bis": "dotproduct", "embedings1": "cosine"}
+
+_local_indexes = {}
+
+
+def get_index(index_name: str, project: str):
+    """Vraca pinecone.Index (iz registra klijenata) ili LocalIndex, zavisno od VECTOR_BACKEND."""
+    if VECTOR_BACKEND == "local":
+        if index_name not in _local_indexes:
+            from local_index import LocalIndex
+
+            _local_indexes[index_name] = LocalIndex(
+                index_name, metric=INDEX_METRICS.get(index_name, "cosine")
+            )
+        return _local_indexes[index_name]
+
+    return pinecone_index(index_name, project)
+
+
+def from_existing_index(index_name: str, embedding, text_key: str, namespace: str, project: str):
+    """Zamena za Pinecone.from_existing_index koja postuje VECTOR_BACKEND.
+
+    Vectorstore je tanak omotac oko indeksa iz registra, pa se ne ponavljaju
+    init ni list_indexes koje radi Pinecone.from_existing_index.
+    """
+    if VECTOR_BACKEND == "local":
+        return LocalVectorStore(get_index(index_name, project), embedding, text_key, namespace)
+
+    from langchain.vectorstores.pinecone import Pinecone
+
+    return Pinecone(get_index(index_name, project), embedding, text_key, namespace=namespace)
+
+
+def self_query_translator():
+    """SelfQueryRetriever ne zna za LocalVectorStore, pa mu se translator zadaje rucno."""
+    if VECTOR_BACKEND != "local":
+        return None
+    from langchain.retrievers.self_query.pinecone import PineconeTranslator
+
+    return PineconeTranslator()
+
+
+class LocalVectorStore(VectorStore):
+    """LangChain vectorstore nad LocalIndex-om, sa istim ponasanjem kao Pinecone vectorstore."""
+
+    def __init__(self, index, embedding, text_key: str = "text", namespace: Optional[str] = None):
+        self._index = index
+        self._embedding = embedding
+        self._text_key = text_key
+        self._namespace = namespace or ""
+
+    @property
+    def embeddings(self):
+        return self._embedding
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        namespace: Optional[str] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        import uuid
+
+        texts = list(texts)
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        metadatas = metadatas or [{} for _ in texts]
+        vectors = self._embedding.embed_documents(texts)
+        self._index.upsert(
+            [
+                {"id": i, "values": v, "metadata": {**m, self._text_key: t}}
+                for i, v, m, t in zip(ids, vectors, metadatas, texts)
+            ],
+            namespace=namespace or self._namespace,
+        )
+        return ids
+
+    def similarity_search_by_vector_with_score(
+        self, embedding: List[float], k: int = 4, filter: Optional[dict] = None, namespace: Optional[str] = None
+    ) -> List[Tuple[Document, float]]:
+        result = self._index.query(
+            top_k=k,
+            vector=embedding,
+            namespace=namespace or self._namespace,
+            filter=filter,
+            include_metadata=True,
+        )
+        docs = []
+        for match in result.matches:
+            metadata = dict(match.metadata)
+            text = metadata.pop(self._text_key, "")
+            docs.append((Document(page_content=text, metadata=metadata), match.score))
+        return docs
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, filter: Optional[dict] = None, namespace: Optional[str] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(
+            self._embedding.embed_query(query), k=k, filter=filter, namespace=namespace
+        )
+
+    def similarity_search(
+        self, query: str, k: int = 4, filter: Optional[dict] = None, namespace: Optional[str] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter, namespace)]
+
+    def _select_relevance_score_fn(self):
+        return lambda score: score
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding,
+        metadatas: Optional[List[dict]] = None,
+        index_name: str = "local",
+        text_key: str = "text",
+        namespace: Optional[str] = None,
+        **kwargs: Any,
+    ) -> "LocalVectorStore":
+        from local_index import LocalIndex
+
+        store = cls(LocalIndex(index_name), embedding, text_key, namespace)
+        store.add_texts(texts, metadatas=metadatas, **kwargs)
+        return store
@@ -0,0 +1,96 @@
+# Serper (Google) pretraga sa TTL cache-om; pretraga moze da krene unapred, istovremeno sa upitom
+# u vektorsku bazu, pa se kod promasaja u indeksu ne ceka jos jedan round trip
+
+import contextvars
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable
+
+from cachetools import TTLCache
+
+from tracing import span
+
+SERPER_CACHE_TTL = float(os.environ.get("SERPER_CACHE_TTL", "3600"))
+SERPER_CACHE_SIZE = int(os.environ.get("SERPER_CACHE_SIZE", "512"))
+SERPER_WORKERS = int(os.environ.get("SERPER_WORKERS", "4"))
+
+_cache = TTLCache(maxsize=SERPER_CACHE_SIZE, ttl=SERPER_CACHE_TTL)
+_pending: Dict[Hashable, Future] = {}
+_lock = threading.Lock()
+_pool = None
+_wrapper = None
+
+
+def _serper():
+    global _wrapper
+    if _wrapper is None:
+        from langchain.utilities import GoogleSerperAPIWrapper
+
+        _wrapper = GoogleSerperAPIWrapper()
+    return _wrapper
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=SERPER_WORKERS, thread_name_prefix="serper")
+        return _pool
+
+
+def _cached(key: Hashable, compute: Callable[[], Any]) -> Any:
+    """Kao retrieval_cache.get_or_compute, ali isti upit koji je vec u toku se ne salje ponovo."""
+    with _lock:
+        if key in _cache:
+            return _cache[key]
+        future = _pending.get(key)
+        owner = future is None
+        if owner:
+            future = _pending[key] = Future()
+    if not owner:
+        return future.result()
+    try:
+        with span("serper", kind=key[0]):
+            value = compute()
+    except BaseException as error:
+        with _lock:
+            _pending.pop(key, None)
+        future.set_exception(error)
+        raise
+    with _lock:
+        _cache[key] = value
+        _pending.pop(key, None)
+    future.set_result(value)
+    return value
+
+
+def search_results(query: str) -> dict:
+    """GoogleSerperAPIWrapper().results(query), kesirano."""
+    return _cached(("results", query), lambda: _serper().results(query))
+
+
+def search_text(query: str) -> str:
+    """GoogleSerperAPIWrapper().run(query), kesirano - za alate agenata."""
+    return _cached(("run", query), lambda: _serper().run(query))
+
+
+def start_search(query: str) -> Future:
+    """Pokrece search_results u pozadini i odmah vraca Future.
+
+    Ako indeks ipak vrati dovoljno dobre dokumente, future.cancel() otkazuje
+    pretragu koja jos nije pocela; vec poslat zahtev se zavrsi, a rezultat
+    ostaje u cache-u.
+    """
+    with _lock:
+        if ("results", query) in _cache:
+            future = Future()
+            future.set_result(_cache[("results", query)])
+            return future
+    # kopija konteksta, da pretraga bude span tekuceg zahteva
+    return _get_pool().submit(contextvars.copy_context().run, search_results, query)
+
+
+def clear():
+    with _lock:
+        _cache.clear()